@@ -0,0 +1,296 @@
+import json
+import logging
+import operator
+import re
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import requests
+
+from metrics import REGISTRY, stage_timer
+
+ALERTS_SENT = REGISTRY.counter('crypto_alerts_total', 'Alerts delivered to sinks by metric', ['metric'])
+
+OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+# Snapshot fields a rule can test directly
+FIELDS = {
+    'current_price', 'market_cap', 'total_volume', 'price_change_percentage_24h',
+    'high_24h', 'low_24h', 'circulating_supply', 'ath', 'ath_change_percentage'
+}
+# Derived from the engine's own snapshot history: change_1h (signed %), move_15m (absolute %),
+# and volume_zscore (this refresh's volume against the recent full refreshes)
+WINDOW_METRIC = re.compile(r'^(change|move)_(\d+)([mhd])$')
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+RULE = re.compile(
+    r'^(?P<target>\S+)\s+(?:(?P<metric>[a-z][a-z0-9_]*)\s+)?(?P<op><=|>=|<|>)\s*(?P<value>[-+]?[\d.]+(?:e[-+]?\d+)?)%?'
+    r'(?:\s+cooldown=(?P<cooldown>\d+)(?P<unit>[smhd]?))?\s*$',
+    re.IGNORECASE
+)
+
+def _check_metric(metric):
+    if metric in FIELDS or metric == 'volume_zscore' or WINDOW_METRIC.match(metric):
+        return metric
+    raise ValueError(f"Unknown alert metric {metric!r}")
+
+class Rule:
+    """One alert condition on a single coin (symbol) or on every coin in the top N"""
+    def __init__(self, metric, op, threshold, symbol=None, top_n=None, cooldown=3600, rule_id=None):
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator {op!r}")
+        self.metric = _check_metric(metric)
+        self.op = op
+        self.threshold = float(threshold)
+        self.symbol = symbol.lower() if symbol else None
+        self.top_n = top_n  # None with no symbol means any coin
+        self.cooldown = cooldown
+        target = self.symbol.upper() if self.symbol else (f"top{top_n}" if top_n else '*')
+        self.rule_id = rule_id or f"{target} {metric} {op} {self.threshold:g}"
+
+def parse_rule(text, cooldown=3600):
+    """Rule from 'BTC < 50000', 'top100 move_1h > 8%' or '* volume_zscore > 4 cooldown=30m'"""
+    match = RULE.match(text)
+    if not match:
+        raise ValueError(f"Cannot parse alert rule {text!r}")
+    target = match['target']
+    symbol, top_n = None, None
+    if re.fullmatch(r'top\d+', target, re.IGNORECASE):
+        top_n = int(target[3:])
+    elif target not in ('*', 'any'):
+        symbol = target
+    metric = (match['metric'] or 'current_price').lower()
+    if match['cooldown']:
+        cooldown = int(match['cooldown']) * UNITS[(match['unit'] or 's').lower()]
+    return Rule(metric, match['op'], match['value'], symbol, top_n, cooldown, rule_id=text.strip())
+
+def load_rules(path):
+    """One rule per line; blank lines and # comments are skipped"""
+    with open(path) as f:
+        lines = [line.split('#', 1)[0].strip() for line in f]
+    return [parse_rule(line) for line in lines if line]
+
+class _CoinRules:
+    """Rules on named coins for one (metric, op), as parallel arrays"""
+    def __init__(self, rules, offset):
+        self.index = np.arange(offset, offset + len(rules))
+        self.symbols = pd.Index([rule.symbol for rule in rules])
+        self.thresholds = np.array([rule.threshold for rule in rules])
+
+class _ScopeRules:
+    """'Any coin in the top N' rules for one (metric, op), sorted so the loosest threshold is first"""
+    def __init__(self, rules, offset, op):
+        order = sorted(range(len(rules)), key=lambda i: rules[i].threshold, reverse=op in ('<', '<='))
+        self.index = np.array([offset + i for i in order], dtype=int)
+        self.thresholds = np.array([rules[i].threshold for i in order])
+        self.top_n = np.array([rules[i].top_n or np.inf for i in order], dtype=float)
+
+class AlertEngine:
+    def __init__(self, rules=(), sinks=(), zscore_window=288, min_zscore_samples=12, history=None, clock=time.time):
+        self.sinks = list(sinks)
+        self.zscore_window = zscore_window  # full refreshes of volume history behind volume_zscore
+        self.min_zscore_samples = min_zscore_samples
+        self.history_span = history  # seconds of price history kept; derived from the rules when None
+        self.clock = clock
+        self.history = deque()  # (epoch seconds, per-coin prices) of past snapshots
+        # Price-only snapshots repeat the last full refresh's volume, so only full refreshes
+        # feed the volume baseline and price-only ones reuse the last z-scores
+        self.volumes = deque(maxlen=zscore_window)
+        self.volume_zscore = None
+        self.rules = []
+        self.add_rules(rules)
+
+    def add_rules(self, rules):
+        """Add rules and rebuild the per-(metric, op) indexes; cooldowns start over"""
+        self.rules.extend(rules)
+        self._compile()
+
+    def _compile(self):
+        by_key = {}
+        for rule in self.rules:
+            by_key.setdefault((rule.metric, rule.op), []).append(rule)
+
+        self.coin_groups, self.scope_groups = [], []
+        order = []
+        for (metric, op), rules in by_key.items():
+            named = [rule for rule in rules if rule.symbol]
+            scoped = [rule for rule in rules if not rule.symbol]
+            if named:
+                self.coin_groups.append((metric, op, _CoinRules(named, len(order))))
+                order.extend(named)
+            if scoped:
+                self.scope_groups.append((metric, op, _ScopeRules(scoped, len(order), op)))
+                order.extend(scoped)
+        # Rules are stored group by group, so each group's state is one contiguous slice
+        self.rules = order
+        self.cooldowns = np.array([rule.cooldown for rule in order], dtype=float)
+        self.active = np.zeros(len(order), dtype=bool)          # named rules currently true
+        self.last_fired = np.full(len(order), -np.inf)
+        self.active_pairs = set()                               # (rule, coin id) scope rules currently true
+        self.pair_fired = {}
+        self.metrics = {rule.metric for rule in order}
+        spans = [self._lookback(metric) for metric in self.metrics if WINDOW_METRIC.match(metric)]
+        self.span = self.history_span or (max(spans) * 1.5 if spans else 0)
+
+    @staticmethod
+    def _lookback(metric):
+        match = WINDOW_METRIC.match(metric)
+        return int(match[2]) * UNITS[match[3]]
+
+    def _metric_values(self, frame, metric, at, prices_only=False):
+        """Per-coin values of one metric for this snapshot"""
+        if metric in FIELDS:
+            return frame[metric].astype('float64')
+        if metric == 'volume_zscore':
+            if prices_only:
+                if self.volume_zscore is None:
+                    return pd.Series(np.nan, index=frame.index)
+                return self.volume_zscore.reindex(frame.index)
+            if len(self.volumes) < self.min_zscore_samples:
+                zscore = pd.Series(np.nan, index=frame.index)
+            else:
+                volumes = pd.concat(self.volumes, axis=1).reindex(frame.index).astype('float64')
+                mean, std = volumes.mean(axis=1), volumes.std(axis=1)
+                zscore = (frame['total_volume'].astype('float64') - mean) / std.where(std > 0)
+            self.volume_zscore = zscore
+            return zscore
+        # change_/move_ windows: percent change since the newest snapshot at least that old
+        cutoff = at - self._lookback(metric)
+        for stamp, prices in reversed(self.history):
+            if stamp <= cutoff:
+                change = (frame['current_price'] / prices.reindex(frame.index) - 1) * 100
+                return change.abs() if metric.startswith('move') else change
+        return pd.Series(np.nan, index=frame.index)
+
+    def evaluate(self, snapshot, at=None, prices_only=None):
+        """Check every rule against one snapshot; deliver and return the new alerts
+
+        prices_only marks a fast-tick snapshot whose non-price columns repeat the last full
+        refresh; by default it is read from the snapshot bus flag in snapshot.attrs.
+        """
+        at = at if at is not None else self.clock()
+        if snapshot is None or snapshot.empty:
+            return []
+        if prices_only is None:
+            prices_only = snapshot.attrs.get('prices_only', False)
+        with stage_timer('alerts', log=False):
+            alerts = self._evaluate(snapshot, at, prices_only)
+        if alerts:
+            self._deliver(alerts)
+        return alerts
+
+    def _evaluate(self, snapshot, at, prices_only):
+        frame = snapshot.assign(symbol=snapshot['symbol'].astype(str).str.lower())
+        # Coins are keyed by CoinGecko id, since symbols repeat; ranked by market cap
+        key = frame['id'] if 'id' in frame.columns else frame['symbol']
+        frame = frame.set_index(key.astype(str).to_numpy())
+        frame = frame.sort_values('market_cap', ascending=False, kind='stable')
+        frame = frame[~frame.index.duplicated()]
+        rank = np.arange(1, len(frame) + 1)
+        values = {metric: self._metric_values(frame, metric, at, prices_only).to_numpy() for metric in self.metrics}
+
+        # Named-coin rules give a symbol, which resolves to the largest coin carrying it
+        largest = np.flatnonzero(~frame['symbol'].duplicated().to_numpy())
+        by_symbol = pd.Index(frame['symbol'].to_numpy()[largest])
+
+        alerts = []
+        for metric, op, group in self.coin_groups:
+            compare = OPERATORS[op]
+            found = by_symbol.get_indexer(group.symbols)
+            positions = np.where(found >= 0, largest[found], -1)
+            current = np.where(positions >= 0, values[metric][positions], np.nan)
+            with np.errstate(invalid='ignore'):
+                fired = compare(current, group.thresholds)
+            # Alert on the transition into the condition, and not again within the cooldown
+            due = fired & ~self.active[group.index] & (at - self.last_fired[group.index] >= self.cooldowns[group.index])
+            self.active[group.index] = fired
+            for i in np.flatnonzero(due):
+                rule_index = group.index[i]
+                self.last_fired[rule_index] = at
+                alerts.append(self._alert(rule_index, frame, positions[i], current[i], at))
+
+        active_pairs = set()
+        for metric, op, group in self.scope_groups:
+            compare = OPERATORS[op]
+            metric_values = values[metric]
+            # Only coins past the loosest threshold can fire any rule in the group
+            with np.errstate(invalid='ignore'):
+                candidates = np.flatnonzero(
+                    compare(metric_values, group.thresholds[0]) & (rank <= group.top_n.max())
+                )
+            for position in candidates:
+                coin = frame.index[position]
+                fired = compare(metric_values[position], group.thresholds) & (rank[position] <= group.top_n)
+                for rule_index in group.index[fired]:
+                    pair = (rule_index, coin)
+                    active_pairs.add(pair)
+                    if pair in self.active_pairs or at - self.pair_fired.get(pair, -np.inf) < self.cooldowns[rule_index]:
+                        continue
+                    self.pair_fired[pair] = at
+                    alerts.append(self._alert(rule_index, frame, position, metric_values[position], at))
+        self.active_pairs = active_pairs
+
+        self._remember(frame, at, prices_only)
+        return alerts
+
+    def _alert(self, rule_index, frame, position, value, at):
+        rule = self.rules[rule_index]
+        return {
+            'rule': rule.rule_id,
+            'id': frame.index[position],
+            'symbol': frame['symbol'].iloc[position].upper(),
+            'name': frame['name'].iloc[position],
+            'metric': rule.metric,
+            'op': rule.op,
+            'threshold': rule.threshold,
+            'value': float(value),
+            'at': datetime.fromtimestamp(at, timezone.utc).isoformat(timespec='seconds')
+        }
+
+    def _remember(self, frame, at, prices_only):
+        """Keep just the history the derived metrics need"""
+        if 'volume_zscore' in self.metrics and not prices_only:
+            self.volumes.append(frame['total_volume'])
+        if not self.span:
+            return
+        self.history.append((at, frame['current_price']))
+        while self.history[0][0] < at - self.span:
+            self.history.popleft()
+
+    def _deliver(self, alerts):
+        for alert in alerts:
+            ALERTS_SENT.inc(metric=alert['metric'])
+        for sink in self.sinks:
+            try:
+                sink.send(alerts)
+            except Exception as e:
+                # One broken sink must not stop the others
+                print(f"Error sending alerts to {type(sink).__name__}: {e}")
+
+class ConsoleSink:
+    def send(self, alerts):
+        for alert in alerts:
+            print(f"🚨 {alert['at']} {alert['name']} ({alert['symbol']}): {alert['metric']} "
+                  f"{alert['value']:,.4g} {alert['op']} {alert['threshold']:,.4g}  [{alert['rule']}]")
+
+class LogSink:
+    """One JSON line per alert"""
+    def __init__(self, logger_name='CryptoAlerts'):
+        self.logger = logging.getLogger(logger_name)
+
+    def send(self, alerts):
+        for alert in alerts:
+            self.logger.warning(json.dumps(alert))
+
+class WebhookSink:
+    """POST each batch of alerts as JSON, e.g. to a chat or paging webhook"""
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def send(self, alerts):
+        self.session.post(self.url, json={'alerts': alerts}, timeout=self.timeout).raise_for_status()
@@ -0,0 +1,242 @@
+import asyncio
+import os
+import random
+from datetime import datetime
+
+import aiohttp
+
+from coingecko_client import RETRY_STATUSES, parse_retry_after
+from crypto_analyzer import CryptoDataFetcher
+from export_pipeline import ExportPipeline, build_cell_grid
+from http_cache import ResponseCache
+from json_backend import get_decoder
+from market_data import currency_label, display_frame
+from metrics import API_ERRORS, API_RESPONSES, API_RETRIES, stage_timer
+from rate_limiter import TokenBucket
+from request_planner import RequestPlanner, Watchlist
+from scheduler import BackgroundWorkers, FixedRateScheduler
+
+class AsyncCoinGeckoClient:
+    """asyncio counterpart of CoinGeckoClient: same retries, rate limit and cache, one pooled session"""
+    def __init__(self, base_url="https://api.coingecko.com/api/v3", api_key=None, pool_size=20, timeout=30,
+                 rate_limiter=None, max_retries=5, backoff_base=1.0, backoff_max=60.0, cache=None,
+                 decoder=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key if api_key is not None else os.getenv('COINGECKO_API_KEY')
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        if rate_limiter is None:
+            calls_per_minute = os.getenv('COINGECKO_CALLS_PER_MINUTE')
+            rate_limiter = TokenBucket.for_tier(
+                self.api_key,
+                int(calls_per_minute) if calls_per_minute else None
+            )
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.decode = decoder or get_decoder()
+        self.inflight = {}    # cache key -> task shared by concurrent callers
+        self.session = None   # created inside the running event loop
+
+    def _session(self):
+        if self.session is None:
+            headers = {'X-CG-API-KEY': self.api_key} if self.api_key else {}
+            self.session = aiohttp.ClientSession(
+                headers=headers,
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self.session
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff delay for the given attempt"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _request(self, url, params=None, headers=None):
+        """Send a rate-limited GET; return (status, headers, body bytes)"""
+        # Encode query values the way requests does, so cache keys and URLs match the sync client
+        query = {key: str(value) for key, value in (params or {}).items()}
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire_async()
+            try:
+                async with self._session().get(url, params=query, headers=headers) as response:
+                    body = await response.read()
+                    status, response_headers = response.status, response.headers
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                reason = 'timeout' if isinstance(e, asyncio.TimeoutError) else 'connection'
+                if attempt >= self.max_retries:
+                    API_ERRORS.inc(reason=reason)
+                    raise
+                API_RETRIES.inc(reason=reason)
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            API_RESPONSES.inc(status=status)
+            if status in RETRY_STATUSES and attempt < self.max_retries:
+                API_RETRIES.inc(reason=status)
+                delay = parse_retry_after(response_headers.get('Retry-After'))
+                if status == 429:
+                    # Hold back every caller sharing the bucket, not just this one
+                    self.rate_limiter.pause(delay if delay is not None else self._backoff(attempt))
+                else:
+                    await asyncio.sleep(delay if delay is not None else self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if status >= 400:
+                API_ERRORS.inc(reason=status)
+                raise aiohttp.ClientResponseError(
+                    response.request_info, response.history, status=status, headers=response_headers
+                )
+            return status, response_headers, body
+
+    def _decode(self, content):
+        with stage_timer('decode', log=False):
+            return self.decode(content)
+
+    async def get(self, path, params=None):
+        """GET a CoinGecko endpoint and return the decoded JSON body"""
+        url = f"{self.base_url}{path}"
+        if self.cache is None:
+            _, _, body = await self._request(url, params)
+            return self._decode(body)
+
+        key = self.cache.make_key(url, params)
+        # Identical requests from several watchlists share one upstream fetch
+        task = self.inflight.get(key)
+        if task is None:
+            task = self.inflight[key] = asyncio.ensure_future(self._cached_get(key, url, params))
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _cached_get(self, key, url, params):
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.record('hits', entry)
+            return entry['body']
+
+        status, headers, raw = await self._request(url, params, self.cache.conditional_headers(entry))
+        if status == 304 and entry is not None:
+            self.cache.touch(key, entry)
+            self.cache.record('revalidated', entry)
+            return entry['body']
+
+        body = self._decode(raw)
+        self.cache.store(key, body, len(raw), etag=headers.get('ETag'), last_modified=headers.get('Last-Modified'))
+        self.cache.record('misses')
+        return body
+
+    async def close(self):
+        """Close the pooled connections"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+class AsyncCryptoDataFetcher:
+    def __init__(self, watchlists, base_url="https://api.coingecko.com/api/v3", max_connections=20,
+                 rate_limiter=None, cache_dir=".http_cache", cache_ttl=60, export_workers=2, planner=None):
+        self.watchlists = list(watchlists)
+        self.client = AsyncCoinGeckoClient(
+            base_url,
+            pool_size=max_connections,
+            rate_limiter=rate_limiter,
+            cache=ResponseCache(cache_dir, cache_ttl)
+        )
+        # Overlapping watchlists and currencies share one set of upstream calls
+        self.planner = planner or RequestPlanner()
+        self.pipeline = ExportPipeline()
+        self.export_workers = export_workers
+        self.workers = None  # started on the first export
+
+    async def fetch_watchlists(self):
+        """Fetch every watchlist through one merged request plan, falling back to last good data"""
+        try:
+            data = await self.planner.fetch(self.client.get, self.watchlists)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError) as e:
+            print(f"Error fetching watchlists: {e}")
+            data = {}
+        for watchlist in self.watchlists:
+            if watchlist.name in data:
+                watchlist.last_good_data = data[watchlist.name]
+                watchlist.last_fetch_stale = False
+            elif watchlist.last_good_data is not None:
+                print(f"Reusing last good snapshot for {watchlist.name}")
+                watchlist.last_fetch_stale = True
+        return {watchlist.name: watchlist.last_good_data for watchlist in self.watchlists}
+
+    @staticmethod
+    def refresh(watchlist, data):
+        """Process and analyze one watchlist's coins; return (df, analysis) or (None, None)"""
+        df = CryptoDataFetcher.process_crypto_data(data)
+        if df is None or df.empty:
+            return None, None
+        return df, watchlist.analyzer.update(df)
+
+    def export(self, watchlist, df, analysis):
+        """Write a watchlist's spreadsheets; runs on a background worker thread"""
+        # Columns are labelled in the watchlist's own currency, not the USD defaults
+        analysis = {
+            title: table.rename(columns=lambda label: currency_label(label, watchlist.vs_currency))
+            for title, table in analysis.items()
+        }
+        grid = build_cell_grid(display_frame(df, watchlist.vs_currency), analysis)
+        written = self.pipeline.export(grid, watchlist.targets)
+        return [path for path, changed in written.items() if changed]
+
+    async def tick(self):
+        """Refresh every watchlist at once and queue their exports"""
+        if self.workers is None:
+            self.workers = BackgroundWorkers(self.export_workers)
+        data = await self.fetch_watchlists()
+        # Parsing and analysis are CPU-bound; run them off the loop so in-flight requests keep moving
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(None, self.refresh, watchlist, data[watchlist.name])
+            for watchlist in self.watchlists
+        ))
+        for watchlist, (df, analysis) in zip(self.watchlists, results):
+            if df is not None:
+                # Rendering is CPU-bound; keep it off the event loop, newest snapshot only
+                self.workers.submit(watchlist.name, self.export, watchlist, df, analysis)
+        return dict(zip((watchlist.name for watchlist in self.watchlists), results))
+
+    async def run(self, interval=300):
+        """Refresh all watchlists on a fixed-rate clock until cancelled"""
+        scheduler = FixedRateScheduler(interval)
+        try:
+            while True:
+                await scheduler.wait_async()
+                print(f"\nFetching {len(self.watchlists)} watchlists at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                results = await self.tick()
+                for watchlist in self.watchlists:
+                    df, _ = results[watchlist.name]
+                    status = 'no data' if df is None else f"{len(df)} coins, {watchlist.analyzer.last_changed} changed"
+                    stale = ' (stale)' if watchlist.last_fetch_stale else ''
+                    print(f"- {watchlist.name} [{watchlist.vs_currency.upper()}]: {status}{stale}")
+                print(f"\n{self.planner.summary()}")
+                print(self.client.cache.summary())
+                print(self.workers.summary())
+                print(f"\nNext update in {scheduler.until_next():.0f} seconds...")
+        finally:
+            await self.close()
+
+    async def close(self):
+        await self.client.close()
+        if self.workers is not None:
+            # Let queued exports finish without blocking the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.workers.close)
+        self.pipeline.close()
+
+if __name__ == "__main__":
+    fetcher = AsyncCryptoDataFetcher([
+        Watchlist('top50_usd', 'usd', top_n=50),
+        Watchlist('top50_eur', 'eur', top_n=50)
+    ])
+    try:
+        asyncio.run(fetcher.run())
+    except KeyboardInterrupt:
+        print("\nProgram terminated by user")
@@ -0,0 +1,246 @@
+"""Seed the snapshot history with /coins/{id}/market_chart/range data for the tracked universe.
+
+    python backfill.py --top 500 --days 365
+    python backfill.py --ids bitcoin ethereum --start 2024-01-01 --end 2024-06-30 --granularity hourly
+
+Interrupted jobs resume from their checkpoint; rows already in the store are skipped.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import requests
+
+from coingecko_client import CoinGeckoClient
+from snapshot_store import SnapshotStore
+
+# CoinGecko picks the granularity from the span of each request: 2-90 days come back hourly,
+# anything longer daily. Granularity -> (largest window, shortest span that still yields it).
+WINDOWS = {
+    'hourly': (timedelta(days=90), timedelta(days=2)),
+    'daily': (timedelta(days=365), timedelta(days=91))
+}
+MAX_PER_PAGE = 250
+
+def split_windows(start, end, size, min_span=timedelta(0)):
+    """Consecutive (from, to) unix-second windows of at most size covering [start, end)"""
+    windows = []
+    step, min_span = int(size.total_seconds()), int(min_span.total_seconds())
+    start, end = int(start.timestamp()), int(end.timestamp())
+    for window_start in range(start, end, step):
+        # /range is inclusive at both ends; stop a second short so windows never overlap
+        windows.append((window_start, min(window_start + step, end) - 1))
+    if windows and windows[-1][1] - windows[-1][0] < min_span:
+        # Stretch a short last window back so it keeps the granularity; the overlap is deduped
+        windows[-1] = (windows[-1][1] - min_span, windows[-1][1])
+    return windows
+
+def resolve_coins(client, top_n=None, ids=None):
+    """id, symbol and name of the coins to backfill: the top_n by market cap and/or listed ids"""
+    coins = []
+    if top_n:
+        per_page = min(top_n, MAX_PER_PAGE)
+        for page in range(1, -(-top_n // per_page) + 1):
+            coins.extend(client.get('/coins/markets', params={
+                'vs_currency': 'usd', 'order': 'market_cap_desc', 'per_page': per_page, 'page': page
+            }))
+        coins = coins[:top_n]
+    known = {coin['id'] for coin in coins}
+    missing = [coin_id for coin_id in ids or [] if coin_id not in known]
+    for start in range(0, len(missing), MAX_PER_PAGE):
+        coins.extend(client.get('/coins/markets', params={
+            'vs_currency': 'usd', 'ids': ','.join(missing[start:start + MAX_PER_PAGE]), 'per_page': MAX_PER_PAGE
+        }))
+    return [{'id': coin['id'], 'symbol': coin['symbol'], 'name': coin['name']} for coin in coins]
+
+def chart_frame(coin, chart):
+    """Rows in the snapshot schema from one market_chart/range response"""
+    series = []
+    for key, column in (('prices', 'current_price'), ('market_caps', 'market_cap'),
+                        ('total_volumes', 'total_volume')):
+        points = chart.get(key) or []
+        series.append(pd.DataFrame(points, columns=['ms', column]).drop_duplicates('ms').set_index('ms'))
+    frame = pd.concat(series, axis=1).sort_index()
+    frame = frame[frame['current_price'].notna()]
+    frame.insert(0, 'timestamp', pd.to_datetime(frame.index, unit='ms', utc=True))
+    frame.insert(1, 'id', coin['id'])
+    frame.insert(2, 'symbol', coin['symbol'])
+    frame.insert(3, 'name', coin['name'])
+    return frame.reset_index(drop=True)
+
+class Backfill:
+    def __init__(self, client, store, checkpoint_path, max_workers=8, flush_rows=500_000):
+        self.client = client
+        self.store = store
+        self.checkpoint_path = checkpoint_path
+        self.max_workers = max_workers
+        self.flush_rows = flush_rows  # rows buffered before they are written out
+        self.done, self.job = self._load_checkpoint()
+        self.buffer = []
+        self.pending = []  # windows whose rows are buffered but not yet written
+        self.touched_dates = set()
+        self.stats = {'windows': 0, 'skipped': 0, 'failed': 0, 'rows': 0, 'duplicates': 0}
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+            return set(state['done']), state.get('job')
+        except (OSError, ValueError, KeyError, TypeError):
+            return set(), None
+
+    def _save_checkpoint(self):
+        directory = os.path.dirname(os.path.abspath(self.checkpoint_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.backfill.', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'done': sorted(self.done), 'job': self.job}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def resolve_range(self, request, start, end):
+        """[start, end) for this job; rerunning an unfinished request reuses the range it first resolved to
+
+        Window bounds, and so the checkpoint keys, follow from the range, and a default range
+        ending tomorrow would move by a day whenever a job is resumed on a later date.
+        """
+        job = self.job or {}
+        if job.get('request') == request and not job.get('complete'):
+            start, end = datetime.fromisoformat(job['start']), datetime.fromisoformat(job['end'])
+            print(f"Resuming the backfill of {start:%Y-%m-%d} to {end:%Y-%m-%d} from the checkpoint")
+            return start, end
+        self.job = {'request': request, 'start': start.isoformat(), 'end': end.isoformat()}
+        return start, end
+
+    def _key(self, coin, window):
+        return f"{coin['id']}:{window[0]}:{window[1]}"
+
+    def fetch_window(self, coin, window):
+        """One market_chart/range call, as snapshot rows"""
+        chart = self.client.get(f"/coins/{coin['id']}/market_chart/range", params={
+            'vs_currency': 'usd', 'from': window[0], 'to': window[1]
+        })
+        return chart_frame(coin, chart)
+
+    def _dedupe(self, rows):
+        """Drop rows whose (id, timestamp) is already stored or repeated in the batch"""
+        # Matched on the CoinGecko id: symbols repeat across coins, and daily points all land on 00:00 UTC
+        rows = rows.drop_duplicates(['id', 'timestamp'])
+        stored = self.store.query(start=rows['timestamp'].min(), end=rows['timestamp'].max(),
+                                  ids=rows['id'].unique(), columns=['timestamp', 'id'])
+        if stored.empty:
+            return rows
+        stored = stored.astype({'id': str})
+        merged = rows.merge(stored.drop_duplicates(), on=['id', 'timestamp'], how='left', indicator=True)
+        return rows[(merged['_merge'] == 'left_only').to_numpy()]
+
+    def flush(self):
+        """Write buffered rows, then checkpoint the windows they came from"""
+        if self.buffer:
+            rows = pd.concat(self.buffer, ignore_index=True)
+            fresh = self._dedupe(rows)
+            self.stats['duplicates'] += len(rows) - len(fresh)
+            self.stats['rows'] += len(fresh)
+            self.store.append_history(fresh)
+            self.touched_dates.update(fresh['timestamp'].dt.strftime('%Y-%m-%d'))
+        # A window is only marked done once its rows are on disk
+        self.done.update(self.pending)
+        self._save_checkpoint()
+        self.buffer, self.pending = [], []
+
+    def run(self, coins, start, end, granularity='daily'):
+        """Backfill every coin over [start, end); return the stats"""
+        windows = split_windows(start, end, *WINDOWS[granularity])
+        jobs = [(coin, window) for coin in coins for window in windows]
+        todo = [(coin, window) for coin, window in jobs if self._key(coin, window) not in self.done]
+        self.stats['skipped'] += len(jobs) - len(todo)
+        print(f"Backfilling {len(coins)} coins in {len(windows)} {granularity} windows each: "
+              f"{len(todo)} calls to make, {len(jobs) - len(todo)} already done")
+
+        buffered = 0
+        # Every worker shares the client's rate limiter, so concurrency never exceeds the quota
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch_window, coin, window): (coin, window) for coin, window in todo}
+            for completed, future in enumerate(as_completed(futures), start=1):
+                coin, window = futures[future]
+                try:
+                    rows = future.result()
+                except (requests.RequestException, ValueError) as e:
+                    self.stats['failed'] += 1
+                    print(f"Error backfilling {coin['id']} {window}: {e}")
+                    continue
+                self.stats['windows'] += 1
+                # Coins listed partway through the range return empty windows; those are still done
+                if not rows.empty:
+                    self.buffer.append(rows)
+                self.pending.append(self._key(coin, window))
+                buffered += len(rows)
+                if buffered >= self.flush_rows:
+                    self.flush()
+                    buffered = 0
+                if completed % 100 == 0:
+                    print(f"{completed}/{len(todo)} windows fetched")
+        if self.job is not None:
+            self.job['complete'] = not self.stats['failed']
+        self.flush()
+
+        # Merge the many backfill files per day, leaving today's live partition alone
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        for date in sorted(self.touched_dates - {today}):
+            self.store.compact(date)
+        return self.stats
+
+def parse_date(value):
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--top', type=int, help='backfill the top N coins by market cap')
+    parser.add_argument('--ids', nargs='+', default=[], help='CoinGecko ids to backfill')
+    parser.add_argument('--days', type=int, default=365, help='days of history to fetch, up to today (default 365)')
+    parser.add_argument('--start', type=parse_date, help='first day (YYYY-MM-DD); overrides --days')
+    parser.add_argument('--end', type=parse_date, help='day to stop at (YYYY-MM-DD, exclusive; default tomorrow)')
+    parser.add_argument('--granularity', choices=sorted(WINDOWS), default='daily',
+                        help='daily costs one call per coin per year, hourly five')
+    parser.add_argument('--history-dir', default='history')
+    parser.add_argument('--checkpoint', help='progress file (default <history-dir>/.backfill_checkpoint.json)')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--base-url', default='https://api.coingecko.com/api/v3')
+    args = parser.parse_args(argv)
+    if not args.top and not args.ids:
+        parser.error('give --top N and/or --ids')
+
+    end = args.end or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    start = args.start or end - timedelta(days=args.days)
+    # The command as typed; rerunning it resumes the same range even on a later day
+    request = {
+        'top': args.top, 'ids': sorted(args.ids), 'days': args.days, 'granularity': args.granularity,
+        'start': args.start and args.start.isoformat(), 'end': args.end and args.end.isoformat()
+    }
+    client = CoinGeckoClient(args.base_url, pool_size=args.workers)
+    try:
+        backfill = Backfill(
+            client,
+            SnapshotStore(args.history_dir),
+            args.checkpoint or os.path.join(args.history_dir, '.backfill_checkpoint.json'),
+            max_workers=args.workers
+        )
+        start, end = backfill.resolve_range(request, start, end)
+        coins = resolve_coins(client, args.top, args.ids)
+        stats = backfill.run(coins, start, end, args.granularity)
+    finally:
+        client.close()
+
+    print(f"Backfill: {stats['windows']} windows fetched, {stats['skipped']} already done, "
+          f"{stats['failed']} failed, {stats['rows']:,} rows stored, {stats['duplicates']:,} duplicates skipped")
+    if stats['failed']:
+        print("Run the same command again to retry the failed windows")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""Time and peak memory of every pipeline stage, from fetch to PDF, on synthetic payloads.
+
+Runs fully offline: the fetch stage talks to a local stub of /coins/markets. Each size runs
+in a fresh subprocess so memory from one size doesn't leak into the next:
+
+    python benchmarks/bench_pipeline.py [--sizes 50 500 5000 50000] [--output results.json]
+    python benchmarks/bench_pipeline.py --compare baseline.json --output current.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_streaming_export import reset_peak, rss_mb
+
+SIZES = [50, 500, 5000, 50000]
+STAGES = [
+    'fetch_top_n',
+    'process_crypto_data',
+    'analyze_data',
+    'analyze_data_tick',
+    'SpreadsheetHandler._save_excel',
+    'SpreadsheetHandler._save_ods',
+    'CalcUpdater.update_data',
+    'CryptoReportGenerator.generate_report'
+]
+
+NOISE_FLOOR_SECONDS = 0.01
+
+class MarketsHandler(BaseHTTPRequestHandler):
+    """Serve pre-encoded /coins/markets pages"""
+    def do_GET(self):
+        query = {key: values[-1] for key, values in parse_qs(urlparse(self.path).query).items()}
+        per_page, page = int(query['per_page']), int(query['page'])
+        body = self.server.pages.get((per_page, page), b'[]')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub(coins, per_page):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MarketsHandler)
+    server.daemon_threads = True
+    server.pages = {
+        (per_page, page): json.dumps(coins[start:start + per_page]).encode()
+        for page, start in enumerate(range(0, len(coins), per_page), start=1)
+    }
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def measure(stage, fn, trace):
+    """Run fn once; return its result and a result row for the stage"""
+    baseline = rss_mb('VmRSS')
+    reset_peak()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    row = {
+        'stage': stage,
+        'seconds': round(elapsed, 4),
+        'peak_rss_delta_mb': round(max(0.0, rss_mb('VmHWM') - baseline), 1)
+    }
+    if trace:
+        row['peak_alloc_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+        tracemalloc.stop()
+    return result, row
+
+def run_size(coins_count, stages, trace):
+    from calc_updater import CalcUpdater
+    from crypto_analyzer import CryptoDataFetcher
+    from market_data import display_frame
+    from rate_limiter import TokenBucket
+    from report_generator import CryptoReportGenerator
+    from spreadsheet_handler import SpreadsheetHandler
+    from synthetic import synthetic_markets
+
+    coins = synthetic_markets(coins_count)
+    server = start_stub(coins, min(coins_count, CryptoDataFetcher.MAX_PER_PAGE))
+    fetcher = CryptoDataFetcher(
+        base_url=f"http://127.0.0.1:{server.server_address[1]}",
+        rate_limiter=TokenBucket(10 ** 6, burst=10 ** 4),
+        cache_dir=None,
+        cache_ttl=0,
+        bus_address=None
+    )
+    handler = SpreadsheetHandler()
+    calc = CalcUpdater()
+    generator = CryptoReportGenerator()
+
+    # The next tick: a tenth of the coins move
+    moved = [dict(coin) for coin in coins]
+    for coin in moved[::10]:
+        coin['current_price'] *= 1.01
+        coin['price_change_percentage_24h'] += 1.0
+
+    rows = []
+    def run(stage, fn):
+        if stage not in stages:
+            return None
+        result, row = measure(stage, fn, trace)
+        rows.append(dict(row, coins=coins_count))
+        return result
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Reports are written to the working directory
+        os.chdir(tmp)
+        handler.excel_file = os.path.join(tmp, 'bench.xlsm')
+        handler.ods_file = os.path.join(tmp, 'bench.ods')
+        calc.calc_file = os.path.join(tmp, 'bench_calc.ods')
+        calc.calc_path = calc.calc_file
+
+        data = run('fetch_top_n', lambda: fetcher.fetch_top_n(coins_count)) or coins
+        df = fetcher.process_crypto_data(data)
+        run('process_crypto_data', lambda: fetcher.process_crypto_data(data))
+        analysis = run('analyze_data', lambda: fetcher.analyze_data(df))
+        if analysis is None:
+            analysis = fetcher.analyze_data(df)
+        next_df = fetcher.process_crypto_data(moved)
+        run('analyze_data_tick', lambda: fetcher.analyze_data(next_df))
+
+        display = display_frame(df)
+        run('SpreadsheetHandler._save_excel', lambda: handler._save_excel(display, analysis))
+        run('SpreadsheetHandler._save_ods', lambda: handler._save_ods(display, analysis))
+        run('CalcUpdater.update_data', lambda: calc.update_data(display, analysis))
+        run('CryptoReportGenerator.generate_report', lambda: generator.generate_report(display, analysis))
+        os.chdir(ROOT)
+
+    server.shutdown()
+    calc.pipeline.close()
+    handler.pipeline.close()
+    return rows
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    import numpy
+    import pandas
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__
+    }
+
+def compare(baseline, results, threshold):
+    """Print stage timings against a baseline run; return the regressions"""
+    before = {(row['coins'], row['stage']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        old = before.get((row['coins'], row['stage']))
+        if old is None or not old['seconds']:
+            continue
+        ratio = row['seconds'] / old['seconds']
+        # Millisecond stages jitter by multiples; only count slowdowns above the noise floor
+        slower = ratio > threshold and row['seconds'] - old['seconds'] > NOISE_FLOOR_SECONDS
+        flag = '  REGRESSION' if slower else ''
+        print(f"{row['stage']:>40} {row['coins']:>6}  {old['seconds']:8.3f}s -> {row['seconds']:8.3f}s"
+              f"  x{ratio:.2f}{flag}", file=sys.stderr)
+        if flag:
+            regressions.append(row)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--trace', action='store_true',
+                        help='also record peak Python allocations with tracemalloc (slows stages down, '
+                             'so compare traced runs only with traced runs)')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results of an earlier run')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown ratio reported as a regression (default 1.25)')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_size(args.child, set(args.stages), args.trace)))
+        return
+
+    results = []
+    for size in args.sizes:
+        command = [sys.executable, os.path.abspath(__file__), '--child', str(size), '--stages', *args.stages]
+        if args.trace:
+            command.append('--trace')
+        output = subprocess.run(command, capture_output=True, text=True, check=True, cwd=ROOT).stdout
+        for row in json.loads(output.strip().splitlines()[-1]):
+            results.append(row)
+            print(f"{row['stage']:>40} {row['coins']:>6} coins  {row['seconds']:8.3f}s  "
+                  f"+{row['peak_rss_delta_mb']:.1f} MB peak RSS", file=sys.stderr)
+
+    report = {'meta': metadata(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Peak RSS and wall time of SpreadsheetHandler exports, in-memory vs streaming.
+
+Each case runs in a fresh subprocess so peak RSS is not shared between cases:
+
+    python benchmarks/bench_streaming_export.py [--rows 50 1000 10000]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def rss_mb(field):
+    """Read VmRSS/VmHWM from /proc, falling back to ru_maxrss"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def reset_peak():
+    """Reset VmHWM so the peak covers only the export (Linux only)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def run_case(mode, rows):
+    from crypto_analyzer import CryptoDataFetcher
+    from market_data import display_frame
+    from spreadsheet_handler import SpreadsheetHandler
+    from synthetic import synthetic_markets
+
+    fetcher = CryptoDataFetcher(cache_dir=None)
+    df = fetcher.process_crypto_data(synthetic_markets(rows))
+    analysis = fetcher.analyze_data(df)
+    df = display_frame(df)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        handler = SpreadsheetHandler(streaming=(mode == 'streaming'))
+        handler.excel_file = os.path.join(tmp, 'bench.xlsm')
+        handler.ods_file = os.path.join(tmp, 'bench.ods')
+        # Render one format at a time in this process so its memory is what we measure
+        handler.pipeline.max_workers = 1
+        targets = [('xlsm', handler.excel_file), ('ods', handler.ods_file)]
+
+        baseline = rss_mb('VmRSS')
+        reset_peak()
+        start = time.perf_counter()
+        if handler.streaming:
+            handler.pipeline.export_streaming(df, analysis, targets)
+        else:
+            from export_pipeline import build_cell_grid, render
+            grid = build_cell_grid(df, analysis)
+            for fmt, path in targets:
+                render(fmt, grid, path)
+        elapsed = time.perf_counter() - start
+        peak = rss_mb('VmHWM')
+
+    return {
+        'mode': mode,
+        'rows': rows,
+        'seconds': round(elapsed, 4),
+        'baseline_rss_mb': round(baseline, 1),
+        'peak_rss_mb': round(peak, 1),
+        'export_rss_mb': round(peak - baseline, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[50, 1000, 10000])
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'ROWS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(args.child[0], int(args.child[1]))))
+        return
+
+    results = []
+    for rows in args.rows:
+        for mode in ['in-memory', 'streaming']:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', mode, str(rows)],
+                capture_output=True, text=True, check=True, cwd=ROOT
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+            r = results[-1]
+            print(f"{r['mode']:>10} {r['rows']:>7} rows  {r['seconds']:8.3f}s  "
+                  f"peak {r['peak_rss_mb']:7.1f} MB  (+{r['export_rss_mb']:.1f} MB for export)",
+                  file=sys.stderr)
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import random
+
+def synthetic_markets(n, seed=42):
+    """Build an offline /coins/markets payload for n coins, ranked by market cap"""
+    rng = random.Random(seed)
+    coins = []
+    for rank in range(1, n + 1):
+        price = 60000.0 / rank ** 1.3 * rng.uniform(0.8, 1.2)
+        supply = rng.uniform(1e6, 1e10)
+        change = rng.gauss(0, 5)
+        ath = price * rng.uniform(1.0, 20.0)
+        coins.append({
+            'id': f'coin-{rank}',
+            'symbol': f'c{rank}',
+            'name': f'Coin {rank}',
+            'current_price': price,
+            'market_cap': int(price * supply),
+            'total_volume': int(price * supply * rng.uniform(0.01, 0.3)),
+            'price_change_percentage_24h': change,
+            'high_24h': price * (1 + abs(change) / 100),
+            'low_24h': price * (1 - abs(change) / 100),
+            'circulating_supply': supply,
+            'ath': ath,
+            'ath_change_percentage': (price / ath - 1) * 100,
+        })
+    # Rank order is market-cap order, as the API returns it
+    coins.sort(key=lambda coin: coin['market_cap'], reverse=True)
+    return coins
@@ -0,0 +1,135 @@
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from json_backend import get_decoder
+from metrics import API_ERRORS, API_RESPONSES, API_RETRIES, stage_timer
+from rate_limiter import TokenBucket
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def parse_retry_after(value):
+    """Convert a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class CoinGeckoClient:
+    def __init__(self, base_url="https://api.coingecko.com/api/v3", api_key=None, pool_size=10, timeout=30,
+                 rate_limiter=None, max_retries=5, backoff_base=1.0, backoff_max=60.0, cache=None,
+                 decoder=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key if api_key is not None else os.getenv('COINGECKO_API_KEY')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # Every request made through this client draws from the same bucket
+        if rate_limiter is None:
+            calls_per_minute = os.getenv('COINGECKO_CALLS_PER_MINUTE')
+            rate_limiter = TokenBucket.for_tier(
+                self.api_key,
+                int(calls_per_minute) if calls_per_minute else None
+            )
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.decode = decoder or get_decoder()
+
+        # One keep-alive session shared by every request (and every thread)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # Add API key to headers if available
+        if self.api_key:
+            self.session.headers['X-CG-API-KEY'] = self.api_key
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff delay for the given attempt"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _request(self, url, params=None, headers=None):
+        """Send a rate-limited GET, retrying 429/5xx and connection errors"""
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                reason = 'timeout' if isinstance(e, requests.Timeout) else 'connection'
+                if attempt >= self.max_retries:
+                    API_ERRORS.inc(reason=reason)
+                    raise
+                API_RETRIES.inc(reason=reason)
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            API_RESPONSES.inc(status=response.status_code)
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                API_RETRIES.inc(reason=response.status_code)
+                delay = parse_retry_after(response.headers.get('Retry-After'))
+                if response.status_code == 429:
+                    # Hold back every caller sharing the bucket, not just this one
+                    self.rate_limiter.pause(delay if delay is not None else self._backoff(attempt))
+                else:
+                    time.sleep(delay if delay is not None else self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code >= 400:
+                API_ERRORS.inc(reason=response.status_code)
+            response.raise_for_status()
+            return response
+
+    def _decode(self, content):
+        # Timed per page but not logged: a 50k-coin tick decodes 200 pages
+        with stage_timer('decode', log=False):
+            return self.decode(content)
+
+    def get(self, path, params=None, use_cache=True):
+        """GET a CoinGecko endpoint and return the decoded JSON body"""
+        url = f"{self.base_url}{path}"
+        if self.cache is None or not use_cache:
+            return self._decode(self._request(url, params).content)
+
+        key = self.cache.make_key(url, params)
+        with self.cache.lock_for(key):
+            entry = self.cache.get(key)
+            if entry is not None and self.cache.is_fresh(entry):
+                self.cache.record('hits', entry)
+                return entry['body']
+
+            response = self._request(url, params, self.cache.conditional_headers(entry))
+            if response.status_code == 304 and entry is not None:
+                self.cache.touch(key, entry)
+                self.cache.record('revalidated', entry)
+                return entry['body']
+
+            body = self._decode(response.content)
+            self.cache.store(
+                key,
+                body,
+                len(response.content),
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+            self.cache.record('misses')
+            return body
+
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
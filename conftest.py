@@ -0,0 +1,65 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _handle(self):
+        parsed = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        self.server.requests.append((self.command, parsed.path, query, dict(self.headers)))
+
+        route = self.server.routes.get((self.command, parsed.path)) or self.server.routes.get(parsed.path)
+        if route is None:
+            status, headers, payload = 404, {}, {'error': 'not found'}
+        else:
+            status, headers, payload = route(query, dict(self.headers), body)
+
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_PATCH = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    """Local HTTP server standing in for a remote API; set routes on server.routes"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.routes = {}
+    server.requests = []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def make_coin(rank):
+    """Build one synthetic /coins/markets entry"""
+    return {
+        'id': f'coin-{rank}',
+        'name': f'Coin {rank}',
+        'symbol': f'c{rank}',
+        'current_price': 1000.0 / rank,
+        'market_cap': 10_000_000 - rank,
+        'total_volume': 500_000 + rank,
+        'price_change_percentage_24h': (rank % 21) - 10.0,
+        'high_24h': 1100.0 / rank,
+        'low_24h': 900.0 / rank,
+        'circulating_supply': 1_000_000.0,
+        'ath': 2000.0 / rank,
+        'ath_change_percentage': -float(rank % 50),
+    }
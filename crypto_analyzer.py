@@ -1,124 +1,187 @@
+import logging
+import time
 import requests
 import pandas as pd
-from datetime import datetime
-import time
+from datetime import datetime, timedelta, timezone
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
+from coingecko_client import CoinGeckoClient
+from http_cache import ResponseCache
+from incremental_analyzer import IncrementalAnalyzer
+from market_data import display_frame, parse_markets
+from metrics import (
+    DEFAULT_PORT as DEFAULT_METRICS_PORT, EXPORT_LAG_SECONDS, EXPORT_QUEUE_DEPTH, FAST_INTERVAL_SECONDS,
+    FETCH_DRIFT_SECONDS, TICK_SECONDS, MetricsServer, log_event, stage_timer
+)
 from spreadsheet_handler import SpreadsheetHandler
 from report_generator import CryptoReportGenerator
+from request_planner import MAX_IDS_PER_CALL
+from rolling_analytics import RollingAnalytics
+from scheduler import AdaptiveInterval, BackgroundWorkers, FixedRateScheduler, TieredScheduler
+from share_publisher import SharePublisher
+from snapshot_bus import DEFAULT_BUS_ADDRESS, SnapshotPublisher
+from snapshot_store import SnapshotStore
 
 # Load environment variables
 load_dotenv()
 
 class CryptoDataFetcher:
-    def __init__(self):
-        self.base_url = "https://api.coingecko.com/api/v3"
+    MAX_PER_PAGE = 250  # CoinGecko's per_page ceiling for /coins/markets
+
+    def __init__(self, base_url="https://api.coingecko.com/api/v3", max_workers=8, rate_limiter=None,
+                 cache_dir=".http_cache", cache_ttl=60, history_dir="history", bus_address=DEFAULT_BUS_ADDRESS,
+                 export_workers=2, metrics_port=DEFAULT_METRICS_PORT, share_dirs=None):
+        self.base_url = base_url
         self.spreadsheet_handler = SpreadsheetHandler()
         self.report_generator = CryptoReportGenerator()
         self.api_key = os.getenv('COINGECKO_API_KEY')
+        self.max_workers = max_workers
+        self.client = CoinGeckoClient(
+            self.base_url,
+            self.api_key,
+            pool_size=max_workers,
+            rate_limiter=rate_limiter,
+            cache=ResponseCache(cache_dir, cache_ttl)
+        )
+        self._last_good_data = {}  # n -> last successfully fetched universe
+        self.last_fetch_stale = False
+        self.last_df = None  # newest snapshot, patched in place by price-only fast ticks
+        self.tracked_ids = []  # CoinGecko id of each row of last_df
+        self.snapshot_store = SnapshotStore(history_dir)
+        self.rolling_analytics = RollingAnalytics()
+        self.analyzer = IncrementalAnalyzer()
+        self.bus_address = bus_address
+        self.publisher = None
+        self._history_date = None
+        self.export_workers = export_workers
+        self.workers = None  # started by run()
+        self.metrics_port = metrics_port  # None disables the /metrics endpoint
+        self.metrics_server = None
+        # Network shares that mirror the spreadsheets, e.g. CRYPTO_SHARE_DIRS=/mnt/share1:/mnt/share2
+        if share_dirs is None:
+            share_dirs = [d for d in os.getenv('CRYPTO_SHARE_DIRS', '').split(os.pathsep) if d]
+        self.share_publisher = SharePublisher(share_dirs) if share_dirs else None
+
+    def _fetch_markets_page(self, page, per_page):
+        """Fetch a single page of /coins/markets"""
+        params = {
+            'vs_currency': 'usd',
+            'order': 'market_cap_desc',
+            'per_page': per_page,
+            'page': page,
+            'sparkline': False,
+            'price_change_percentage': '24h'
+        }
+        return self.client.get('/coins/markets', params=params)
+
+    def fetch_top_n(self, n):
+        """Fetch the top n cryptocurrencies, requesting all pages concurrently"""
+        per_page = min(n, self.MAX_PER_PAGE)
+        pages = -(-n // per_page)  # ceiling division
 
-    def fetch_top_50_crypto(self):
-        """Fetch top 50 cryptocurrencies data from CoinGecko API"""
         try:
-            endpoint = f"{self.base_url}/coins/markets"
-            params = {
-                'vs_currency': 'usd',
-                'order': 'market_cap_desc',
-                'per_page': 50,
-                'page': 1,
-                'sparkline': False,
-                'price_change_percentage': '24h'
-            }
-            
-            # Add API key to headers if available
-            headers = {}
-            if self.api_key:
-                headers['X-CG-API-KEY'] = self.api_key
-            
-            response = requests.get(endpoint, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            workers = min(pages, self.max_workers)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # map() yields results in page order, so the merge keeps rank order
+                results = executor.map(
+                    lambda page: self._fetch_markets_page(page, per_page),
+                    range(1, pages + 1)
+                )
+                data = [coin for page_data in results for coin in page_data]
+            self._last_good_data[n] = data[:n]
+            self.last_fetch_stale = False
+            return data[:n]
+        except (requests.RequestException, ValueError) as e:  # ValueError: undecodable body
             print(f"Error fetching data: {e}")
+            # Keep the loop alive through short outages with the last good snapshot
+            if n in self._last_good_data:
+                print("Reusing last good snapshot")
+                self.last_fetch_stale = True
+                return self._last_good_data[n]
             return None
 
-    def process_crypto_data(self, data):
-        """Process the raw API data into a pandas DataFrame"""
-        if not data:
+    def fetch_prices(self, ids):
+        """Latest USD price and 24h change per id from /simple/price; None on failure"""
+        prices = {}
+        try:
+            for start in range(0, len(ids), MAX_IDS_PER_CALL):
+                params = {
+                    'ids': ','.join(ids[start:start + MAX_IDS_PER_CALL]),
+                    'vs_currencies': 'usd',
+                    'include_24hr_change': 'true'
+                }
+                # The response cache's TTL is longer than a fast tick, so it is bypassed here
+                prices.update(self.client.get('/simple/price', params=params, use_cache=False))
+            return prices
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error fetching prices: {e}")
             return None
 
-        df = pd.DataFrame(data)
-        df = df[[
-            'name',
-            'symbol',
-            'current_price',
-            'market_cap',
-            'total_volume',
-            'price_change_percentage_24h',
-            'high_24h',
-            'low_24h',
-            'circulating_supply',
-            'ath',
-            'ath_change_percentage'
-        ]]
-        
-        # Store numeric values for sorting
-        df_numeric = df.copy()
-        
-        df.columns = [
-            'Cryptocurrency Name',
-            'Symbol',
-            'Current Price (USD)',
-            'Market Capitalization',
-            '24-hour Trading Volume',
-            'Price Change (24h %)',
-            '24h High',
-            '24h Low',
-            'Circulating Supply',
-            'All Time High',
-            'ATH Change %'
-        ]
-        
-        # Keep numeric values for analysis and report generation
-        df['Current Price (USD)'] = df_numeric['current_price']
-        df['Market Capitalization'] = df_numeric['market_cap']
-        df['24-hour Trading Volume'] = df_numeric['total_volume']
-        df['24h High'] = df_numeric['high_24h']
-        df['24h Low'] = df_numeric['low_24h']
-        df['All Time High'] = df_numeric['ath']
-        df['Circulating Supply'] = df_numeric['circulating_supply']
-        df['Price Change (24h %)'] = df_numeric['price_change_percentage_24h']
-        df['ATH Change %'] = df_numeric['ath_change_percentage']
-        
-        return df, df_numeric
+    def fetch_top_50_crypto(self):
+        """Fetch top 50 cryptocurrencies data from CoinGecko API"""
+        return self.fetch_top_n(50)
+
+    @staticmethod
+    def process_crypto_data(data):
+        """Process the raw API data into a typed pandas DataFrame keyed by API field names"""
+        # One typed frame per tick; display labels are applied only when exporting
+        return parse_markets(data)
 
-    def analyze_data(self, df, df_numeric):
+    def analyze_data(self, df):
         """Perform detailed analysis on the cryptocurrency data"""
         if df is None or df.empty:
             return None
 
-        # Reset index to start from 1 for all dataframes
-        df.index = df.index + 1
-        
-        analysis = {
-            'Top 5 by Market Cap': df.head()[
-                ['Cryptocurrency Name', 'Current Price (USD)', 'Market Capitalization', 'Price Change (24h %)', '24-hour Trading Volume']
-            ],
-            'Biggest Gainers': df.iloc[df_numeric['price_change_percentage_24h'].nlargest(3).index][
-                ['Cryptocurrency Name', 'Current Price (USD)', 'Price Change (24h %)']
-            ].reset_index(drop=True),
-            'Biggest Losers': df.iloc[df_numeric['price_change_percentage_24h'].nsmallest(3).index][
-                ['Cryptocurrency Name', 'Current Price (USD)', 'Price Change (24h %)']
-            ].reset_index(drop=True),
-            'Most Active': df.iloc[df_numeric['total_volume'].nlargest(3).index][
-                ['Cryptocurrency Name', '24-hour Trading Volume', 'Price Change (24h %)']
-            ].reset_index(drop=True),
-            'Closest to ATH': df.iloc[df_numeric['ath_change_percentage'].nlargest(3).index][
-                ['Cryptocurrency Name', 'Current Price (USD)', 'All Time High', 'ATH Change %']
-            ].reset_index(drop=True)
-        }
-        return analysis
+        # Only coins whose values changed since the last tick are re-ranked
+        return self.analyzer.update(df)
+
+    def record_snapshot(self, df):
+        """Append a freshly fetched snapshot to the history store"""
+        if self.last_fetch_stale or df is None:
+            return None
+        try:
+            path = self.snapshot_store.append(df)
+
+            # Merge yesterday's per-tick files once the date rolls over
+            today = datetime.utcnow().strftime('%Y-%m-%d')
+            if self._history_date is not None and self._history_date != today:
+                self.snapshot_store.compact(self._history_date)
+            self._history_date = today
+            return path
+        except Exception as e:
+            print(f"Error recording snapshot: {e}")
+            return None
+
+    def publish_snapshot(self, df, prices_only=False):
+        """Push a fresh snapshot to subscribers (monitor, alerting, ...) over the snapshot bus"""
+        if self.last_fetch_stale or df is None or not self.bus_address:
+            return 0
+        try:
+            if self.publisher is None:
+                self.publisher = SnapshotPublisher(self.bus_address)
+            return self.publisher.publish(df, prices_only=prices_only)
+        except Exception as e:
+            print(f"Error publishing snapshot: {e}")
+            return 0
+
+    def track(self, df):
+        """Remember a fresh full snapshot, and each row's CoinGecko id, for the fast ticks"""
+        if self.last_fetch_stale or df is None:
+            return
+        self.last_df = df
+        self.tracked_ids = df['id'].tolist()
+
+    def analyze_history(self, days=30):
+        """Rolling-window analysis sections computed over the stored history"""
+        try:
+            history = self.snapshot_store.query(start=datetime.now(timezone.utc) - timedelta(days=days),
+                                                columns=RollingAnalytics.COLUMNS)
+            return self.rolling_analytics.sections(history)
+        except Exception as e:
+            print(f"Error analyzing history: {e}")
+            return {}
 
     def update_spreadsheets(self, df, analysis):
         """Update both Excel and LibreOffice Calc files with the latest data"""
@@ -127,7 +190,10 @@ class CryptoDataFetcher:
 
         try:
             # Update both spreadsheet formats
-            self.spreadsheet_handler.update_data(df, analysis)
+            self.spreadsheet_handler.update_data(display_frame(df), analysis)
+            if self.share_publisher is not None:
+                self.share_publisher.publish(self.spreadsheet_handler.excel_file)
+                self.share_publisher.publish(self.spreadsheet_handler.ods_file)
             
             # Open files on first update
             if not hasattr(self, '_files_opened'):
@@ -139,59 +205,170 @@ class CryptoDataFetcher:
             print(f"Error updating spreadsheets: {e}")
             return False
 
-    def run(self, interval=300):  # 300 seconds = 5 minutes
+    def generate_report(self, df, analysis):
+        """Write the PDF report for one snapshot"""
+        try:
+            with stage_timer('pdf'):
+                report_file = self.report_generator.generate_report(display_frame(df), analysis)
+            print(f"\nGenerated report: {report_file}")
+            return report_file
+        except Exception as e:
+            print(f"Error generating report: {e}")
+            return None
+
+    def run(self, interval=300, top_n=50, fast_interval=None):  # 300 seconds = 5 minutes
         """Main function to run the crypto data fetching and analysis continuously"""
-        while True:
-            print(f"\nFetching data at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        # Fetches fire on a fixed-rate clock; slow exports run in the background and
+        # only ever render the newest snapshot, so they cannot push the next fetch back
+        if fast_interval:
+            # Price-only ticks in between full refreshes, paced by volatility and the quota
+            scheduler = TieredScheduler(interval, fast_interval)
+            full_scheduler = scheduler.full
+            adaptive = AdaptiveInterval(fast_interval, rate_limiter=self.client.rate_limiter)
+            full_rate = -(-top_n // min(top_n, self.MAX_PER_PAGE)) / interval
+        else:
+            scheduler = full_scheduler = FixedRateScheduler(interval)
+        self.workers = BackgroundWorkers(self.export_workers)
+        self.start_metrics_server()
+        try:
+            for kind in scheduler:
+                if kind == 'fast':
+                    move = self._fast_tick()
+                    calls = -(-len(self.tracked_ids) // MAX_IDS_PER_CALL)
+                    scheduler.fast_interval = adaptive.update(move, calls, full_rate)
+                    FAST_INTERVAL_SECONDS.set(scheduler.fast_interval)
+                    continue
+                start = time.perf_counter()
+                coins = self._tick(top_n)
+                seconds = time.perf_counter() - start
+                self.record_tick(seconds, coins, full_scheduler)
+                print(f"\n{self.workers.summary()}")
+                print(f"Fetch drift {full_scheduler.drift:.2f}s, {full_scheduler.missed} ticks skipped")
+                print(f"\nNext update in {full_scheduler.until_next():.0f} seconds...")
+        finally:
+            self.workers.close()
+            if self.share_publisher is not None:
+                self.share_publisher.close()
+            if self.metrics_server is not None:
+                self.metrics_server.close()
+                self.metrics_server = None
+
+    def start_metrics_server(self):
+        """Serve Prometheus metrics on localhost unless metrics_port is None"""
+        if self.metrics_port is None or self.metrics_server is not None:
+            return self.metrics_server
+        try:
+            self.metrics_server = MetricsServer(port=self.metrics_port)
+            print(f"Metrics at {self.metrics_server.url}")
+        except OSError as e:
+            print(f"Error starting metrics endpoint: {e}")
+        return self.metrics_server
+
+    def record_tick(self, seconds, coins, scheduler):
+        """Tick latency and export backlog as metrics and one structured log line"""
+        TICK_SECONDS.observe(seconds)
+        EXPORT_QUEUE_DEPTH.set(self.workers.queue_depth())
+        EXPORT_LAG_SECONDS.set(self.workers.lag())
+        FETCH_DRIFT_SECONDS.set(scheduler.drift)
+        log_event('tick', seconds=round(seconds, 4), coins=coins, stale=self.last_fetch_stale,
+                  drift=round(scheduler.drift, 4), missed=scheduler.missed,
+                  export_queue=self.workers.queue_depth(), export_lag=round(self.workers.lag(), 4))
+
+    def _fast_tick(self):
+        """Refresh prices of the tracked coins and publish them; no exports. Returns the largest % move"""
+        if self.last_df is None:
+            return None
+        with stage_timer('fast_fetch', coins=len(self.tracked_ids)):
+            prices = self.fetch_prices(self.tracked_ids)
+        if not prices:
+            return None
+
+        df = self.last_df.copy()
+        quotes = [prices.get(coin_id) or {} for coin_id in self.tracked_ids]
+        price = pd.to_numeric(pd.Series([q.get('usd') for q in quotes], index=df.index), errors='coerce')
+        change = pd.to_numeric(pd.Series([q.get('usd_24h_change') for q in quotes], index=df.index), errors='coerce')
+        move = ((price / df['current_price'] - 1).abs() * 100).max()
+        # Coins missing from the response keep their last full-refresh values
+        df['current_price'] = price.fillna(df['current_price'])
+        df['price_change_percentage_24h'] = change.fillna(df['price_change_percentage_24h']).astype('float32')
+        self.last_df = df
+        with stage_timer('publish', log=False):
+            self.publish_snapshot(df, prices_only=True)
+        move = 0.0 if pd.isna(move) else float(move)
+        log_event('fast_tick', coins=int(price.notna().sum()), move=round(move, 4))
+        return move
+
+    def _tick(self, top_n):
+        """One fetch-and-analyze pass; exports are handed to the background workers. Returns the coin count"""
+        print(f"\nFetching data at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        # Fetch and process data
+        with stage_timer('fetch', top_n=top_n):
+            data = self.fetch_top_n(top_n)
+        with stage_timer('process'):
+            df = self.process_crypto_data(data)
+        self.track(df)
+        
+        if df is not None:
+            # Notify subscribers first; they never wait on the spreadsheet writes
+            with stage_timer('publish'):
+                self.publish_snapshot(df)
+            
+            # Keep every fresh snapshot for historical analysis
+            with stage_timer('record'):
+                self.record_snapshot(df)
             
-            # Fetch and process data
-            raw_data = self.fetch_top_50_crypto()
-            df, df_numeric = self.process_crypto_data(raw_data)
+            # Perform analysis
+            with stage_timer('analyze'):
+                analysis = self.analyze_data(df)
+            with stage_timer('history'):
+                analysis.update(self.analyze_history())
             
-            if df is not None:
-                # Perform analysis
-                analysis = self.analyze_data(df, df_numeric)
-                
-                # Update spreadsheets
-                self.update_spreadsheets(df, analysis)
-                
-                # Debug column names
-                print("\nDataFrame columns:", df.columns.tolist())
-                
-                # Generate PDF report
-                report_file = self.report_generator.generate_report(df, analysis)
-                print(f"\nGenerated report: {report_file}")
-                
-                # Print analysis results with clear formatting
-                print("\n" + "="*100)
-                print(f"CRYPTOCURRENCY MARKET ANALYSIS - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                print("="*100)
-                
-                print("\n🏆 TOP 5 CRYPTOCURRENCIES BY MARKET CAP:")
-                print(analysis['Top 5 by Market Cap'].to_string())
-                
-                # Reset index to start from 1 for other sections
-                for section in ['Biggest Gainers', 'Biggest Losers', 'Most Active', 'Closest to ATH']:
-                    analysis[section].index = analysis[section].index + 1
-                
-                print("\n📈 BIGGEST GAINERS (24H):")
-                print(analysis['Biggest Gainers'].to_string())
-                
-                print("\n📉 BIGGEST LOSERS (24H):")
-                print(analysis['Biggest Losers'].to_string())
-                
-                print("\n🔄 MOST ACTIVE BY TRADING VOLUME:")
-                print(analysis['Most Active'].to_string())
-                
-                print("\n⭐ CLOSEST TO ALL-TIME HIGH:")
-                print(analysis['Closest to ATH'].to_string())
+            # Update spreadsheets and generate the PDF report off the fetch loop
+            self.workers.submit('spreadsheets', self.update_spreadsheets, df, analysis)
+            self.workers.submit('report', self.generate_report, df, analysis)
             
-            print(f"\nNext update in {interval} seconds...")
-            time.sleep(interval)
+            # Print analysis results with clear formatting
+            print("\n" + "="*100)
+            print(f"CRYPTOCURRENCY MARKET ANALYSIS - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            print("="*100)
+            
+            print("\n🏆 TOP 5 CRYPTOCURRENCIES BY MARKET CAP:")
+            print(analysis['Top 5 by Market Cap'].to_string())
+            
+            print("\n📈 BIGGEST GAINERS (24H):")
+            print(analysis['Biggest Gainers'].to_string())
+            
+            print("\n📉 BIGGEST LOSERS (24H):")
+            print(analysis['Biggest Losers'].to_string())
+            
+            print("\n🔄 MOST ACTIVE BY TRADING VOLUME:")
+            print(analysis['Most Active'].to_string())
+            
+            print("\n⭐ CLOSEST TO ALL-TIME HIGH:")
+            print(analysis['Closest to ATH'].to_string())
+            
+            for section in self.rolling_analytics.SECTIONS:
+                if section in analysis:
+                    print(f"\n📊 {section.upper()}:")
+                    print(analysis[section].to_string())
+        
+        print(f"\n{self.client.cache.summary()}")
+        return 0 if df is None else len(df)
 
 if __name__ == "__main__":
+    # Structured per-stage and per-tick lines, next to the console output
+    logging.basicConfig(
+        filename='crypto_metrics.log',
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    share_log = logging.FileHandler('network_share.log')
+    share_log.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    logging.getLogger('NetworkShare').addHandler(share_log)
     fetcher = CryptoDataFetcher()
     try:
-        fetcher.run()
+        # e.g. CRYPTO_FAST_INTERVAL=5 for price-only updates every ~5s between full refreshes
+        fetcher.run(fast_interval=float(os.getenv('CRYPTO_FAST_INTERVAL', 0)) or None)
     except KeyboardInterrupt:
         print("\nProgram terminated by user")
@@ -1,7 +1,9 @@
-import pandas as pd
 from O365 import Account
 import os
 from dotenv import load_dotenv
+from export_pipeline import build_cell_grid, render
+from metrics import stage_timer
+from onedrive_sync import OneDriveSync
 
 load_dotenv()
 
@@ -11,6 +13,7 @@ class ExcelUpdater:
         self.client_id = os.getenv('MICROSOFT_CLIENT_ID')
         self.client_secret = os.getenv('MICROSOFT_CLIENT_SECRET')
         self.share_link = None
+        self.sync = None  # created on first update, after authenticate()
         
     def authenticate(self):
         """Authenticate with Microsoft 365"""
@@ -29,33 +32,31 @@ class ExcelUpdater:
             print(f"Authentication Error: {e}")
             return False
             
-    def update_data(self, df, analysis):
+    def update_data(self, df, analysis, grid=None):
         """Update Excel file and upload to OneDrive"""
         try:
-            # Create Excel writer
-            with pd.ExcelWriter(self.excel_file, engine='openpyxl') as writer:
-                # Write main data
-                df.to_excel(writer, sheet_name='Live Data', index=False)
-                
-                # Write analysis data
-                start_row = 0
-                for title, data in analysis.items():
-                    # Write title
-                    data.to_excel(writer, sheet_name='Analysis', 
-                                startrow=start_row, index=False)
-                    start_row += len(data) + 3  # Add spacing between analyses
-            
-            # Upload to OneDrive
-            storage = self.account.storage()
-            my_drive = storage.get_default_drive()
-            
-            # Upload file
-            folder = my_drive.get_root_folder()
-            file = folder.upload_file(self.excel_file)
+            grid = grid or build_cell_grid(df, analysis)
+            if self.sync is None:
+                directory, name = os.path.split(self.excel_file)
+                self.sync = OneDriveSync(
+                    self._access_token,
+                    name,
+                    state_file=os.path.join(directory, f".{name}.onedrive.json")
+                )
+
+            # The workbook embeds its save time, so compare layouts rather than file bytes
+            digest = grid.digest()
+            if self.sync.is_current(digest) and os.path.exists(self.excel_file):
+                print("\nExcel data unchanged; skipped OneDrive upload")
+                self.share_link = self.sync.share_link()
+                return True
+
+            with stage_timer('export_xlsx', path=self.excel_file):
+                render('xlsx', grid, self.excel_file)
             
-            # Create shareable link
-            permission = file.share_with_link(share_type='view')
-            self.share_link = permission.share_link
+            # Upload to OneDrive; the drive item and share link are reused across ticks
+            self.sync.upload(self.excel_file, digest)
+            self.share_link = self.sync.share_link()
             
             print(f"\nData successfully updated in Excel")
             print(f"View live updates at: {self.share_link}")
@@ -65,6 +66,13 @@ class ExcelUpdater:
             print(f"Error updating Excel: {e}")
             return False
 
+    def _access_token(self):
+        """Current Microsoft Graph access token from the O365 session"""
+        connection = self.account.connection
+        if connection.token_backend.token.is_expired:
+            connection.refresh_token()
+        return connection.token_backend.token['access_token']
+
     def get_share_link(self):
         """Get the shareable link"""
         return self.share_link
@@ -0,0 +1,338 @@
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape, quoteattr
+
+import pandas as pd
+from odf.opendocument import OpenDocumentSpreadsheet
+from odf.style import Style, TextProperties
+from odf.table import Table, TableRow, TableCell
+from odf.text import P
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from metrics import record_stage, stage_timer
+
+class CellGrid:
+    """Spreadsheet layout as plain Python rows, shared by every output format"""
+    def __init__(self):
+        self.sheets = {}       # sheet name -> list of rows
+        self.header_rows = {}  # sheet name -> indices of rows rendered bold
+
+    def add_table(self, sheet, columns, rows, title=None):
+        """Append an optional title row, a header row and data rows to a sheet"""
+        sheet_rows = self.sheets.setdefault(sheet, [])
+        headers = self.header_rows.setdefault(sheet, [])
+        if title is not None:
+            sheet_rows.append([title])
+        headers.append(len(sheet_rows))
+        sheet_rows.append([str(column) for column in columns])
+        sheet_rows.extend(rows)
+
+    def digest(self):
+        """Content hash of the layout; identical ticks produce identical digests"""
+        payload = json.dumps([self.sheets, self.header_rows], default=str, separators=(',', ':'))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+def _clean(value):
+    """Blank out NaN/None so every format writes an empty cell"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
+
+def _widen_float32(df):
+    """Widen float32 columns through their shortest repr, so a stored 3.21 exports as 3.21"""
+    narrow = [column for column, dtype in df.dtypes.items() if dtype == 'float32']
+    if not narrow:
+        return df
+    df = df.copy(deep=False)
+    for column in narrow:
+        df[column] = df[column].astype(str).astype('float64')
+    return df
+
+def _table_rows(df):
+    return [[_clean(value) for value in row] for row in _widen_float32(df).to_numpy(dtype=object).tolist()]
+
+def build_cell_grid(df, analysis):
+    """Lay out the Live Data and Analysis sheets once"""
+    grid = CellGrid()
+    grid.add_table('Live Data', df.columns, _table_rows(df))
+    for title, data in analysis.items():
+        if grid.sheets.get('Analysis'):
+            grid.sheets['Analysis'].append([])  # Add spacing between analyses
+        grid.add_table('Analysis', data.columns, _table_rows(data), title=title.upper())
+    return grid
+
+def render_xlsx(grid, path):
+    """Write the grid as an Excel workbook"""
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    bold = Font(bold=True)
+    for name, rows in grid.sheets.items():
+        sheet = workbook.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+        for index in grid.header_rows.get(name, []):
+            for cell in sheet[index + 1]:
+                cell.font = bold
+    workbook.save(path)
+    return path
+
+def _ods_cell(value, style=None):
+    kwargs = {'stylename': style} if style is not None else {}
+    if value is None:
+        return TableCell(**kwargs)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        cell = TableCell(valuetype='string', **kwargs)
+    else:
+        cell = TableCell(valuetype='float', value=value, **kwargs)
+    cell.addElement(P(text=str(value)))
+    return cell
+
+def render_ods(grid, path):
+    """Write the grid as an OpenDocument spreadsheet"""
+    document = OpenDocumentSpreadsheet()
+    bold = Style(name='header', family='table-cell')
+    bold.addElement(TextProperties(fontweight='bold'))
+    document.automaticstyles.addElement(bold)
+    for name, rows in grid.sheets.items():
+        table = Table(name=name)
+        headers = set(grid.header_rows.get(name, []))
+        for index, row in enumerate(rows):
+            style = bold if index in headers else None
+            table_row = TableRow()
+            for value in row or [None]:
+                table_row.addElement(_ods_cell(value, style))
+            table.addElement(table_row)
+        document.spreadsheet.addElement(table)
+    document.save(path)
+    return path
+
+def iter_layout(df, analysis, chunk_size=5000):
+    """Yield (sheet, row, is_header) for the same layout as build_cell_grid, chunk by chunk"""
+    yield 'Live Data', [str(column) for column in df.columns], True
+    for start in range(0, len(df), chunk_size):
+        for row in _table_rows(df.iloc[start:start + chunk_size]):
+            yield 'Live Data', row, False
+    for position, (title, data) in enumerate(analysis.items()):
+        if position:
+            yield 'Analysis', [], False  # Add spacing between analyses
+        yield 'Analysis', [title.upper()], False
+        yield 'Analysis', [str(column) for column in data.columns], True
+        for row in _table_rows(data):
+            yield 'Analysis', row, False
+
+def frame_digest(df, analysis):
+    """Content hash computed column-wise from the frames, without laying out any rows"""
+    digest = hashlib.sha256()
+    for title, frame in [('Live Data', df)] + list(analysis.items()):
+        digest.update(json.dumps([title, [str(c) for c in frame.columns]]).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return 'stream:' + digest.hexdigest()
+
+def stream_xlsx(rows, path):
+    """Write (sheet, row, is_header) rows with openpyxl's constant-memory writer"""
+    workbook = Workbook(write_only=True)
+    bold = Font(bold=True)
+    sheets = {}
+    for name, row, is_header in rows:
+        sheet = sheets.get(name)
+        if sheet is None:
+            sheet = sheets[name] = workbook.create_sheet(name)
+        if is_header:
+            cells = []
+            for value in row:
+                cell = WriteOnlyCell(sheet, value=value)
+                cell.font = bold
+                cells.append(cell)
+            row = cells
+        sheet.append(row)
+    workbook.save(path)
+    return path
+
+ODS_MANIFEST = """<?xml version="1.0" encoding="UTF-8"?>
+<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">
+ <manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.spreadsheet"/>
+ <manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>
+</manifest:manifest>"""
+
+ODS_CONTENT_HEAD = """<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" \
+xmlns:style="urn:oasis:names:tc:opendocument:xmlns:style:1.0" \
+xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" \
+xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" \
+xmlns:fo="urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0" office:version="1.2">
+<office:automatic-styles><style:style style:name="header" style:family="table-cell">\
+<style:text-properties fo:font-weight="bold"/></style:style></office:automatic-styles>
+<office:body><office:spreadsheet>"""
+
+ODS_CONTENT_TAIL = "</office:spreadsheet></office:body></office:document-content>"
+
+def _ods_cell_xml(value, style):
+    if value is None:
+        return f"<table:table-cell{style}/>"
+    text = escape(str(value))
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return f'<table:table-cell{style} office:value-type="string"><text:p>{text}</text:p></table:table-cell>'
+    return (f'<table:table-cell{style} office:value-type="float" office:value="{value!r}">'
+            f'<text:p>{text}</text:p></table:table-cell>')
+
+def stream_ods(rows, path):
+    """Write (sheet, row, is_header) rows as ODS XML straight into the zip, one row at a time"""
+    with zipfile.ZipFile(path, 'w') as archive:
+        # The mimetype entry must come first and be stored uncompressed
+        archive.writestr(zipfile.ZipInfo('mimetype'), 'application/vnd.oasis.opendocument.spreadsheet')
+        archive.writestr('META-INF/manifest.xml', ODS_MANIFEST, compress_type=zipfile.ZIP_DEFLATED)
+        info = zipfile.ZipInfo('content.xml')
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with archive.open(info, 'w') as content:
+            content.write(ODS_CONTENT_HEAD.encode())
+            current = None
+            for name, row, is_header in rows:
+                if name != current:
+                    if current is not None:
+                        content.write(b"</table:table>")
+                    content.write(f"<table:table table:name={quoteattr(name)}>".encode())
+                    current = name
+                style = ' table:style-name="header"' if is_header else ''
+                cells = ''.join(_ods_cell_xml(value, style) for value in row or [None])
+                content.write(f"<table:table-row>{cells}</table:table-row>".encode())
+            if current is not None:
+                content.write(b"</table:table>")
+            content.write(ODS_CONTENT_TAIL.encode())
+    return path
+
+STREAMERS = {
+    'xlsx': stream_xlsx,
+    'xlsm': stream_xlsx,
+    'ods': stream_ods
+}
+
+def render_streaming(fmt, df, analysis, path):
+    """Render one format atomically without materializing the layout"""
+    return _atomic_write(path, lambda tmp_path: STREAMERS[fmt](iter_layout(df, analysis), tmp_path))
+
+RENDERERS = {
+    'xlsx': render_xlsx,
+    'xlsm': render_xlsx,
+    'ods': render_ods
+}
+
+def _atomic_write(path, write):
+    """Run write(tmp_path) and move the result over path in one rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    os.close(fd)
+    try:
+        # mkstemp creates 0600 files; keep the target readable like a normal write would
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+        os.chmod(tmp_path, mode)
+        write(tmp_path)
+        # Readers see either the old file or the new one, never a partial write
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+def render(fmt, grid, path):
+    """Render one format atomically; module-level so worker processes can run it"""
+    return _atomic_write(path, lambda tmp_path: RENDERERS[fmt](grid, tmp_path))
+
+def timed_render(fmt, grid, path):
+    """render() returning the seconds it took, timed wherever it runs (worker processes included)"""
+    start = time.perf_counter()
+    render(fmt, grid, path)
+    return time.perf_counter() - start
+
+def _digest_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.sha256")
+
+def read_digest(path):
+    """Digest recorded for the last content written to path, if the file still exists"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(_digest_path(path)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def file_digest(path):
+    """sha256 of a file's bytes, for files that were not written by this pipeline"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_digest(path, digest):
+    with open(_digest_path(path), 'w') as f:
+        f.write(digest)
+
+class ExportPipeline:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or len(set(RENDERERS.values()))
+        self.executor = None
+        self.lock = threading.Lock()  # export() may be called from several worker threads
+
+    def export(self, grid, targets):
+        """Render changed (format, path) targets; return {path: True if written}"""
+        digest = grid.digest()
+        changed = [(fmt, path) for fmt, path in targets if read_digest(path) != digest]
+        results = {path: False for _, path in targets}
+        if not changed:
+            return results
+
+        if len(changed) == 1:
+            fmt, path = changed[0]
+            with stage_timer(f'export_{fmt}', path=path):
+                render(fmt, grid, path)
+            write_digest(path, digest)
+            results[path] = True
+            return results
+
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        futures = {path: (fmt, self.executor.submit(timed_render, fmt, grid, path)) for fmt, path in changed}
+        # Wait for every format before raising, so no worker is left writing
+        errors = []
+        for path, (fmt, future) in futures.items():
+            try:
+                # Metrics live in this process, so worker timings are recorded here
+                record_stage(f'export_{fmt}', future.result(), path=path)
+                write_digest(path, digest)
+                results[path] = True
+            except Exception as e:
+                errors.append(f"{path}: {e}")
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        return results
+
+    def export_streaming(self, df, analysis, targets):
+        """Stream changed targets one at a time in this process, keeping memory flat"""
+        digest = frame_digest(df, analysis)
+        results = {}
+        for fmt, path in targets:
+            results[path] = read_digest(path) != digest
+            if results[path]:
+                with stage_timer(f'export_{fmt}', path=path):
+                    render_streaming(fmt, df, analysis, path)
+                write_digest(path, digest)
+        return results
+
+    def close(self):
+        """Shut down the worker processes"""
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from metrics import CACHE_LOOKUPS
+
+class ResponseCache:
+    def __init__(self, cache_dir=".http_cache", ttl=60):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.entries = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'bytes_saved': 0}
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(url, params=None):
+        """Cache key for an endpoint and its query parameters"""
+        raw = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def lock_for(self, key):
+        """Per-key lock so concurrent callers share one upstream fetch"""
+        with self.lock:
+            return self.locks.setdefault(key, threading.Lock())
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the newest entry for key from memory or disk, or None"""
+        entry = self.entries.get(key)
+        if self.cache_dir and (entry is None or not self.is_fresh(entry)):
+            # Another process may have refreshed the entry on disk
+            try:
+                with open(self._path(key)) as f:
+                    disk_entry = json.load(f)
+                if entry is None or disk_entry['fetched_at'] > entry['fetched_at']:
+                    entry = self.entries[key] = disk_entry
+            except (OSError, ValueError, KeyError):
+                pass
+        return entry
+
+    def is_fresh(self, entry):
+        """Whether an entry is still within its TTL"""
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    def conditional_headers(self, entry):
+        """If-None-Match / If-Modified-Since headers for revalidating an entry"""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, key, body, size, etag=None, last_modified=None):
+        """Save a fresh response in memory and on disk"""
+        entry = {
+            'fetched_at': time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'size': size,
+            'body': body
+        }
+        self.entries[key] = entry
+        self._write(key, entry)
+        return entry
+
+    def touch(self, key, entry):
+        """Restart the TTL of an entry the server confirmed is unchanged"""
+        entry['fetched_at'] = time.time()
+        self._write(key, entry)
+
+    def _write(self, key, entry):
+        if not self.cache_dir:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Error writing HTTP cache: {e}")
+
+    def record(self, outcome, entry=None):
+        """Count a hit, revalidation or miss"""
+        CACHE_LOOKUPS.inc(outcome=outcome)
+        with self.lock:
+            self.stats[outcome] += 1
+            if entry is not None and outcome != 'misses':
+                self.stats['bytes_saved'] += entry.get('size') or 0
+
+    def summary(self):
+        """One-line description of the hit/miss counters"""
+        s = self.stats
+        return (f"HTTP cache: {s['hits']} hits, {s['revalidated']} revalidated (304), "
+                f"{s['misses']} misses, {s['bytes_saved'] / 1024:,.1f} KiB saved")
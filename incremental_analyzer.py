@@ -0,0 +1,171 @@
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+
+# Raw API fields tracked per coin, with the labels used in the analysis sections
+FIELDS = [
+    'current_price',
+    'market_cap',
+    'total_volume',
+    'price_change_percentage_24h',
+    'ath',
+    'ath_change_percentage'
+]
+LABELS = {
+    'name': 'Cryptocurrency Name',
+    'current_price': 'Current Price (USD)',
+    'market_cap': 'Market Capitalization',
+    'total_volume': '24-hour Trading Volume',
+    'price_change_percentage_24h': 'Price Change (24h %)',
+    'ath': 'All Time High',
+    'ath_change_percentage': 'ATH Change %'
+}
+
+# Section title -> (ranking field, largest first, k, columns shown)
+SECTIONS = {
+    'Top 5 by Market Cap': ('market_cap', True, 5,
+                            ['name', 'current_price', 'market_cap', 'price_change_percentage_24h', 'total_volume']),
+    'Biggest Gainers': ('price_change_percentage_24h', True, 3,
+                        ['name', 'current_price', 'price_change_percentage_24h']),
+    'Biggest Losers': ('price_change_percentage_24h', False, 3,
+                       ['name', 'current_price', 'price_change_percentage_24h']),
+    'Most Active': ('total_volume', True, 3,
+                    ['name', 'total_volume', 'price_change_percentage_24h']),
+    'Closest to ATH': ('ath_change_percentage', True, 3,
+                       ['name', 'current_price', 'ath', 'ath_change_percentage'])
+}
+
+class TopK:
+    """Top-k coins by one value, kept in a heap with lazy deletion"""
+    def __init__(self, k, largest=True):
+        self.k = k
+        self.sign = -1 if largest else 1
+        self.heap = []
+        self.current = {}  # coin -> (value, rank) of its live heap entry
+
+    def update(self, coin, value, rank):
+        if value is None or math.isnan(value):
+            self.remove(coin)
+            return
+        self.current[coin] = (value, rank)
+        heapq.heappush(self.heap, (self.sign * value, rank, coin))
+        # Stale entries are skipped on read; rebuild once they dominate the heap
+        if len(self.heap) > 2 * len(self.current) + self.k:
+            self.heap = [(self.sign * v, r, c) for c, (v, r) in self.current.items()]
+            heapq.heapify(self.heap)
+
+    def remove(self, coin):
+        self.current.pop(coin, None)
+
+    def top(self):
+        """Coins currently in the top k, best first"""
+        result, valid = [], []
+        while self.heap and len(result) < self.k:
+            entry = heapq.heappop(self.heap)
+            key, rank, coin = entry
+            if self.current.get(coin) == (self.sign * key, rank) and coin not in result:
+                result.append(coin)
+                valid.append(entry)
+        for entry in valid:
+            heapq.heappush(self.heap, entry)
+        return result
+
+class IncrementalAnalyzer:
+    def __init__(self, sections=SECTIONS):
+        self.sections = sections
+        self.rankings = {
+            title: TopK(k, largest) for title, (field, largest, k, _) in sections.items()
+        }
+        self.rows = {}  # CoinGecko id -> {field: value}
+        self.totals = {field: 0.0 for field in FIELDS}
+        self.counts = {field: 0 for field in FIELDS}
+        self.prev_ids = pd.Index([])
+        self.prev_names = np.empty(0, dtype=object)
+        self.prev_values = np.empty((0, len(FIELDS)))
+        self.last_changed = 0
+        self.dtypes = {}  # source dtype per field, restored in the analysis tables
+
+    def _apply(self, coin, row, sign):
+        """Add (sign=1) or subtract (sign=-1) a coin's values from the running totals"""
+        for field in FIELDS:
+            value = row[field]
+            if not math.isnan(value):
+                self.totals[field] += sign * value
+                self.counts[field] += sign
+
+    def update(self, df):
+        """Fold a new snapshot into the state, touching only coins whose values changed"""
+        # Coins are keyed by CoinGecko id; names and symbols repeat across coins
+        if df['id'].duplicated().any():
+            df = df.drop_duplicates('id')
+        ids = df['id'].to_numpy()
+        names = df['name'].to_numpy()
+        self.dtypes = {field: df[field].dtype for field in FIELDS}
+        values = df[FIELDS].to_numpy(dtype=float)
+
+        # Line up each coin with its previous row (-1 for new coins). Position is left out of
+        # the comparison so one coin moving up the list doesn't reprocess every coin below it.
+        previous = self.prev_ids.get_indexer(ids)
+        known = previous >= 0
+        if len(self.prev_values):
+            prev_rows = self.prev_values[np.where(known, previous, 0)]
+            renamed = names != self.prev_names[np.where(known, previous, 0)]
+        else:
+            prev_rows, renamed = values, np.zeros(len(ids), dtype=bool)
+        same = (values == prev_rows) | (np.isnan(values) & np.isnan(prev_rows))
+        changed = np.flatnonzero(~known | ~same.all(axis=1) | renamed)
+
+        current = pd.Index(ids)
+        removed = self.prev_ids.difference(current)
+        for coin in removed:
+            self._apply(coin, self.rows.pop(coin), -1)
+            for ranking in self.rankings.values():
+                ranking.remove(coin)
+
+        for i in changed:
+            coin = ids[i]
+            if coin in self.rows:
+                self._apply(coin, self.rows[coin], -1)
+            row = dict(zip(FIELDS, values[i].tolist()))
+            row['name'] = names[i]
+            row['rank'] = int(i)  # position at the coin's last change; only breaks ties
+            self.rows[coin] = row
+            self._apply(coin, row, 1)
+            for title, (field, _, _, _) in self.sections.items():
+                self.rankings[title].update(coin, row[field], row['rank'])
+
+        self.prev_ids = current
+        self.prev_names = names
+        self.prev_values = values
+        self.last_changed = len(changed) + len(removed)
+        return self.analysis()
+
+    def analysis(self):
+        """Build the analysis sections from the current top-k state"""
+        analysis = {}
+        for title, (_, _, _, columns) in self.sections.items():
+            coins = self.rankings[title].top()
+            table = pd.DataFrame(
+                [[self.rows[coin][field] for field in columns] for coin in coins],
+                columns=[LABELS[field] for field in columns],
+                index=range(1, len(coins) + 1)
+            )
+            # Keep fields looking like the source data (whole-number market caps, float32 percentages)
+            for field in columns[1:]:
+                if field in self.dtypes:
+                    table[LABELS[field]] = table[LABELS[field]].astype(self.dtypes[field])
+            analysis[title] = table
+        return analysis
+
+    def summary(self):
+        """Running market totals and averages"""
+        def mean(field):
+            return self.totals[field] / self.counts[field] if self.counts[field] else float('nan')
+        return {
+            'Total Market Cap': self.totals['market_cap'],
+            'Average Price': mean('current_price'),
+            'Average 24h Volume': mean('total_volume'),
+            'Average Price Change': mean('price_change_percentage_24h')
+        }
@@ -0,0 +1,22 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # the stdlib parser is always available
+    orjson = None
+
+def _stdlib_loads(payload):
+    return json.loads(payload)
+
+# Decoder name -> loads(bytes) callable
+DECODERS = {'json': _stdlib_loads}
+if orjson is not None:
+    DECODERS['orjson'] = orjson.loads
+
+def get_decoder(name=None):
+    """loads() for the named backend, CRYPTO_JSON_DECODER, or the fastest one installed"""
+    name = name or os.getenv('CRYPTO_JSON_DECODER') or ('orjson' if 'orjson' in DECODERS else 'json')
+    if name not in DECODERS:
+        raise ValueError(f"Unknown JSON decoder {name!r}; available: {', '.join(sorted(DECODERS))}")
+    return DECODERS[name]
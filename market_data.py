@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+# /coins/markets field -> (display label, in-memory dtype). 'integer' columns are int64 when
+# every value is a whole number and float64 otherwise, matching how pandas reads the JSON.
+# Percentages only need float32's ~7 significant digits; prices, caps and supply keep float64.
+# Symbols repeat across coins and are categorical; ids and names stay plain strings.
+# The CoinGecko id is the only stable coin key (symbols and names both repeat), so it is
+# kept for joins but has no display label and is not exported.
+MARKET_SCHEMA = {
+    'id': (None, 'object'),
+    'name': ('Cryptocurrency Name', 'object'),
+    'symbol': ('Symbol', 'category'),
+    'current_price': ('Current Price (USD)', 'float64'),
+    'market_cap': ('Market Capitalization', 'integer'),
+    'total_volume': ('24-hour Trading Volume', 'integer'),
+    'price_change_percentage_24h': ('Price Change (24h %)', 'float32'),
+    'high_24h': ('24h High', 'float64'),
+    'low_24h': ('24h Low', 'float64'),
+    'circulating_supply': ('Circulating Supply', 'float64'),
+    'ath': ('All Time High', 'float64'),
+    'ath_change_percentage': ('ATH Change %', 'float32')
+}
+DISPLAY_LABELS = {field: label for field, (label, _) in MARKET_SCHEMA.items() if label}
+
+# A coin without these is useless downstream and is dropped
+REQUIRED_FIELDS = {'id', 'name', 'symbol', 'current_price'}
+
+def _numeric(values):
+    """float64 array of values plus a mask of entries that were present but not numbers"""
+    try:
+        array = np.array(values, dtype='float64')  # fast path: numbers and None (-> NaN) only
+        if array.ndim == 1:
+            return array, np.zeros(len(array), dtype=bool)
+    except (TypeError, ValueError):
+        pass
+    raw = pd.Series(values, dtype=object)
+    array = pd.to_numeric(raw, errors='coerce').to_numpy(dtype='float64')
+    return array, np.isnan(array) & raw.notna().to_numpy()
+
+def _typed(array, dtype):
+    if dtype == 'object':
+        return array
+    if dtype == 'category':
+        return pd.Categorical(array)
+    if dtype == 'integer':
+        if len(array) and not np.isnan(array).any() and (array == np.floor(array)).all():
+            return array.astype('int64')
+        return array
+    return array.astype(dtype, copy=False)
+
+def parse_markets(data):
+    """Build the typed snapshot frame from /coins/markets records, dropping malformed coins"""
+    if not data:
+        return None
+    records = [record for record in data if isinstance(record, dict)]
+    if not records:
+        print(f"Dropped {len(data)} malformed coins: no usable records")
+        return None
+
+    # The schema is checked once per payload instead of per column
+    absent = [field for field in MARKET_SCHEMA
+              if field not in records[0] and all(field not in record for record in records)]
+    if absent:
+        print(f"Warning: /coins/markets records have no {absent}; leaving them blank")
+
+    # Pull out only the fields we use, one column at a time, and validate each column in bulk
+    arrays = {}
+    drop = np.zeros(len(records), dtype=bool)
+    for field, (_, dtype) in MARKET_SCHEMA.items():
+        values = [record.get(field) for record in records]
+        if dtype in ('object', 'category'):
+            array = np.array(values, dtype=object)
+            missing = np.fromiter((not (isinstance(v, str) and v) for v in values), bool, len(values))
+            array[missing] = None
+        else:
+            array, malformed = _numeric(values)
+            drop |= malformed
+            missing = np.isnan(array)
+        if field in REQUIRED_FIELDS:
+            drop |= missing
+        arrays[field] = array
+
+    bad = [records[i].get('id') or records[i].get('name') or f'#{i}' for i in np.flatnonzero(drop)]
+    bad += ['non-object record'] * (len(data) - len(records))
+    if bad:
+        print(f"Dropped {len(bad)} malformed coins: {', '.join(map(str, bad[:10]))}")
+    if drop.any():
+        keep = ~drop
+        if not keep.any():
+            return None
+        arrays = {field: array[keep] for field, array in arrays.items()}
+
+    # copy=False keeps one block per column instead of consolidating them into a second copy
+    return pd.DataFrame({
+        field: _typed(arrays[field], dtype)
+        for field, (_, dtype) in MARKET_SCHEMA.items()
+    }, copy=False)
+
+def currency_label(label, vs_currency='usd'):
+    """A display label quoted in vs_currency instead of USD"""
+    return label.replace('(USD)', f'({vs_currency.upper()})')
+
+def display_frame(df, vs_currency='usd'):
+    """The snapshot with its display labels; a relabelled view, not a copy of the data"""
+    return pd.DataFrame({
+        currency_label(label, vs_currency): df[field] for field, label in DISPLAY_LABELS.items()
+    }, copy=False)
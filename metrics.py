@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = int(os.getenv('CRYPTO_METRICS_PORT', 9108))
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+logger = logging.getLogger('CryptoMetrics')
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}  # label values -> state
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.extend(self._samples(key, value))
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}"]
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.setdefault(key, {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def summary(self, **labels):
+        """(count, sum) of the observations for one label set"""
+        with self.lock:
+            state = self.values.get(self._key(labels))
+            return (state['count'], state['sum']) if state else (0, 0.0)
+
+    def _samples(self, key, state):
+        lines = [
+            f"{self.name}_bucket{_format_labels(self.labels, key, [('le', bound)])} {count}"
+            for bound, count in zip(self.buckets, state['counts'])
+        ]
+        lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', '+Inf')])} {state['count']}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {state['sum']}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {state['count']}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, *args, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets)
+
+    def render(self):
+        """Prometheus text exposition format"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram('crypto_stage_seconds', 'Time spent in each pipeline stage', ['stage'])
+TICK_SECONDS = REGISTRY.histogram('crypto_tick_seconds', 'Wall time of one fetch-and-analyze tick')
+API_RESPONSES = REGISTRY.counter('crypto_api_responses_total', 'CoinGecko responses by HTTP status', ['status'])
+API_RETRIES = REGISTRY.counter('crypto_api_retries_total', 'Retried CoinGecko requests', ['reason'])
+API_ERRORS = REGISTRY.counter('crypto_api_errors_total', 'CoinGecko requests that failed for good', ['reason'])
+CACHE_LOOKUPS = REGISTRY.counter('crypto_http_cache_total', 'HTTP cache lookups by outcome', ['outcome'])
+EXPORT_QUEUE_DEPTH = REGISTRY.gauge('crypto_export_queue_depth', 'Export jobs waiting for a worker')
+EXPORT_LAG_SECONDS = REGISTRY.gauge('crypto_export_lag_seconds', 'Age of the oldest snapshot not yet exported')
+FETCH_DRIFT_SECONDS = REGISTRY.gauge('crypto_fetch_drift_seconds', 'How late the last fetch fired')
+FAST_INTERVAL_SECONDS = REGISTRY.gauge('crypto_fast_interval_seconds', 'Current spacing of price-only fast ticks')
+
+def log_event(event, **fields):
+    """One structured (JSON) log line"""
+    logger.info(json.dumps({'event': event, **fields}, default=str))
+
+def record_stage(stage, seconds, log=True, **fields):
+    """Add one timing to crypto_stage_seconds and, unless log is False, the structured log"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    if log:
+        log_event('stage', stage=stage, seconds=round(seconds, 4), **fields)
+
+@contextmanager
+def stage_timer(stage, log=True, **fields):
+    """Time a block as one pipeline stage"""
+    start = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - start, log, ok=ok, **fields)
+
+class MetricsServer:
+    """Serve a registry at http://host:port/metrics from a daemon thread"""
+    def __init__(self, registry=REGISTRY, host='127.0.0.1', port=DEFAULT_PORT):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.address = self.server.server_address[:2]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://{self.address[0]}:{self.address[1]}/metrics"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
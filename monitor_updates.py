@@ -1,35 +1,159 @@
-import pandas as pd
+import os
+import queue
+import sys
 import time
+import pandas as pd
 from datetime import datetime
+from alert_engine import AlertEngine, ConsoleSink, LogSink, WebhookSink, load_rules
+from snapshot_bus import DEFAULT_BUS_ADDRESS, SnapshotSubscriber
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # fall back to cheap stat() polling
+    Observer = None
+
+class FileWatcher:
+    """Wait for files to change, via inotify (watchdog) when available or stat() polling"""
+    def __init__(self, files, poll_interval=0.5, use_events=True):
+        self.files = [os.path.abspath(file) for file in files]
+        self.poll_interval = poll_interval
+        self.signatures = {file: self._signature(file) for file in self.files}
+        self.events = None
+        if use_events and Observer is not None:
+            self._start_observer()
+
+    @staticmethod
+    def _signature(file):
+        # Atomic writes replace the inode, in-place writes change mtime/size
+        try:
+            st = os.stat(file)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _start_observer(self):
+        self.events = queue.Queue()
+        watched = set(self.files)
+        events = self.events
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                for path in (getattr(event, 'dest_path', None), event.src_path):
+                    if path and os.path.abspath(path) in watched:
+                        events.put(os.path.abspath(path))
+
+        self.observer = Observer()
+        for directory in {os.path.dirname(file) for file in self.files}:
+            self.observer.schedule(Handler(), directory, recursive=False)
+        self.observer.daemon = True
+        self.observer.start()
+
+    def changed(self):
+        """Files whose content changed since the last call"""
+        changed = []
+        for file in self.files:
+            signature = self._signature(file)
+            if signature != self.signatures[file]:
+                self.signatures[file] = signature
+                if signature is not None:
+                    changed.append(file)
+        return changed
+
+    def wait(self, timeout=None):
+        """Block until at least one file changed (or timeout); return the changed files"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if self.events is not None:
+                try:
+                    self.events.get(timeout=remaining)
+                except queue.Empty:
+                    return []
+                # Let a burst of events for one write settle before reading
+                time.sleep(0.05)
+                while not self.events.empty():
+                    self.events.get_nowait()
+            else:
+                time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+            changed = self.changed()
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
 
 def read_price_data(file):
     try:
-        if file.endswith('.xlsx'):
-            df = pd.read_excel(file, sheet_name='Live Data')
-        else:
-            df = pd.read_excel(file, sheet_name='Live Data', engine='odf')
-        return df['Current Price (USD)'].head(3).to_dict()
+        engine = None if file.endswith(('.xlsx', '.xlsm')) else 'odf'
+        df = pd.read_excel(
+            file,
+            sheet_name='Live Data',
+            engine=engine,
+            usecols=['Cryptocurrency Name', 'Current Price (USD)']
+        )
+        return dict(zip(df['Cryptocurrency Name'], df['Current Price (USD)']))
     except Exception as e:
         print(f"Error reading {file}: {e}")
         return None
 
-def monitor_price_changes():
-    files = ['crypto_data.xlsx', 'crypto_data.ods']
-    last_prices = {file: None for file in files}
-    
+def diff_prices(old, new):
+    """(coin, old price, new price) for every coin that changed, appeared or disappeared"""
+    changes = []
+    for coin in new.keys() | old.keys():
+        before, after = old.get(coin), new.get(coin)
+        if before != after and not (pd.isna(before) and pd.isna(after)):
+            changes.append((coin, before, after))
+    return sorted(changes, key=lambda change: str(change[0]))
+
+def monitor_price_changes(files=None):
+    files = files or ['crypto_data.xlsx', 'crypto_data.ods']
+    watcher = FileWatcher(files)
+    last_prices = {file: read_price_data(file) if os.path.exists(file) else None for file in watcher.files}
+
     while True:
-        for file in files:
+        # Sleeps until a file is actually rewritten instead of re-parsing on a timer
+        for file in watcher.wait():
             current_prices = read_price_data(file)
-            if current_prices:
-                if last_prices[file] and current_prices != last_prices[file]:
-                    print(f"\n{datetime.now()} - {file} updated!")
+            if current_prices is None:
+                continue
+            if last_prices[file] is not None:
+                changes = diff_prices(last_prices[file], current_prices)
+                if changes:
+                    print(f"\n{datetime.now()} - {os.path.basename(file)} updated!")
                     print("Price changes detected:")
-                    for coin, price in current_prices.items():
-                        if last_prices[file][coin] != price:
-                            print(f"  {coin}: {last_prices[file][coin]} -> {price}")
-                last_prices[file] = current_prices
-        time.sleep(30)  # Check every 30 seconds
+                    for coin, before, after in changes:
+                        print(f"  {coin}: {before} -> {after}")
+            last_prices[file] = current_prices
+
+def monitor_snapshot_bus(address=DEFAULT_BUS_ADDRESS):
+    """Follow prices straight from CryptoDataFetcher's snapshot bus, no spreadsheet parsing"""
+    last_prices = None
+    for snapshot in SnapshotSubscriber(address):
+        current_prices = dict(zip(snapshot['name'], snapshot['current_price']))
+        if last_prices is not None:
+            changes = diff_prices(last_prices, current_prices)
+            if changes:
+                published_at = snapshot.attrs.get('published_at', datetime.now())
+                print(f"\n{published_at} - new snapshot published!")
+                print("Price changes detected:")
+                for coin, before, after in changes:
+                    print(f"  {coin}: {before} -> {after}")
+        last_prices = current_prices
+
+def monitor_alerts(rules_file, address=DEFAULT_BUS_ADDRESS):
+    """Evaluate alert rules on every snapshot published on the bus"""
+    sinks = [ConsoleSink(), LogSink()]
+    if os.getenv('CRYPTO_ALERT_WEBHOOK'):
+        sinks.append(WebhookSink(os.getenv('CRYPTO_ALERT_WEBHOOK')))
+    engine = AlertEngine(load_rules(rules_file), sinks)
+    print(f"Loaded {len(engine.rules)} alert rules from {rules_file}")
+    for snapshot in SnapshotSubscriber(address):
+        published_at = snapshot.attrs.get('published_at')
+        engine.evaluate(snapshot, published_at.timestamp() if published_at else None)
 
 if __name__ == "__main__":
     print("Monitoring price updates... (Press Ctrl+C to stop)")
-    monitor_price_changes()
+    if sys.argv[1:2] == ['--bus']:
+        monitor_snapshot_bus(*sys.argv[2:3])
+    elif sys.argv[1:2] == ['--alerts'] and len(sys.argv) > 2:
+        monitor_alerts(*sys.argv[2:4])
+    else:
+        monitor_price_changes(sys.argv[1:])
@@ -0,0 +1,169 @@
+import json
+import os
+import random
+import tempfile
+import time
+from urllib.parse import quote
+
+import requests
+
+from coingecko_client import RETRY_STATUSES, parse_retry_after
+from export_pipeline import file_digest
+from metrics import REGISTRY, stage_timer
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+
+ONEDRIVE_SYNCS = REGISTRY.counter('crypto_onedrive_syncs_total', 'OneDrive syncs by outcome', ['outcome'])
+ONEDRIVE_RETRIES = REGISTRY.counter('crypto_onedrive_retries_total', 'Retried Microsoft Graph requests', ['reason'])
+
+class OneDriveSync:
+    """Keep one OneDrive file in step with a local file, uploading only when its content changed"""
+    SIMPLE_UPLOAD_LIMIT = 4 * 2 ** 20   # Graph rejects single-request uploads above 4 MiB
+    CHUNK_SIZE = 10 * 320 * 1024        # upload session chunks must be multiples of 320 KiB
+
+    def __init__(self, token, remote_path, base_url=GRAPH_URL, state_file=None, timeout=60, max_retries=5,
+                 backoff_base=1.0, backoff_max=60.0, chunk_size=CHUNK_SIZE, simple_upload_limit=SIMPLE_UPLOAD_LIMIT):
+        self.token = token  # access token, or a callable returning a current one
+        self.remote_path = remote_path.strip('/')
+        self.base_url = base_url.rstrip('/')
+        self.state_file = state_file
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.chunk_size = chunk_size
+        self.simple_upload_limit = simple_upload_limit
+        self.session = requests.Session()
+        # Drive item id, share link and digest of the last upload survive restarts
+        self.state = {'item_id': None, 'share_link': None, 'digest': None}
+        self._load_state()
+
+    def _load_state(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file) as f:
+                self.state.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def _save_state(self):
+        if not self.state_file:
+            return
+        directory = os.path.dirname(os.path.abspath(self.state_file))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.state, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            print(f"Error saving OneDrive state: {e}")
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff delay for the given attempt"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _request(self, method, url, auth=True, accept=(), **kwargs):
+        """Send a Graph request, retrying throttling, 5xx and connection errors"""
+        headers = kwargs.pop('headers', {})
+        if auth:
+            token = self.token() if callable(self.token) else self.token
+            headers = dict(headers, Authorization=f"Bearer {token}")
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                ONEDRIVE_RETRIES.inc(reason='connection')
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                ONEDRIVE_RETRIES.inc(reason=response.status_code)
+                delay = parse_retry_after(response.headers.get('Retry-After'))
+                time.sleep(delay if delay is not None else self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code not in accept:
+                response.raise_for_status()
+            return response
+
+    def _item_url(self, action):
+        """URL of the cached drive item, or of the remote path before the first upload"""
+        if self.state['item_id']:
+            return f"{self.base_url}/me/drive/items/{self.state['item_id']}/{action}"
+        return f"{self.base_url}/me/drive/root:/{quote(self.remote_path)}:/{action}"
+
+    def is_current(self, digest):
+        """Whether OneDrive already holds content with this digest"""
+        return digest is not None and self.state['item_id'] is not None and self.state['digest'] == digest
+
+    def upload(self, path, digest=None):
+        """Upload path unless its digest matches the last upload; return True if it was uploaded"""
+        digest = digest or file_digest(path)
+        if self.is_current(digest):
+            ONEDRIVE_SYNCS.inc(outcome='skipped')
+            return False
+
+        with stage_timer('onedrive_upload', path=path):
+            try:
+                item = self._upload(path)
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 404 or not self.state['item_id']:
+                    ONEDRIVE_SYNCS.inc(outcome='failed')
+                    raise
+                # The cached item was deleted or moved; upload by path and share it again
+                self.state.update(item_id=None, share_link=None)
+                item = self._upload(path)
+            except requests.RequestException:
+                ONEDRIVE_SYNCS.inc(outcome='failed')
+                raise
+
+        self.state.update(item_id=item['id'], digest=digest)
+        self._save_state()
+        ONEDRIVE_SYNCS.inc(outcome='uploaded')
+        return True
+
+    def _upload(self, path):
+        size = os.path.getsize(path)
+        if size <= self.simple_upload_limit:
+            with open(path, 'rb') as f:
+                return self._request('PUT', self._item_url('content'), data=f.read()).json()
+        return self._upload_session(path, size)
+
+    def _upload_session(self, path, size):
+        """Resumable chunked upload for workbooks too large for a single PUT"""
+        session = self._request('POST', self._item_url('createUploadSession'),
+                                json={'item': {'@microsoft.graph.conflictBehavior': 'replace'}}).json()
+        upload_url = session['uploadUrl']
+        start = 0
+        with open(path, 'rb') as f:
+            while True:
+                f.seek(start)
+                chunk = f.read(self.chunk_size)
+                # The upload URL is pre-authorized; Graph rejects it with a bearer token attached
+                response = self._request(
+                    'PUT', upload_url, auth=False, accept=(416,), data=chunk,
+                    headers={'Content-Range': f"bytes {start}-{start + len(chunk) - 1}/{size}"}
+                )
+                if response.status_code in (200, 201):
+                    return response.json()
+                if response.status_code == 416:
+                    # A retried chunk had already arrived; ask the session where to carry on
+                    response = self._request('GET', upload_url, auth=False)
+                start = int(response.json()['nextExpectedRanges'][0].split('-')[0])
+
+    def share_link(self):
+        """View link for the uploaded file, created once and then reused"""
+        if self.state['share_link'] is None and self.state['item_id']:
+            response = self._request('POST', self._item_url('createLink'), json={'type': 'view', 'scope': 'anonymous'})
+            self.state['share_link'] = response.json()['link']['webUrl']
+            self._save_state()
+        return self.state['share_link']
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+
+# Calls per minute by key tier; override with COINGECKO_CALLS_PER_MINUTE
+FREE_TIER_CALLS_PER_MINUTE = 10
+KEYED_TIER_CALLS_PER_MINUTE = 30
+
+class TokenBucket:
+    def __init__(self, calls_per_minute, burst=None):
+        self.rate = calls_per_minute / 60.0  # tokens per second
+        self.capacity = burst if burst is not None else max(1, calls_per_minute // 6)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def for_tier(cls, api_key=None, calls_per_minute=None):
+        """Build a bucket sized to the free or keyed CoinGecko tier"""
+        if calls_per_minute is None:
+            calls_per_minute = KEYED_TIER_CALLS_PER_MINUTE if api_key else FREE_TIER_CALLS_PER_MINUTE
+        return cls(calls_per_minute)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens without blocking; return the seconds to wait if not available"""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self._refill(now)
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        """Wait for tokens without blocking the event loop"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds` (e.g. after a Retry-After)"""
+        with self.lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            # Whatever was banked before the server pushed back is no longer trustworthy
+            self.tokens = 0.0
+            self.updated = max(now, self.paused_until)
+
+    def available(self):
+        """Current number of tokens in the bucket"""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return 0.0
+            self._refill(now)
+            return self.tokens
@@ -1,19 +1,35 @@
+import copy
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from fpdf import FPDF
+from PIL import Image
 from datetime import datetime
-import os
 
 class CryptoReportGenerator:
     def __init__(self):
-        self.pdf = FPDF()
-        self.pdf.set_auto_page_break(auto=True, margin=15)
-        self.pdf.add_page()
+        # Page setup, fonts and the static title are laid out once; every report
+        # starts from a copy so nothing carries over from the previous run
+        self.template = self._build_template()
+        self.pdf = None
+        
+        # One off-screen Agg figure and axes, cleared and redrawn for every chart
+        self.figure = Figure(figsize=(10, 6), layout='tight')
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        
+    @staticmethod
+    def _build_template():
+        """Blank first page with the static report title"""
+        template = FPDF()
+        template.set_auto_page_break(auto=True, margin=15)
+        template.add_page()
+        template.set_font('Arial', 'B', 24)
+        template.cell(0, 20, 'Cryptocurrency Market Analysis', ln=True, align='C')
+        return template
         
     def _add_header(self):
         """Add report header"""
-        self.pdf.set_font('Arial', 'B', 24)
-        self.pdf.cell(0, 20, 'Cryptocurrency Market Analysis', ln=True, align='C')
         self.pdf.set_font('Arial', 'I', 12)
         self.pdf.cell(0, 10, f'Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', ln=True, align='C')
         self.pdf.ln(10)
@@ -28,55 +44,59 @@ class CryptoReportGenerator:
         """Add table to the report"""
         self.pdf.set_font('Arial', 'B', 12)
         
-        # Calculate column widths
-        col_widths = []
-        for col in df.columns:
-            max_length = max(
-                df[col].astype(str).apply(len).max(),
-                len(str(col))
-            )
-            col_widths.append(min(max_length * 5, 60))  # Limit column width
+        # Stringify every cell once; widths come from vectorized string lengths
+        text = df.astype(str)
+        col_widths = [
+            min(max(text[col].str.len().max() if len(text) else 0, len(str(col))) * 5, 60)  # Limit column width
+            for col in text.columns
+        ]
             
         # Add headers
-        for i, col in enumerate(df.columns):
-            self.pdf.cell(col_widths[i], 10, str(col), 1)
+        for width, col in zip(col_widths, df.columns):
+            self.pdf.cell(width, 10, str(col), 1)
         self.pdf.ln()
         
         # Add data
         self.pdf.set_font('Arial', '', 10)
-        for _, row in df.iterrows():
-            for i, value in enumerate(row):
-                self.pdf.cell(col_widths[i], 10, str(value), 1)
+        for row in text.to_numpy().tolist():
+            for width, value in zip(col_widths, row):
+                self.pdf.cell(width, 10, value, 1)
             self.pdf.ln()
         
         self.pdf.ln(10)
         
     def _add_chart(self, df, title, chart_type='bar'):
         """Add chart to the report"""
-        plt.figure(figsize=(10, 6))
+        ax = self.axes
         
         if chart_type == 'bar':
-            plt.bar(df.index, df.values)
+            # Swap only the bars; the axes, spines and tick artists are reused
+            for container in list(ax.containers):
+                container.remove()
+            positions = range(len(df))
+            ax.bar(positions, df.values, color='C0')  # a reused axes would otherwise advance the color cycle
+            ax.set_xticks(positions, [str(label) for label in df.index])
+            ax.relim()
+            ax.autoscale_view()
         elif chart_type == 'pie':
-            plt.pie(df.values, labels=df.index, autopct='%1.1f%%')
+            ax.clear()
+            ax.pie(df.values, labels=df.index, autopct='%1.1f%%')
             
-        plt.title(title)
-        plt.xticks(rotation=45)
+        ax.set_title(title)
+        ax.tick_params(axis='x', labelrotation=45)
         
-        # Save chart to temporary file
-        chart_file = 'temp_chart.png'
-        plt.savefig(chart_file, bbox_inches='tight')
-        plt.close()
+        # Hand the rendered pixels straight to FPDF: no temp file, no PNG round trip,
+        # and an RGB image spares FPDF its per-pixel alpha scan
+        self.canvas.draw()
+        image = Image.frombuffer('RGBA', self.canvas.get_width_height(), self.canvas.buffer_rgba()).convert('RGB')
         
         # Add chart to PDF
-        self.pdf.image(chart_file, x=10, w=190)
+        self.pdf.image(image, x=10, w=190)
         self.pdf.ln(140)  # Space for the chart
         
-        # Remove temporary file
-        os.remove(chart_file)
-        
     def generate_report(self, df, analysis):
         """Generate the PDF report"""
+        self.pdf = copy.deepcopy(self.template)
         self._add_header()
         
         # Top 10 Cryptocurrencies
@@ -114,5 +134,8 @@ class CryptoReportGenerator:
             
         # Save the report
         report_file = f'crypto_analysis_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-        self.pdf.output(report_file)
+        try:
+            self.pdf.output(report_file)
+        finally:
+            self.pdf = None  # Release the finished document between ticks
         return report_file
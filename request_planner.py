@@ -0,0 +1,187 @@
+import asyncio
+import math
+import os
+
+from incremental_analyzer import IncrementalAnalyzer
+
+MAX_PER_PAGE = 250  # CoinGecko's per_page ceiling for /coins/markets
+MAX_IDS_PER_CALL = 250
+# Current amounts quoted in the vs_currency; these convert exactly at today's cross rate
+SPOT_FIELDS = ['current_price', 'market_cap', 'total_volume', 'fully_diluted_valuation']
+# Past levels and changes measured in the vs_currency; a spot rate can't convert them, so a
+# converted view leaves them blank rather than showing the base currency's numbers
+HISTORICAL_FIELDS = [
+    'high_24h', 'low_24h', 'ath', 'atl', 'price_change_24h', 'market_cap_change_24h',
+    'price_change_percentage_24h', 'market_cap_change_percentage_24h',
+    'price_change_percentage_24h_in_currency', 'ath_change_percentage', 'atl_change_percentage'
+]
+# Quoted in every supported currency, so its prices give the cross rates
+RATE_REFERENCE_ID = 'bitcoin'
+
+class Watchlist:
+    """One independently refreshed view: the top n coins, or a fixed set of ids, in one currency"""
+    def __init__(self, name, vs_currency='usd', top_n=50, ids=None, formats=('xlsx', 'ods'), output_dir='.'):
+        self.name = name
+        self.vs_currency = vs_currency
+        self.ids = list(ids) if ids else None
+        self.top_n = len(self.ids) if self.ids else top_n
+        self.targets = [(fmt, os.path.join(output_dir, f"crypto_data_{name}.{fmt}")) for fmt in formats]
+        self.analyzer = IncrementalAnalyzer()
+        self.last_good_data = None
+        self.last_fetch_stale = False
+
+def _markets_params(vs_currency, page, per_page, ids=None):
+    params = {
+        'vs_currency': vs_currency,
+        'order': 'market_cap_desc',
+        'per_page': per_page,
+        'page': page,
+        'sparkline': False,
+        'price_change_percentage': '24h'
+    }
+    if ids:
+        params['ids'] = ','.join(ids)
+    return params
+
+def _ranking_params(vs_currency, top_n):
+    per_page = min(top_n, MAX_PER_PAGE)
+    return [_markets_params(vs_currency, page, per_page) for page in range(1, -(-top_n // per_page) + 1)]
+
+def _valid_records(page):
+    """Coins of one /coins/markets page that carry an id; malformed ones are dropped individually"""
+    records = [coin for coin in page if isinstance(coin, dict) and coin.get('id')]
+    if len(records) < len(page):
+        print(f"Dropped {len(page) - len(records)} malformed coins without an id")
+    return records
+
+def naive_call_count(watchlists):
+    """Calls needed when every watchlist fetches on its own"""
+    return sum(-(-watchlist.top_n // min(watchlist.top_n, MAX_PER_PAGE)) for watchlist in watchlists)
+
+class RequestPlanner:
+    """Merge watchlists into the fewest /coins/markets and /simple/price calls, then fan results back out"""
+    def __init__(self, base_currency='usd', convert_currencies=False, max_ids=MAX_IDS_PER_CALL):
+        self.base_currency = base_currency
+        # Optionally one base-currency fetch plus a single /simple/price call for cross rates,
+        # instead of repeating /coins/markets per currency. Converted views only have price,
+        # market cap and volume; 24h and all-time figures are left blank.
+        self.convert_currencies = convert_currencies
+        self.max_ids = max_ids
+        self.last_calls = 0
+        self.last_naive_calls = 0
+
+    def _source_currency(self, watchlist):
+        return self.base_currency if self.convert_currencies else watchlist.vs_currency
+
+    def ranking_requests(self, watchlists):
+        """Pages of the deepest ranking needed per source currency"""
+        depth = {}
+        for watchlist in watchlists:
+            if not watchlist.ids:
+                currency = self._source_currency(watchlist)
+                depth[currency] = max(depth.get(currency, 0), watchlist.top_n)
+        return [(currency, params) for currency, top_n in sorted(depth.items())
+                for params in _ranking_params(currency, top_n)]
+
+    def id_requests(self, watchlists, known):
+        """Batched ids= calls for coins the rankings didn't already return"""
+        missing = {}
+        for watchlist in watchlists:
+            if watchlist.ids:
+                currency = self._source_currency(watchlist)
+                have = known.get(currency, {})
+                missing.setdefault(currency, set()).update(i for i in watchlist.ids if i not in have)
+        requests = []
+        for currency, ids in sorted(missing.items()):
+            ids = sorted(ids)
+            for start in range(0, len(ids), self.max_ids):
+                batch = ids[start:start + self.max_ids]
+                requests.append((currency, _markets_params(currency, 1, len(batch), batch)))
+        return requests
+
+    def rate_request(self, watchlists):
+        """One /simple/price call quoting every target currency, if any conversion is needed"""
+        if not self.convert_currencies:
+            return None
+        currencies = sorted({watchlist.vs_currency for watchlist in watchlists} - {self.base_currency})
+        if not currencies:
+            return None
+        return {'ids': RATE_REFERENCE_ID, 'vs_currencies': ','.join([self.base_currency] + currencies)}
+
+    def rates(self, prices):
+        """Cross rates from the base currency, from a /simple/price response; {} if it has no base quote"""
+        quotes = (prices or {}).get(RATE_REFERENCE_ID) or {}
+        base = quotes.get(self.base_currency)
+        if not isinstance(base, (int, float)) or not base:
+            return {}
+        return {currency: price / base for currency, price in quotes.items()
+                if isinstance(price, (int, float)) and not isinstance(price, bool)}
+
+    @staticmethod
+    def _convert(coins, rate):
+        if rate == 1:
+            return coins
+        converted = []
+        for coin in coins:
+            coin = dict(coin)
+            for field in SPOT_FIELDS:
+                value = coin.get(field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    coin[field] = value * rate
+            for field in HISTORICAL_FIELDS:
+                if field in coin:
+                    coin[field] = None
+            converted.append(coin)
+        return converted
+
+    def fan_out(self, watchlists, rankings, known, rates):
+        """Data for each watchlist, in the shape /coins/markets would have returned it
+
+        Watchlists whose currency has no cross rate are left out rather than shown in the
+        base currency, so the caller falls back to their last good data.
+        """
+        results = {}
+        for watchlist in watchlists:
+            currency = self._source_currency(watchlist)
+            if watchlist.ids:
+                coins = [known[currency][i] for i in watchlist.ids if i in known.get(currency, {})]
+                # ids= responses come back by market cap; keep that order across batches
+                coins.sort(key=lambda coin: -(coin.get('market_cap') or -math.inf))
+            else:
+                coins = rankings.get(currency, [])[:watchlist.top_n]
+            rate = rates.get(watchlist.vs_currency) if currency != watchlist.vs_currency else 1
+            if rate is None:
+                print(f"No {self.base_currency.upper()}->{watchlist.vs_currency.upper()} rate; skipping {watchlist.name}")
+                continue
+            results[watchlist.name] = self._convert(coins, rate)
+        return results
+
+    async def fetch(self, get, watchlists):
+        """Run the plan with an async get(path, params); return {watchlist name: coins}"""
+        rankings, known = {}, {}
+
+        # Rankings and the rate quote don't depend on anything, so they go out together
+        ranking_requests = self.ranking_requests(watchlists)
+        rate_request = self.rate_request(watchlists)
+        calls = [get('/coins/markets', params) for _, params in ranking_requests]
+        if rate_request is not None:
+            calls.append(get('/simple/price', rate_request))
+        responses = await asyncio.gather(*calls)
+        rates = self.rates(responses.pop()) if rate_request is not None else {}
+        for (currency, _), page in zip(ranking_requests, responses):
+            page = _valid_records(page)
+            rankings.setdefault(currency, []).extend(page)
+            known.setdefault(currency, {}).update((coin['id'], coin) for coin in page)
+
+        # Watchlist coins that were already in a ranking cost nothing extra
+        id_requests = self.id_requests(watchlists, known)
+        pages = await asyncio.gather(*(get('/coins/markets', params) for _, params in id_requests))
+        for (currency, _), page in zip(id_requests, pages):
+            known.setdefault(currency, {}).update((coin['id'], coin) for coin in _valid_records(page))
+
+        self.last_calls = len(calls) + len(id_requests)
+        self.last_naive_calls = naive_call_count(watchlists)
+        return self.fan_out(watchlists, rankings, known, rates)
+
+    def summary(self):
+        return f"API calls: {self.last_calls} for this tick (one call per watchlist would need {self.last_naive_calls})"
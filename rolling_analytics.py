@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+
+def _ranked(table):
+    """Number section rows from 1 like the other analysis tables"""
+    return table.set_axis(range(1, len(table) + 1))
+
+def _codes(column):
+    """Integer codes (-1 for missing) and their labels for one label column"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), column.cat.categories
+    return pd.factorize(column)
+
+def _coin_codes(history):
+    """One code per coin: the CoinGecko id, or the symbol for rows stored before ids were"""
+    if 'id' not in history.columns:
+        codes, labels = _codes(history['symbol'])
+        return codes, pd.Index(labels)
+    codes, labels = _codes(history['id'])
+    missing = codes < 0
+    if missing.any():
+        symbol_codes, symbols = _codes(history['symbol'])
+        codes = np.where(missing, len(labels) + symbol_codes, codes)
+        labels = np.concatenate([np.asarray(labels, dtype=object), np.asarray(symbols, dtype=object)])
+    # Drop labels no row uses (e.g. categories from other days), keeping codes dense
+    used = np.zeros(len(labels), dtype=bool)
+    used[codes] = True
+    if used.all():
+        return codes, pd.Index(labels)
+    return (np.cumsum(used) - 1)[codes], pd.Index(np.asarray(labels, dtype=object)[used])
+
+def _last_rows(codes, count):
+    """Position of each code's last occurrence, scanning back from the end until every code is seen"""
+    last = np.full(count, -1, dtype=np.int64)
+    end, chunk = len(codes), count
+    while end > 0 and (last < 0).any():
+        start = max(0, end - chunk)
+        seen = np.full(count, -1, dtype=np.int64)
+        seen[codes[start:end]] = np.arange(start, end)  # later rows win
+        last = np.where(last < 0, seen, last)
+        end, chunk = start, chunk * 2
+    return last
+
+def _ffill(values):
+    """Carry each column's last known value down over NaNs, in place"""
+    if not np.isnan(values).any():
+        return values
+    # Row by row keeps every step contiguous; bars are few next to the cells they hold
+    for previous, row in zip(values[:-1], values[1:]):
+        np.copyto(row, previous, where=np.isnan(row))
+    return values
+
+class Panel:
+    """Wide time x coin arrays built from long snapshot history"""
+    def __init__(self, times, coins, symbols, names, prices, volumes):
+        self.times = times        # DatetimeIndex of bars
+        self.coins = coins        # Index of CoinGecko ids (columns)
+        self.symbols = symbols    # coin symbols aligned with coins
+        self.names = names        # coin names aligned with coins
+        self.prices = prices      # float64[time, coin]
+        self.volumes = volumes    # float64[time, coin]
+
+class RollingAnalytics:
+    SECTIONS = ['Rolling Returns', 'Most Volatile', 'Deepest Drawdown', 'Price Z-Score Extremes']
+    # History columns the engine reads; querying only these skips decoding the rest
+    COLUMNS = ['timestamp', 'id', 'symbol', 'name', 'current_price', 'total_volume']
+
+    def __init__(self, bar='5min', horizons=('1h', '24h', '7d'), window='24h'):
+        self.bar = pd.Timedelta(bar)
+        self.horizons = horizons
+        self.window = window
+
+    def _bars(self, span):
+        return max(1, int(pd.Timedelta(span) / self.bar))
+
+    def build_panel(self, history):
+        """Pivot long snapshot rows into forward-filled time x coin arrays"""
+        # Bar arithmetic runs in the column's own unit (stored history is in microseconds)
+        stamps = history['timestamp'].values
+        unit = np.datetime_data(stamps.dtype)[0]
+        timestamps = stamps.view('int64')
+        # Bars form a regular grid, so a bar's row is plain integer arithmetic;
+        # gaps become empty rows and horizons stay aligned to wall-clock time
+        bar = self.bar // pd.Timedelta(1, unit=unit)
+        bar_numbers = timestamps // bar
+        first_bar = bar_numbers.min()
+        time_codes = bar_numbers - first_bar
+        times = pd.to_datetime((first_bar + np.arange(time_codes.max() + 1)) * bar, unit=unit, utc=True)
+
+        # Columns are coins by id: symbols repeat across coins
+        coin_codes, coins = _coin_codes(history)
+
+        # Later snapshots within a bar overwrite earlier ones (numpy keeps the
+        # last value for repeated indices), so only unsorted input needs a sort
+        order = slice(None)
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+        coin_codes = coin_codes[order]
+        cells = time_codes[order] * len(coins) + coin_codes  # flat position, shared by both scatters
+
+        prices = np.full((len(times), len(coins)), np.nan)
+        volumes = np.full((len(times), len(coins)), np.nan)
+        prices.ravel()[cells] = history['current_price'].to_numpy(dtype=float)[order]
+        volumes.ravel()[cells] = history['total_volume'].to_numpy(dtype=float)[order]
+
+        # Carry the last known value over missed ticks
+        _ffill(prices)
+        _ffill(volumes)
+
+        last_row = _last_rows(coin_codes, len(coins))
+        if not isinstance(order, slice):
+            last_row = order[last_row]
+        symbols = history['symbol'].iloc[last_row].to_numpy()
+        names = history['name'].iloc[last_row].to_numpy()
+        return Panel(times, coins, symbols, names, prices, volumes)
+
+    def compute(self, panel):
+        """Compute per-coin metrics over the whole panel in batched array operations"""
+        prices = panel.prices
+        last = prices[-1]
+        metrics = {'Cryptocurrency Name': panel.names, 'Current Price (USD)': last}
+
+        # Multi-horizon returns
+        for horizon in self.horizons:
+            lag = self._bars(horizon)
+            if lag < len(prices):
+                metrics[f'Return {horizon} %'] = (last / prices[-1 - lag] - 1) * 100
+            else:
+                metrics[f'Return {horizon} %'] = np.full(len(last), np.nan)
+
+        window = min(self._bars(self.window), len(prices))
+        recent = prices[-window:]
+        recent_volumes = panel.volumes[-window:]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Volatility of log returns over the window
+            log_returns = np.diff(np.log(recent), axis=0)
+            if len(log_returns) > 1:
+                metrics[f'Volatility {self.window} %'] = np.nanstd(log_returns, axis=0, ddof=1) * 100
+            else:
+                metrics[f'Volatility {self.window} %'] = np.full(len(last), np.nan)
+
+            # Volume-weighted average price over the window
+            weights = np.where(np.isnan(recent) | np.isnan(recent_volumes), 0.0, recent_volumes)
+            metrics[f'VWAP {self.window}'] = np.nansum(recent * weights, axis=0) / weights.sum(axis=0)
+
+            # Z-score of the latest price against the window
+            std = np.nanstd(recent, axis=0, ddof=1) if window > 1 else np.full(len(last), np.nan)
+            metrics[f'Z-Score {self.window}'] = (last - np.nanmean(recent, axis=0)) / std
+
+            # Max drawdown over the full history, in one pass that keeps only the running peak
+            peak = prices[0].copy()
+            worst = np.full(len(last), np.nan)
+            ratio = np.empty(len(last))
+            for row in prices:
+                np.fmax(peak, row, out=peak)
+                np.divide(row, peak, out=ratio)
+                np.fmin(worst, ratio, out=worst)
+            metrics['Max Drawdown %'] = (worst - 1) * 100
+
+        return pd.DataFrame(metrics, index=panel.coins)
+
+    def sections(self, history, top=5):
+        """Analysis sections ready to merge into CryptoDataFetcher's analysis dict"""
+        if history is None or history.empty:
+            return {}
+        metrics = self.compute(self.build_panel(history))
+        longest = f'Return {self.horizons[-1]} %'
+        volatility = f'Volatility {self.window} %'
+        zscore = f'Z-Score {self.window}'
+        return {
+            'Rolling Returns': _ranked(metrics.nlargest(top, longest)[
+                ['Cryptocurrency Name'] + [f'Return {h} %' for h in self.horizons]
+            ]),
+            'Most Volatile': _ranked(metrics.nlargest(top, volatility)[
+                ['Cryptocurrency Name', volatility, f'VWAP {self.window}', 'Current Price (USD)']
+            ]),
+            'Deepest Drawdown': _ranked(metrics.nsmallest(top, 'Max Drawdown %')[
+                ['Cryptocurrency Name', 'Max Drawdown %', 'Current Price (USD)']
+            ]),
+            'Price Z-Score Extremes': _ranked(metrics.reindex(metrics[zscore].abs().nlargest(top).index)[
+                ['Cryptocurrency Name', zscore, 'Current Price (USD)']
+            ])
+        }
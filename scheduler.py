@@ -0,0 +1,244 @@
+import asyncio
+import math
+import threading
+import time
+
+class FixedRateScheduler:
+    """Tick on a fixed-rate clock: tick k fires at start + k * interval, however long the work took"""
+    def __init__(self, interval, clock=time.monotonic, sleep=time.sleep):
+        self.interval = interval
+        self.clock = clock
+        self.sleep = sleep
+        self.start = None
+        self.tick = 0
+        self.missed = 0      # ticks skipped because the loop overran a whole interval
+        self.drift = 0.0     # how late the last tick fired
+
+    def next_tick_at(self):
+        return self.start + self.tick * self.interval
+
+    def until_next(self):
+        """Seconds left before the tick after the current one"""
+        return max(0.0, self.next_tick_at() + self.interval - self.clock())
+
+    def _advance(self):
+        """Move to the next tick; return how long to sleep until it fires"""
+        now = self.clock()
+        if self.start is None:
+            self.start = now
+            return 0.0
+        self.tick += 1
+        # An overrun skips ticks instead of firing a burst of catch-up fetches
+        behind = int((now - self.next_tick_at()) // self.interval)
+        if behind > 0:
+            self.missed += behind
+            self.tick += behind
+        return self.next_tick_at() - now
+
+    def _fired(self):
+        scheduled = self.next_tick_at()
+        self.drift = max(0.0, self.clock() - scheduled)
+        return scheduled
+
+    def wait(self):
+        """Sleep until the next scheduled tick and return its scheduled time"""
+        delay = self._advance()
+        if delay > 0:
+            self.sleep(delay)
+        return self._fired()
+
+    async def wait_async(self):
+        """wait() for event loops: yields to other tasks instead of sleeping the thread"""
+        delay = self._advance()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self._fired()
+
+    def __iter__(self):
+        while True:
+            yield self.wait()
+
+class TieredScheduler:
+    """Full ticks on a fixed-rate clock, with fast ticks every fast_interval seconds in between"""
+    def __init__(self, full_interval, fast_interval, clock=time.monotonic, sleep=time.sleep):
+        self.full = FixedRateScheduler(full_interval, clock, sleep)
+        self.fast_interval = fast_interval  # may be changed between ticks
+        self.clock = clock
+        self.sleep = sleep
+        self.last_tick_at = None
+        self.fast_ticks = 0
+
+    def next_full_at(self):
+        return self.full.next_tick_at() + self.full.interval
+
+    def wait(self):
+        """Sleep until the next tick and return its kind, 'full' or 'fast'"""
+        if self.last_tick_at is not None:
+            next_fast = max(self.last_tick_at + self.fast_interval, self.clock())
+            # A fast tick that would land on (or after) the next full refresh is folded into it
+            if next_fast < self.next_full_at():
+                delay = next_fast - self.clock()
+                if delay > 0:
+                    self.sleep(delay)
+                self.last_tick_at = next_fast
+                self.fast_ticks += 1
+                return 'fast'
+        self.last_tick_at = self.full.wait()
+        return 'full'
+
+    def __iter__(self):
+        while True:
+            yield self.wait()
+
+class AdaptiveInterval:
+    """Fast-path polling interval that tightens when prices move and backs off near the quota"""
+    def __init__(self, base, minimum=None, maximum=None, calm=0.05, volatile=0.5, rate_limiter=None,
+                 headroom=0.8):
+        self.base = base
+        self.minimum = minimum if minimum is not None else base / 4
+        self.maximum = maximum if maximum is not None else base * 6
+        self.calm = calm              # largest % move per tick below which polling slows down
+        self.volatile = volatile      # largest % move per tick above which polling speeds up
+        self.rate_limiter = rate_limiter
+        self.headroom = headroom      # share of the quota the fast path may plan on using
+        self.interval = base
+
+    def quota_floor(self, calls_per_tick=1, reserved_rate=0.0):
+        """Shortest interval the quota sustains after reserved_rate calls/s for full refreshes"""
+        if self.rate_limiter is None:
+            return 0.0
+        spare = self.rate_limiter.rate * self.headroom - reserved_rate
+        if spare <= 0:
+            return self.maximum
+        floor = calls_per_tick / spare
+        # A drained bucket (retries, a 429 pause) means the plan is already too tight
+        if self.rate_limiter.available() < calls_per_tick:
+            floor *= 2
+        return floor
+
+    def update(self, move, calls_per_tick=1, reserved_rate=0.0):
+        """Next interval, given the largest % price move seen on the last fast tick"""
+        if move is not None and not math.isnan(move):
+            if move >= self.volatile:
+                self.interval /= 2
+            elif move <= self.calm:
+                self.interval *= 1.5
+            else:
+                self.interval += (self.base - self.interval) / 2
+        self.interval = min(self.maximum, max(self.minimum, self.interval))
+        # The quota always wins over volatility
+        self.interval = max(self.interval, self.quota_floor(calls_per_tick, reserved_rate))
+        return self.interval
+
+class BackgroundWorkers:
+    """Bounded worker threads that run the latest job of each kind, coalescing stale ones"""
+    def __init__(self, max_workers=2, clock=time.monotonic):
+        self.clock = clock
+        self.condition = threading.Condition()
+        self.pending = {}     # kind -> (fn, args, submitted_at), at most one per kind
+        self.running = {}     # kind -> submitted_at
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0    # jobs replaced by a newer snapshot before they started
+        self.last_lag = 0.0   # submit-to-finish time of the last completed job
+        self.closed = False
+        self.threads = [
+            threading.Thread(target=self._work, name=f'background-worker-{i}', daemon=True)
+            for i in range(max_workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, kind, fn, *args):
+        """Queue fn(*args); a still-pending job of the same kind is dropped in its favour"""
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("BackgroundWorkers is closed")
+            if self.pending.pop(kind, None) is not None:
+                self.coalesced += 1
+            self.pending[kind] = (fn, args, self.clock())
+            self.submitted += 1
+            self.condition.notify()
+
+    def _next_kind(self):
+        # Jobs of one kind write the same files, so they never run side by side
+        for kind in self.pending:
+            if kind not in self.running:
+                return kind
+        return None
+
+    def _work(self):
+        while True:
+            with self.condition:
+                kind = self._next_kind()
+                while kind is None:
+                    if self.closed and not self.pending:
+                        return
+                    self.condition.wait()
+                    kind = self._next_kind()
+                fn, args, submitted_at = self.pending.pop(kind)
+                self.running[kind] = submitted_at
+            try:
+                fn(*args)
+                failed = False
+            except Exception as e:
+                print(f"Error in background {kind} job: {e}")
+                failed = True
+            with self.condition:
+                del self.running[kind]
+                self.completed += 1
+                self.failed += failed
+                self.last_lag = self.clock() - submitted_at
+                self.condition.notify_all()
+
+    def queue_depth(self):
+        """Jobs waiting for a worker"""
+        with self.condition:
+            return len(self.pending)
+
+    def lag(self):
+        """Age of the oldest snapshot still waiting or being rendered"""
+        with self.condition:
+            waiting = [submitted_at for _, _, submitted_at in self.pending.values()]
+            waiting.extend(self.running.values())
+            return self.clock() - min(waiting) if waiting else 0.0
+
+    def stats(self):
+        with self.condition:
+            stats = {
+                'queue_depth': len(self.pending),
+                'running': len(self.running),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'coalesced': self.coalesced,
+                'last_lag': self.last_lag
+            }
+        stats['lag'] = self.lag()
+        return stats
+
+    def summary(self):
+        stats = self.stats()
+        return (f"Background jobs: {stats['queue_depth']} queued, {stats['running']} running, "
+                f"{stats['coalesced']} coalesced, lag {stats['lag']:.1f}s (last {stats['last_lag']:.1f}s)")
+
+    def join(self, timeout=None):
+        """Wait until every submitted job has finished; False on timeout"""
+        deadline = None if timeout is None else self.clock() + timeout
+        with self.condition:
+            while self.pending or self.running:
+                remaining = None if deadline is None else deadline - self.clock()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+
+    def close(self, wait=True):
+        """Stop accepting jobs; pending jobs still run before the workers exit"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if wait:
+            for thread in self.threads:
+                thread.join()
@@ -0,0 +1,137 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from export_pipeline import file_digest, read_digest, write_digest
+from metrics import REGISTRY, stage_timer
+
+SHARE_COPIES = REGISTRY.counter('crypto_share_copies_total', 'Files published to shares by outcome', ['outcome'])
+
+logger = logging.getLogger('NetworkShare')
+
+def _atomic_copy(source, target):
+    """Copy source next to target under a temp name, then rename it over target"""
+    directory = os.path.dirname(target)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(target)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out, open(source, 'rb') as src:
+            shutil.copyfileobj(src, out, 1 << 20)
+            out.flush()
+            os.fsync(out.fileno())
+        os.chmod(tmp_path, 0o644)
+        # Readers on the share see either the old file or the new one, never a partial copy
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+class SharePublisher:
+    """Mirror exported files onto network shares, copying only content that changed"""
+    def __init__(self, destinations, debounce=2.0, setup_retry=300.0, max_workers=None, clock=time.monotonic):
+        self.destinations = list(destinations)
+        self.debounce = debounce          # seconds of quiet before a burst of updates is published
+        self.setup_retry = setup_retry    # seconds before a failed destination is set up again
+        self.clock = clock
+        self.ready = {}                   # destination -> True, or the time its setup failed
+        self.setup_lock = threading.Lock()
+        self.pending = {}                 # source path -> time of the latest publish() call
+        self.condition = threading.Condition()
+        self.closed = False
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or max(1, len(self.destinations)))
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _setup(self, destination):
+        """Create a destination once; after a failure, try again only every setup_retry seconds"""
+        with self.setup_lock:
+            state = self.ready.get(destination)
+            if state is True:
+                return True
+            if state is not None and self.clock() - state < self.setup_retry:
+                return False
+            try:
+                os.makedirs(destination, exist_ok=True)
+                self.ready[destination] = True
+                logger.info(f"Network share ready at {destination}")
+                return True
+            except OSError as e:
+                self.ready[destination] = self.clock()
+                logger.error(f"Error setting up network share: {e}")
+                return False
+
+    def _copy(self, source, digest, destination):
+        """Publish one file to one destination; return 'copied', 'unchanged', 'skipped' or 'failed'"""
+        if not self._setup(destination):
+            return 'skipped'
+        target = os.path.join(destination, os.path.basename(source))
+        try:
+            if read_digest(target) == digest:
+                logger.debug(f"{os.path.basename(source)} unchanged at {target}")
+                return 'unchanged'
+            _atomic_copy(source, target)
+            write_digest(target, digest)
+            logger.info(f"Copied {os.path.basename(source)} to {target}")
+            return 'copied'
+        except OSError as e:
+            logger.error(f"Error copying {source} to {target}: {e}")
+            return 'failed'
+
+    def publish(self, source):
+        """Queue a file for publishing; bursts within the debounce window are copied once"""
+        with self.condition:
+            self.pending[source] = self.clock()
+            self.condition.notify_all()
+
+    def flush(self):
+        """Publish everything queued right now; return {(source, destination): outcome}"""
+        with self.condition:
+            sources, self.pending = list(self.pending), {}
+        return self._publish(sources)
+
+    def _publish(self, sources):
+        results = {}
+        if not sources:
+            return results
+        with stage_timer('share_publish', files=len(sources)):
+            futures = {}
+            for source in sources:
+                try:
+                    # The export pipeline's digest covers the content, not the file's timestamps
+                    digest = read_digest(source) or file_digest(source)
+                except OSError as e:
+                    logger.error(f"Error reading {source}: {e}")
+                    continue
+                for destination in self.destinations:
+                    futures[source, destination] = self.executor.submit(self._copy, source, digest, destination)
+            for key, future in futures.items():
+                results[key] = future.result()
+                SHARE_COPIES.inc(outcome=results[key])
+        return results
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.closed and not self.pending:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                # Wait until no update has arrived for a whole debounce window
+                quiet_for = self.clock() - max(self.pending.values())
+                if quiet_for < self.debounce:
+                    self.condition.wait(self.debounce - quiet_for)
+                    continue
+                sources, self.pending = list(self.pending), {}
+            self._publish(sources)
+
+    def close(self):
+        """Publish whatever is still queued and stop the background thread"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.flush()
+        self.executor.shutdown()
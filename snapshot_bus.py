@@ -0,0 +1,188 @@
+import os
+import select
+import socket
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import pyarrow as pa
+
+DEFAULT_BUS_ADDRESS = os.getenv(
+    'CRYPTO_SNAPSHOT_BUS',
+    os.path.join(tempfile.gettempdir(), 'crypto_snapshots.sock')
+)
+HEADER = struct.Struct('!Q')  # frame length prefix
+
+def _family(address):
+    """Unix socket paths are used as-is; 'host:port' selects TCP on platforms without AF_UNIX"""
+    if isinstance(address, tuple):
+        return socket.AF_INET, address
+    if ':' in address and not address.startswith(('/', '.')):
+        host, port = address.rsplit(':', 1)
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+def encode_snapshot(df, published_at=None, prices_only=False):
+    """Serialize a DataFrame as one Arrow IPC stream"""
+    published_at = published_at or datetime.now(timezone.utc)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b'published_at': published_at.isoformat().encode(),
+        # Fast ticks only refresh prices; every other column repeats the last full refresh
+        b'prices_only': b'1' if prices_only else b'0'
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def decode_snapshot(payload):
+    """Inverse of encode_snapshot; the publish time and prices_only flag are kept in df.attrs"""
+    table = pa.ipc.open_stream(payload).read_all()
+    df = table.to_pandas()
+    metadata = table.schema.metadata or {}
+    published_at = metadata.get(b'published_at')
+    if published_at:
+        df.attrs['published_at'] = datetime.fromisoformat(published_at.decode())
+    df.attrs['prices_only'] = metadata.get(b'prices_only') == b'1'
+    return df
+
+class SnapshotPublisher:
+    def __init__(self, address=DEFAULT_BUS_ADDRESS, send_timeout=2.0):
+        self.address = address
+        self.send_timeout = send_timeout
+        self.subscribers = []
+        self.last_frame = None
+        self.lock = threading.Lock()
+
+        family, bind_address = _family(address)
+        if family == socket.AF_UNIX and os.path.exists(address):
+            self._remove_stale_socket(address)
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(bind_address)
+        self.server.listen()
+        if family == socket.AF_INET:
+            self.address = '%s:%d' % self.server.getsockname()[:2]
+
+        self.thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def _remove_stale_socket(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.remove(path)  # nobody is listening; left over from a crash
+        else:
+            raise RuntimeError(f"Another publisher is already running on {path}")
+        finally:
+            probe.close()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return  # server closed
+            conn.settimeout(self.send_timeout)
+            with self.lock:
+                # Late joiners start from the current snapshot
+                if self.last_frame is not None and not self._send(conn, self.last_frame):
+                    continue
+                self.subscribers.append(conn)
+
+    @staticmethod
+    def _send(conn, frame):
+        try:
+            conn.sendall(frame)
+            return True
+        except OSError:
+            conn.close()
+            return False
+
+    def publish(self, df, published_at=None, prices_only=False):
+        """Encode a snapshot once and push it to every subscriber"""
+        payload = encode_snapshot(df, published_at, prices_only)
+        frame = HEADER.pack(len(payload)) + payload
+        with self.lock:
+            self.last_frame = frame
+            # Subscribers that are gone or too slow to drain their socket are dropped
+            self.subscribers = [conn for conn in self.subscribers if self._send(conn, frame)]
+            return len(self.subscribers)
+
+    def close(self):
+        self.server.close()
+        with self.lock:
+            for conn in self.subscribers:
+                conn.close()
+            self.subscribers = []
+        family, _ = _family(self.address)
+        if family == socket.AF_UNIX and os.path.exists(self.address):
+            os.remove(self.address)
+
+class SnapshotSubscriber:
+    def __init__(self, address=DEFAULT_BUS_ADDRESS, reconnect_interval=1.0):
+        self.address = address
+        self.reconnect_interval = reconnect_interval
+        self.sock = None
+
+    def _connect(self, deadline):
+        family, connect_address = _family(self.address)
+        while True:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            try:
+                sock.connect(connect_address)
+                self.sock = sock
+                return True
+            except OSError:
+                sock.close()
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+                time.sleep(self.reconnect_interval)
+
+    def _read_exactly(self, size):
+        chunks = []
+        while size:
+            chunk = self.sock.recv(min(size, 1 << 20))
+            if not chunk:
+                raise ConnectionError("publisher went away")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def receive(self, timeout=None):
+        """Next published snapshot as a DataFrame, or None on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.sock is None and not self._connect(deadline):
+                return None
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                readable, _, _ = select.select([self.sock], [], [], remaining)
+                if not readable:
+                    return None
+                # Once a frame starts arriving it is read to the end, so framing never slips
+                (length,) = HEADER.unpack(self._read_exactly(HEADER.size))
+                return decode_snapshot(self._read_exactly(length))
+            except (ConnectionError, OSError):
+                # Publisher restarted; reconnect and wait for its next snapshot
+                self.close()
+                if deadline is not None and time.monotonic() >= deadline:
+                    return None
+
+    def __iter__(self):
+        while True:
+            snapshot = self.receive()
+            if snapshot is not None:
+                yield snapshot
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
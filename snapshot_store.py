@@ -0,0 +1,149 @@
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('us', tz='UTC')),
+    # CoinGecko id, the stable coin key; symbols and names repeat across coins
+    ('id', pa.dictionary(pa.int32(), pa.string())),
+    ('symbol', pa.dictionary(pa.int32(), pa.string())),
+    ('name', pa.dictionary(pa.int32(), pa.string())),
+    ('current_price', pa.float64()),
+    ('market_cap', pa.int64()),
+    ('total_volume', pa.int64()),
+    ('price_change_percentage_24h', pa.float64()),
+    ('high_24h', pa.float64()),
+    ('low_24h', pa.float64()),
+    ('circulating_supply', pa.float64()),
+    ('ath', pa.float64()),
+    ('ath_change_percentage', pa.float64()),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+DATASET_SCHEMA = SCHEMA.append(pa.field('date', pa.string()))
+
+class SnapshotStore:
+    def __init__(self, root="history"):
+        self.root = root
+
+    def _partition_dir(self, date):
+        return os.path.join(self.root, f"date={date}")
+
+    @staticmethod
+    def _tmp_path(path):
+        # Dataset discovery skips dot-files, so queries never pick up a file mid-write
+        directory, name = os.path.split(path)
+        return os.path.join(directory, f".{name}.tmp")
+
+    def _to_table(self, df, timestamp=None):
+        """Convert a numeric snapshot DataFrame into a typed Arrow table"""
+        # Without a snapshot timestamp, every row carries its own in a 'timestamp' column
+        stamps = pd.to_datetime(df['timestamp'], utc=True) if timestamp is None else [timestamp] * len(df)
+        columns = {'timestamp': pa.array(stamps, SCHEMA.field('timestamp').type)}
+        for field in SCHEMA:
+            if field.name == 'timestamp':
+                continue
+            values = df[field.name] if field.name in df.columns else pd.Series([None] * len(df))
+            if pa.types.is_dictionary(field.type):
+                # Missing labels (e.g. no id on older frames) stay null rather than 'None'
+                text = values.astype(str).where(values.notna(), None)
+                columns[field.name] = pa.array(text, pa.string()).dictionary_encode()
+            elif pa.types.is_integer(field.type):
+                # Market caps arrive as floats in JSON; round into nullable int64
+                columns[field.name] = pa.array(pd.to_numeric(values, errors='coerce').round().astype('Int64'))
+            else:
+                columns[field.name] = pa.array(pd.to_numeric(values, errors='coerce'), field.type)
+        return pa.table(columns).cast(SCHEMA)
+
+    def append(self, df, timestamp=None):
+        """Append one snapshot as a new file in its day's partition"""
+        if df is None or df.empty:
+            return None
+        timestamp = timestamp or datetime.now(timezone.utc)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        timestamp = timestamp.astimezone(timezone.utc)
+        table = self._to_table(df, timestamp)
+
+        partition_dir = self._partition_dir(timestamp.strftime('%Y-%m-%d'))
+        os.makedirs(partition_dir, exist_ok=True)
+        path = os.path.join(partition_dir, f"part-{timestamp.strftime('%H%M%S%f')}.parquet")
+        tmp_path = self._tmp_path(path)
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+        return path
+
+    def append_history(self, df):
+        """Append rows that carry their own 'timestamp', one new file per day they cover"""
+        if df is None or df.empty:
+            return []
+        dates = pd.to_datetime(df['timestamp'], utc=True).dt.strftime('%Y-%m-%d')
+        paths = []
+        for date, rows in df.groupby(dates, sort=True):
+            partition_dir = self._partition_dir(date)
+            os.makedirs(partition_dir, exist_ok=True)
+            path = os.path.join(partition_dir, f"part-history-{uuid.uuid4().hex}.parquet")
+            tmp_path = self._tmp_path(path)
+            pq.write_table(self._to_table(rows).sort_by('timestamp'), tmp_path, compression='zstd')
+            os.replace(tmp_path, path)
+            paths.append(path)
+        return paths
+
+    def compact(self, date):
+        """Merge a finished day's small snapshot files into a single file"""
+        partition_dir = self._partition_dir(date)
+        parts = sorted(
+            os.path.join(partition_dir, f) for f in os.listdir(partition_dir) if f.endswith('.parquet')
+        )
+        if len(parts) <= 1:
+            return None
+        table = pa.concat_tables(pq.read_table(part, schema=SCHEMA) for part in parts)
+        path = os.path.join(partition_dir, 'compacted.parquet')
+        tmp_path = self._tmp_path(path)
+        pq.write_table(table.sort_by('timestamp'), tmp_path, compression='zstd', row_group_size=100_000)
+        os.replace(tmp_path, path)
+        for part in parts:
+            if part != path:
+                os.remove(part)
+        return path
+
+    def dates(self):
+        """Sorted list of stored day partitions"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d.split('=', 1)[1] for d in os.listdir(self.root) if d.startswith('date='))
+
+    @staticmethod
+    def _utc(value):
+        value = pd.Timestamp(value)
+        return value.tz_localize('UTC') if value.tzinfo is None else value.tz_convert('UTC')
+
+    def query(self, start=None, end=None, symbols=None, columns=None, ids=None):
+        """Load snapshots between start and end (inclusive) for the given symbols and/or ids"""
+        if not self.dates():
+            return pd.DataFrame(columns=columns or SCHEMA.names)
+
+        dataset = ds.dataset(self.root, format='parquet', schema=DATASET_SCHEMA, partitioning=PARTITIONING)
+        # Filtering on the partition key lets Arrow skip whole days without opening them
+        condition = None
+        if start is not None:
+            start = self._utc(start)
+            condition = (ds.field('date') >= start.strftime('%Y-%m-%d')) & (ds.field('timestamp') >= start)
+        if end is not None:
+            end = self._utc(end)
+            end_condition = (ds.field('date') <= end.strftime('%Y-%m-%d')) & (ds.field('timestamp') <= end)
+            condition = end_condition if condition is None else condition & end_condition
+        if symbols is not None:
+            symbol_condition = ds.field('symbol').isin(pa.array(list(symbols), pa.string()))
+            condition = symbol_condition if condition is None else condition & symbol_condition
+        if ids is not None:
+            id_condition = ds.field('id').isin(pa.array(list(ids), pa.string()))
+            condition = id_condition if condition is None else condition & id_condition
+
+        table = dataset.to_table(columns=columns or SCHEMA.names, filter=condition)
+        return table.to_pandas()
@@ -2,11 +2,14 @@ import pandas as pd
 import os
 import subprocess
 from pathlib import Path
+from export_pipeline import ExportPipeline, build_cell_grid, render
 
 class SpreadsheetHandler:
-    def __init__(self):
+    def __init__(self, streaming=False):
         self.excel_file = "crypto_data_auto.xlsm"
         self.ods_file = "crypto_data_auto.ods"
+        self.pipeline = ExportPipeline()
+        self.streaming = streaming  # constant-memory writers for large universes
         self.excel_macro = """
 Sub AutoRefresh()
     Application.OnTime Now + TimeValue("00:05:00"), "AutoRefresh"
@@ -32,14 +35,20 @@ Sub AutoRefresh
 End Sub
 """
         
-    def update_data(self, df, analysis):
+    def update_data(self, df, analysis, grid=None):
         """Update data in both Excel and LibreOffice Calc formats"""
         try:
-            # Save as Excel format
-            self._save_excel(df, analysis)
-            
-            # Save as ODS format
-            self._save_ods(df, analysis)
+            targets = [('xlsm', self.excel_file), ('ods', self.ods_file)]
+            if self.streaming:
+                # Write rows as they are produced instead of building the layout in memory
+                written = self.pipeline.export_streaming(df, analysis, targets)
+            else:
+                # Lay the sheets out once, then render both formats in parallel
+                grid = grid or build_cell_grid(df, analysis)
+                written = self.pipeline.export(grid, targets)
+            if not any(written.values()):
+                print("\nData unchanged since last update; spreadsheets left as they are")
+                return True
             
             print(f"\nData successfully updated at {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}")
             print(f"Files saved as:")
@@ -53,57 +62,11 @@ End Sub
             
     def _save_excel(self, df, analysis):
         """Save data in Excel format with auto-refresh macro"""
-        with pd.ExcelWriter(self.excel_file, engine='openpyxl', mode='w') as writer:
-            # Write main data
-            df.to_excel(writer, sheet_name='Live Data', index=False)
-            
-            # Write analysis data
-            start_row = 0
-            for title, data in analysis.items():
-                # Write title
-                pd.DataFrame([title.upper()]).to_excel(
-                    writer,
-                    sheet_name='Analysis',
-                    startrow=start_row,
-                    header=False,
-                    index=False
-                )
-                
-                # Write data
-                data.to_excel(
-                    writer,
-                    sheet_name='Analysis',
-                    startrow=start_row + 1,
-                    index=False
-                )
-                start_row += len(data) + 3  # Add spacing between analyses
+        render('xlsm', build_cell_grid(df, analysis), self.excel_file)
                 
     def _save_ods(self, df, analysis):
         """Save data in ODS format with auto-refresh macro"""
-        with pd.ExcelWriter(self.ods_file, engine='odf', mode='w') as writer:
-            # Write main data
-            df.to_excel(writer, sheet_name='Live Data', index=False)
-            
-            # Write analysis data
-            start_row = 0
-            for title, data in analysis.items():
-                # Write title
-                pd.DataFrame([title.upper()]).to_excel(
-                    writer,
-                    sheet_name='Analysis',
-                    startrow=start_row,
-                    header=False,
-                    index=False
-                )
-                
-                # Write data
-                data.to_excel(
-                    writer,
-                    sheet_name='Analysis',
-                    startrow=start_row + 1,
-                    index=False
-                )
-                start_row += len(data) + 3  # Add spacing between analyses
+        render('ods', build_cell_grid(df, analysis), self.ods_file)
                 
     def open_files(self):
         """Open both files in their respective applications"""
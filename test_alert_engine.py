@@ -0,0 +1,114 @@
+import pytest
+
+from alert_engine import AlertEngine, Rule, WebhookSink, parse_rule
+from conftest import make_coin
+from market_data import parse_markets
+
+class ListSink:
+    def __init__(self):
+        self.alerts = []
+
+    def send(self, alerts):
+        self.alerts.extend(alerts)
+
+def snapshot(count=5, **overrides):
+    """Typed snapshot; overrides map a symbol to {field: value}"""
+    coins = [make_coin(rank) for rank in range(1, count + 1)]
+    for coin in coins:
+        coin.update(overrides.get(coin['symbol'], {}))
+    return parse_markets(coins)
+
+def test_parse_rule_forms():
+    rule = parse_rule('BTC < 50000')
+    assert (rule.symbol, rule.metric, rule.op, rule.threshold) == ('btc', 'current_price', '<', 50000)
+    rule = parse_rule('top100 move_1h > 8% cooldown=30m')
+    assert (rule.symbol, rule.top_n, rule.metric, rule.threshold, rule.cooldown) == (None, 100, 'move_1h', 8, 1800)
+    assert parse_rule('* volume_zscore > 4').top_n is None
+    with pytest.raises(ValueError):
+        parse_rule('BTC sentiment > 4')
+
+def test_coin_rules_fire_once_per_crossing_and_respect_cooldown():
+    sink = ListSink()
+    engine = AlertEngine([parse_rule('C1 < 900 cooldown=1h'), parse_rule('C2 > 1000')], [sink])
+
+    assert engine.evaluate(snapshot(), at=0) == []
+    assert [a['rule'] for a in engine.evaluate(snapshot(c1={'current_price': 850.0}), at=60)] == ['C1 < 900 cooldown=1h']
+    # Still below the threshold: no repeat
+    assert engine.evaluate(snapshot(c1={'current_price': 840.0}), at=120) == []
+    # Recovers and crosses again inside the cooldown: suppressed
+    engine.evaluate(snapshot(), at=180)
+    assert engine.evaluate(snapshot(c1={'current_price': 850.0}), at=240) == []
+    # After the cooldown a new crossing alerts again
+    engine.evaluate(snapshot(), at=4000)
+    alerts = engine.evaluate(snapshot(c1={'current_price': 850.0}), at=4100)
+    assert [(a['symbol'], a['value']) for a in alerts] == [('C1', 850.0)]
+    assert len(sink.alerts) == 2
+
+def test_scope_rules_only_cover_their_top_n():
+    engine = AlertEngine([parse_rule('top2 move_1h > 8'), parse_rule('* move_1h > 20')])
+    engine.evaluate(snapshot(), at=0)
+    moved = snapshot(c1={'current_price': 1000.0 * 1.1}, c4={'current_price': 250.0 * 1.1},
+                     c5={'current_price': 200.0 * 1.3})
+
+    alerts = engine.evaluate(moved, at=3600)
+
+    assert sorted((a['rule'], a['symbol']) for a in alerts) == [('* move_1h > 20', 'C5'), ('top2 move_1h > 8', 'C1')]
+    assert {a['symbol']: a['value'] for a in alerts}['C1'] == pytest.approx(10.0)
+    # The same moves on the next tick are not alerted twice
+    assert engine.evaluate(moved, at=3660) == []
+
+def test_volume_zscore_needs_history():
+    engine = AlertEngine([Rule('volume_zscore', '>', 4, top_n=5)], min_zscore_samples=3)
+    for tick in range(4):
+        volume = 500_000 + 1 + tick * 10
+        assert engine.evaluate(snapshot(c1={'total_volume': volume}), at=tick * 300) == []
+
+    alerts = engine.evaluate(snapshot(c1={'total_volume': 5_000_000}), at=1200)
+    assert [a['symbol'] for a in alerts] == ['C1']
+
+def test_failing_sink_does_not_block_others(stub_server):
+    stub_server.routes['/hook'] = lambda query, headers, body: (500, {}, {})
+    sink = ListSink()
+    engine = AlertEngine([parse_rule('C1 > 1')], [WebhookSink(f"{stub_server.url}/hook"), sink])
+
+    engine.evaluate(snapshot(), at=0)
+
+    assert len(sink.alerts) == 1
+    assert stub_server.requests[0][1] == '/hook'
+
+def test_price_only_snapshots_stay_out_of_the_volume_baseline():
+    engine = AlertEngine([Rule('volume_zscore', '>', 4, top_n=5)], zscore_window=4, min_zscore_samples=3)
+    for tick in range(4):
+        engine.evaluate(snapshot(c1={'total_volume': 500_000 + 1 + tick * 10}), at=tick * 300)
+        # Fast ticks in between repeat the last full refresh's volume
+        for fast in range(1, 10):
+            assert engine.evaluate(snapshot(c1={'total_volume': 500_000 + 1 + tick * 10}),
+                                   at=tick * 300 + fast * 30, prices_only=True) == []
+
+    assert len(engine.volumes) == 4
+    alerts = engine.evaluate(snapshot(c1={'total_volume': 5_000_000}), at=1200)
+    assert [a['symbol'] for a in alerts] == ['C1']
+    # The next fast tick keeps the full refresh's z-score instead of alerting again
+    assert engine.evaluate(snapshot(c1={'total_volume': 5_000_000}), at=1230, prices_only=True) == []
+    assert engine.volume_zscore['coin-1'] > 4
+
+def test_coins_sharing_a_symbol_keep_their_own_rank_and_history():
+    def shared(**overrides):
+        coins = snapshot(**overrides)
+        # coin-2 is a smaller coin listed under the same symbol as coin-1
+        coins['symbol'] = coins['symbol'].astype(str).replace('c2', 'c1')
+        return coins
+    engine = AlertEngine([parse_rule('top3 move_1h > 8'), parse_rule('C1 > 1500')])
+    engine.evaluate(shared(), at=0)
+
+    moved = shared(c2={'current_price': 500.0 * 1.1}, c3={'current_price': 1000.0 / 3 * 1.1},
+                   c4={'current_price': 250.0 * 1.1}, c1={'current_price': 2000.0})
+    alerts = engine.evaluate(moved, at=3600)
+
+    # coin-2 is evaluated on its own, so coin-4 is still ranked 4th and out of the top 3
+    assert sorted((a['rule'], a['id']) for a in alerts) == [
+        ('C1 > 1500', 'coin-1'), ('top3 move_1h > 8', 'coin-1'),
+        ('top3 move_1h > 8', 'coin-2'), ('top3 move_1h > 8', 'coin-3')
+    ]
+    assert {a['id']: a['value'] for a in alerts}['coin-2'] == pytest.approx(10.0)
+    assert {a['id']: a['symbol'] for a in alerts}['coin-2'] == 'C1'
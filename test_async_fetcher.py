@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pandas as pd
+
+from async_fetcher import AsyncCoinGeckoClient, AsyncCryptoDataFetcher, Watchlist
+from http_cache import ResponseCache
+from request_planner import RequestPlanner
+from test_fetcher import markets_route, unlimited
+
+def make_async_fetcher(url, watchlists, **kwargs):
+    return AsyncCryptoDataFetcher(watchlists, base_url=url, rate_limiter=unlimited(),
+                                  cache_dir=None, cache_ttl=0, **kwargs)
+
+def test_watchlists_refresh_concurrently(stub_server, tmp_path):
+    stub_server.routes['/coins/markets'] = markets_route(500, delay=0.5)
+    watchlists = [
+        Watchlist(f'list{i}', vs_currency=('usd', 'eur', 'btc')[i % 3], top_n=300, formats=('xlsx',),
+                  output_dir=str(tmp_path))
+        for i in range(12)
+    ]
+    fetcher = make_async_fetcher(stub_server.url, watchlists, planner=RequestPlanner(convert_currencies=False))
+
+    async def refresh_all():
+        try:
+            start = time.perf_counter()
+            results = await fetcher.tick()
+            return results, time.perf_counter() - start
+        finally:
+            await fetcher.close()
+
+    results, elapsed = asyncio.run(refresh_all())
+
+    # Twelve watchlists need two pages per currency; six calls at 0.5s would take 3s in a row
+    assert len(stub_server.requests) == 6
+    assert elapsed < 1.5
+    assert all(len(df) == 300 for df, _ in results.values())
+    currencies = {query['vs_currency'] for _, _, query, _ in stub_server.requests}
+    assert currencies == {'usd', 'eur', 'btc'}
+    # Exports ran on the background workers before close() returned
+    assert pd.read_excel(tmp_path / 'crypto_data_list0.xlsx', sheet_name='Live Data').shape[0] == 300
+    # Each watchlist is labelled in its own currency
+    eur = pd.read_excel(tmp_path / 'crypto_data_list1.xlsx', sheet_name='Live Data')
+    assert 'Current Price (EUR)' in eur.columns and 'Current Price (USD)' not in eur.columns
+    analysis = pd.read_excel(tmp_path / 'crypto_data_list1.xlsx', sheet_name='Analysis', header=None)
+    assert (analysis == 'Current Price (EUR)').any().any()
+
+def test_identical_requests_share_one_fetch(stub_server):
+    stub_server.routes['/coins/markets'] = markets_route(100, delay=0.2)
+    client = AsyncCoinGeckoClient(stub_server.url, rate_limiter=unlimited(), cache=ResponseCache(None, ttl=60))
+    params = {'vs_currency': 'usd', 'per_page': 50, 'page': 1}
+
+    async def fetch_twice():
+        try:
+            return await asyncio.gather(client.get('/coins/markets', params), client.get('/coins/markets', params))
+        finally:
+            await client.close()
+
+    first, second = asyncio.run(fetch_twice())
+    assert first == second
+    assert len(stub_server.requests) == 1
+
+def test_retries_after_rate_limit(stub_server):
+    calls = []
+    def flaky(query, headers, body):
+        calls.append(query)
+        if len(calls) == 1:
+            return 429, {'Retry-After': '0'}, {'error': 'slow down'}
+        return markets_route(10)(query, headers, body)
+    stub_server.routes['/coins/markets'] = flaky
+    watchlist = Watchlist('majors', ids=['coin-7', 'coin-3'])
+    fetcher = make_async_fetcher(stub_server.url, [watchlist])
+
+    async def fetch():
+        try:
+            return await fetcher.fetch_watchlists()
+        finally:
+            await fetcher.close()
+
+    data = asyncio.run(fetch())['majors']
+    assert [coin['id'] for coin in data] == ['coin-3', 'coin-7']
+    assert len(calls) == 2
+    assert calls[-1]['ids'] == 'coin-3,coin-7'
+    assert calls[-1]['sparkline'] == 'False'
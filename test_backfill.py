@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+import backfill
+from backfill import Backfill, split_windows
+from coingecko_client import CoinGeckoClient
+from rate_limiter import TokenBucket
+from snapshot_store import SnapshotStore
+
+COINS = [{'id': 'coin-1', 'symbol': 'c1', 'name': 'Coin 1'}, {'id': 'coin-2', 'symbol': 'c2', 'name': 'Coin 2'}]
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+END = START + timedelta(days=6)
+HOUR = 3600
+
+def chart_route(failing):
+    """Hourly points for every whole hour in [from, to]; window starts listed in `failing` get a 500"""
+    def route(query, headers, body):
+        start, end = int(query['from']), int(query['to'])
+        if start in failing:
+            return 500, {}, {'error': 'boom'}
+        stamps = range(-(-start // HOUR) * HOUR, end + 1, HOUR)
+        return 200, {}, {
+            'prices': [[ts * 1000, 100.0 + ts // HOUR % 24] for ts in stamps],
+            'market_caps': [[ts * 1000, 1e9] for ts in stamps],
+            'total_volumes': [[ts * 1000, 1e6] for ts in stamps]
+        }
+    return route
+
+def setup_api(stub_server, monkeypatch, failing=()):
+    # Two-day windows keep the test small; the real hourly windows are 90 days
+    monkeypatch.setitem(backfill.WINDOWS, 'hourly', (timedelta(days=2), timedelta(0)))
+    failing = set(failing)
+    for coin in COINS:
+        stub_server.routes[f"/coins/{coin['id']}/market_chart/range"] = chart_route(failing)
+    return failing
+
+def make_backfill(stub_server, tmp_path):
+    client = CoinGeckoClient(stub_server.url, api_key='', rate_limiter=TokenBucket(60_000, burst=100),
+                             max_retries=0)
+    return Backfill(client, SnapshotStore(str(tmp_path / 'history')), str(tmp_path / 'checkpoint.json'),
+                    max_workers=4)
+
+def test_windows_cover_the_range_without_overlap():
+    windows = split_windows(START, START + timedelta(days=200), timedelta(days=90))
+    assert [(end - start + 1) // 86400 for start, end in windows] == [90, 90, 20]
+    assert all(nxt[0] == prev[1] + 1 for prev, nxt in zip(windows, windows[1:]))
+
+    # A last window too short for its granularity is stretched back
+    windows = split_windows(START, START + timedelta(days=366), timedelta(days=365), timedelta(days=91))
+    assert windows[-1][1] - windows[-1][0] == 91 * 86400
+
+def test_interrupted_job_resumes_from_checkpoint(stub_server, tmp_path, monkeypatch):
+    failing = setup_api(stub_server, monkeypatch, failing=[int((START + timedelta(days=2)).timestamp())])
+
+    stats = make_backfill(stub_server, tmp_path).run(COINS, START, END, 'hourly')
+    assert stats['windows'] == 4 and stats['failed'] == 2
+    assert len(stub_server.requests) == 6
+
+    failing.clear()
+    stub_server.requests.clear()
+    stats = make_backfill(stub_server, tmp_path).run(COINS, START, END, 'hourly')
+    # Only the two failed windows are fetched again
+    assert stats['windows'] == 2 and stats['skipped'] == 4
+    assert {int(query['from']) for _, _, query, _ in stub_server.requests} == {int((START + timedelta(days=2)).timestamp())}
+
+    history = SnapshotStore(str(tmp_path / 'history')).query()
+    assert len(history) == 2 * 6 * 24
+    assert not history.duplicated(['id', 'timestamp']).any()
+    assert history['market_cap'].dtype == 'int64'
+
+def test_rows_already_stored_are_not_duplicated(stub_server, tmp_path, monkeypatch):
+    setup_api(stub_server, monkeypatch)
+    store = SnapshotStore(str(tmp_path / 'history'))
+    # A live snapshot that happens to land on one of the hourly timestamps
+    store.append(pd.DataFrame([{'id': 'coin-1', 'symbol': 'c1', 'name': 'Coin 1', 'current_price': 1.0}]),
+                 START + timedelta(hours=5))
+
+    stats = make_backfill(stub_server, tmp_path).run(COINS, START, END, 'hourly')
+    assert stats['duplicates'] == 1
+
+    # A fresh job over the same range stores nothing new
+    (tmp_path / 'checkpoint.json').unlink()
+    stats = make_backfill(stub_server, tmp_path).run(COINS, START, END, 'hourly')
+    assert stats['rows'] == 0 and stats['duplicates'] == 2 * 6 * 24
+    assert len(store.query()) == 2 * 6 * 24
+    # Finished days were compacted into one file each
+    assert all(len(list((tmp_path / 'history' / f'date={date}').glob('*.parquet'))) == 1 for date in store.dates())
+
+def test_coins_sharing_a_symbol_are_both_stored(stub_server, tmp_path, monkeypatch):
+    setup_api(stub_server, monkeypatch)
+    coins = [{'id': 'coin-1', 'symbol': 'usdt', 'name': 'Tether'},
+             {'id': 'coin-2', 'symbol': 'usdt', 'name': 'Bridged Tether'}]
+
+    stats = make_backfill(stub_server, tmp_path).run(coins, START, END, 'hourly')
+
+    assert stats['duplicates'] == 0
+    history = SnapshotStore(str(tmp_path / 'history')).query()
+    assert history.groupby('id', observed=True).size().to_dict() == {'coin-1': 6 * 24, 'coin-2': 6 * 24}
+
+def test_coin_listed_partway_through_the_range(stub_server, tmp_path, monkeypatch):
+    setup_api(stub_server, monkeypatch)
+    listed = int((START + timedelta(days=4)).timestamp())
+    full = chart_route(set())
+    # Before its listing a coin's windows come back empty
+    stub_server.routes['/coins/coin-2/market_chart/range'] = lambda query, headers, body: (
+        full(query, headers, body) if int(query['from']) >= listed else (200, {}, {'prices': []})
+    )
+    job = make_backfill(stub_server, tmp_path)
+    job.flush_rows = 1  # flush after every window, so some flushes hold only empty windows
+
+    stats = job.run(COINS[1:], START, END, 'hourly')
+
+    assert stats['windows'] == 3 and stats['failed'] == 0 and stats['rows'] == 2 * 24
+    assert len(make_backfill(stub_server, tmp_path).done) == 3
+
+def test_unfinished_job_resumes_its_range_on_a_later_day(stub_server, tmp_path, monkeypatch):
+    failing = setup_api(stub_server, monkeypatch, failing=[int(START.timestamp())])
+    request = {'top': None, 'ids': ['coin-1', 'coin-2'], 'days': 6, 'granularity': 'hourly'}
+
+    job = make_backfill(stub_server, tmp_path)
+    job.run(COINS, *job.resolve_range(request, START, END), 'hourly')
+
+    # The default range ends tomorrow, so a day later it has moved
+    failing.clear()
+    job = make_backfill(stub_server, tmp_path)
+    start, end = job.resolve_range(request, START + timedelta(days=1), END + timedelta(days=1))
+    assert (start, end) == (START, END)
+    stats = job.run(COINS, start, end, 'hourly')
+    assert stats['windows'] == 2 and stats['skipped'] == 4
+
+    # Once finished, the same command backfills a fresh range
+    later = make_backfill(stub_server, tmp_path).resolve_range(request, START + timedelta(days=1), END + timedelta(days=1))
+    assert later == (START + timedelta(days=1), END + timedelta(days=1))
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+import json_backend
+from coingecko_client import CoinGeckoClient, parse_retry_after
+from http_cache import ResponseCache
+from rate_limiter import TokenBucket
+
+def test_token_bucket_spends_burst_then_waits():
+    bucket = TokenBucket(600, burst=3)  # 10 tokens per second
+
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert 0 < bucket.try_acquire() <= 0.1
+
+def test_token_bucket_pause_blocks_until_released():
+    bucket = TokenBucket(60_000, burst=10)
+    bucket.pause(0.2)
+
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.19
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+def test_client_honours_retry_after_on_429(stub_server):
+    calls = []
+
+    def route(query, headers, body):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            return 429, {'Retry-After': '1'}, {'error': 'rate limited'}
+        return 200, {}, {'ok': True}
+
+    stub_server.routes['/ping'] = route
+    client = CoinGeckoClient(stub_server.url, api_key='', rate_limiter=TokenBucket(60_000, burst=10))
+
+    assert client.get('/ping') == {'ok': True}
+    assert calls[1] - calls[0] >= 0.95
+
+def test_client_retries_server_errors_with_backoff(stub_server):
+    statuses = [503, 502, 200]
+    stub_server.routes['/ping'] = lambda query, headers, body: (statuses.pop(0), {}, {'ok': True})
+    client = CoinGeckoClient(stub_server.url, api_key='', rate_limiter=TokenBucket(60_000, burst=10),
+                             backoff_base=0.01)
+
+    assert client.get('/ping') == {'ok': True}
+    assert len(stub_server.requests) == 3
+
+def test_cache_serves_fresh_entries_and_revalidates_with_etag(stub_server, tmp_path):
+    def route(query, headers, body):
+        if headers.get('If-None-Match') == '"v1"':
+            return 304, {'ETag': '"v1"'}, b''
+        return 200, {'ETag': '"v1"'}, {'price': 1}
+
+    stub_server.routes['/simple/price'] = route
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    client = CoinGeckoClient(stub_server.url, api_key='', rate_limiter=TokenBucket(60_000, burst=10), cache=cache)
+
+    assert client.get('/simple/price', {'ids': 'bitcoin'}) == {'price': 1}
+    assert client.get('/simple/price', {'ids': 'bitcoin'}) == {'price': 1}
+    assert len(stub_server.requests) == 1
+
+    cache.ttl = 0
+    assert client.get('/simple/price', {'ids': 'bitcoin'}) == {'price': 1}
+    assert stub_server.requests[-1][3]['If-None-Match'] == '"v1"'
+    assert cache.stats['hits'] == 1
+    assert cache.stats['revalidated'] == 1
+    assert cache.stats['misses'] == 1
+
+def test_cache_is_shared_through_disk(stub_server, tmp_path):
+    stub_server.routes['/ping'] = lambda query, headers, body: (200, {}, {'ok': True})
+    first = CoinGeckoClient(stub_server.url, api_key='', rate_limiter=TokenBucket(60_000, burst=10),
+                            cache=ResponseCache(str(tmp_path), ttl=60))
+    second = CoinGeckoClient(stub_server.url, api_key='', rate_limiter=TokenBucket(60_000, burst=10),
+                             cache=ResponseCache(str(tmp_path), ttl=60))
+
+    first.get('/ping')
+    assert second.get('/ping') == {'ok': True}
+    assert len(stub_server.requests) == 1
+
+def test_decoder_backend_is_pluggable(stub_server, monkeypatch):
+    stub_server.routes['/ping'] = lambda query, headers, body: (200, {}, {'gecko_says': 'ok'})
+    decoded = []
+    def decoder(payload):
+        decoded.append(payload)
+        return json_backend.DECODERS['json'](payload)
+
+    client = CoinGeckoClient(stub_server.url, rate_limiter=TokenBucket(60_000, burst=100), decoder=decoder)
+    assert client.get('/ping') == {'gecko_says': 'ok'}
+    assert decoded == [b'{"gecko_says": "ok"}']
+
+    monkeypatch.setenv('CRYPTO_JSON_DECODER', 'json')
+    assert json_backend.get_decoder() is json_backend.DECODERS['json']
+    with pytest.raises(ValueError):
+        json_backend.get_decoder('simdjson')
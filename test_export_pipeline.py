@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from export_pipeline import ExportPipeline, build_cell_grid
+
+def make_frames():
+    df = pd.DataFrame({
+        'Cryptocurrency Name': ['Bitcoin', 'Ethereum'],
+        'Current Price (USD)': [65000.5, np.nan],
+        'Market Capitalization': [1_200_000_000_000, 400_000_000_000]
+    })
+    analysis = {
+        'Top 5 by Market Cap': df[['Cryptocurrency Name', 'Market Capitalization']],
+        'Biggest Gainers': df[['Cryptocurrency Name', 'Current Price (USD)']].head(1)
+    }
+    return df, analysis
+
+def test_build_cell_grid_lays_out_sections_once():
+    df, analysis = make_frames()
+    grid = build_cell_grid(df, analysis)
+
+    assert grid.sheets['Live Data'][0] == list(df.columns)
+    assert grid.sheets['Live Data'][2] == ['Ethereum', None, 400_000_000_000]
+    assert grid.sheets['Analysis'][:4] == [
+        ['TOP 5 BY MARKET CAP'],
+        ['Cryptocurrency Name', 'Market Capitalization'],
+        ['Bitcoin', 1_200_000_000_000],
+        ['Ethereum', 400_000_000_000]
+    ]
+    assert grid.sheets['Analysis'][4] == []
+    assert grid.sheets['Analysis'][5] == ['BIGGEST GAINERS']
+
+def test_export_renders_every_format_in_parallel(tmp_path):
+    df, analysis = make_frames()
+    xlsx, ods = str(tmp_path / 'data.xlsm'), str(tmp_path / 'data.ods')
+    pipeline = ExportPipeline()
+    try:
+        pipeline.export(build_cell_grid(df, analysis), [('xlsm', xlsx), ('ods', ods)])
+    finally:
+        pipeline.close()
+
+    for path, engine in [(xlsx, 'openpyxl'), (ods, 'odf')]:
+        live = pd.read_excel(path, sheet_name='Live Data', engine=engine)
+        pd.testing.assert_frame_equal(live, df, check_dtype=False)
+        sections = pd.read_excel(path, sheet_name='Analysis', engine=engine, header=None)
+        assert sections.iloc[0, 0] == 'TOP 5 BY MARKET CAP'
+
+def test_export_skips_unchanged_content_and_writes_atomically(tmp_path):
+    df, analysis = make_frames()
+    path = str(tmp_path / 'data.ods')
+    pipeline = ExportPipeline()
+
+    assert pipeline.export(build_cell_grid(df, analysis), [('ods', path)]) == {path: True}
+    mtime = os.path.getmtime(path)
+    assert pipeline.export(build_cell_grid(df, analysis), [('ods', path)]) == {path: False}
+    assert os.path.getmtime(path) == mtime
+
+    df.loc[0, 'Current Price (USD)'] = 1.0
+    assert pipeline.export(build_cell_grid(df, analysis), [('ods', path)]) == {path: True}
+    assert sorted(os.listdir(tmp_path)) == ['.data.ods.sha256', 'data.ods']
+
+def test_streaming_export_matches_grid_export(tmp_path):
+    df, analysis = make_frames()
+    pipeline = ExportPipeline()
+    targets = [('xlsm', str(tmp_path / 'stream.xlsm')), ('ods', str(tmp_path / 'stream.ods'))]
+
+    assert pipeline.export_streaming(df, analysis, targets) == {path: True for _, path in targets}
+    assert pipeline.export_streaming(df, analysis, targets) == {path: False for _, path in targets}
+
+    grid = build_cell_grid(df, analysis)
+    for (fmt, path), engine in zip(targets, ['openpyxl', 'odf']):
+        for sheet in ['Live Data', 'Analysis']:
+            written = pd.read_excel(path, sheet_name=sheet, engine=engine, header=None)
+            expected = pd.DataFrame(grid.sheets[sheet]).dropna(how='all')
+            assert written.dropna(how='all').fillna('').values.tolist() == expected.fillna('').values.tolist()
@@ -0,0 +1,133 @@
+import time
+
+from conftest import make_coin
+from crypto_analyzer import CryptoDataFetcher
+from rate_limiter import TokenBucket
+
+def unlimited():
+    return TokenBucket(60_000, burst=1000)
+
+def make_fetcher(url, **kwargs):
+    return CryptoDataFetcher(base_url=url, rate_limiter=unlimited(), cache_dir=None, cache_ttl=0, **kwargs)
+
+def markets_route(total, delay=0.0):
+    """Serve a ranked universe of `total` coins, paginated like CoinGecko"""
+    def route(query, headers, body):
+        time.sleep(delay)
+        if 'ids' in query:
+            ranks = sorted(int(coin_id.split('-')[1]) for coin_id in query['ids'].split(','))
+            return 200, {'Content-Type': 'application/json'}, [make_coin(rank) for rank in ranks if rank <= total]
+        per_page = int(query['per_page'])
+        page = int(query['page'])
+        start = (page - 1) * per_page + 1
+        stop = min(start + per_page, total + 1)
+        return 200, {'Content-Type': 'application/json'}, [make_coin(rank) for rank in range(start, stop)]
+    return route
+
+def test_fetch_top_n_merges_pages_in_rank_order(stub_server):
+    stub_server.routes['/coins/markets'] = markets_route(1200)
+    fetcher = make_fetcher(stub_server.url)
+
+    data = fetcher.fetch_top_n(1000)
+
+    assert [coin['id'] for coin in data] == [f'coin-{rank}' for rank in range(1, 1001)]
+    pages = sorted(int(query['page']) for _, _, query, _ in stub_server.requests)
+    assert pages == [1, 2, 3, 4]
+
+def test_fetch_top_n_requests_pages_concurrently(stub_server):
+    stub_server.routes['/coins/markets'] = markets_route(2500, delay=0.3)
+    fetcher = make_fetcher(stub_server.url, max_workers=10)
+
+    start = time.perf_counter()
+    data = fetcher.fetch_top_n(2500)
+    elapsed = time.perf_counter() - start
+
+    assert len(data) == 2500
+    # Ten pages at 0.3s each would take 3s back to back
+    assert elapsed < 1.5
+
+def test_fetch_top_50_is_a_single_page(stub_server):
+    stub_server.routes['/coins/markets'] = markets_route(100)
+    fetcher = make_fetcher(stub_server.url)
+
+    data = fetcher.fetch_top_50_crypto()
+
+    assert len(data) == 50
+    assert len(stub_server.requests) == 1
+    assert stub_server.requests[0][2]['per_page'] == '50'
+
+def test_fetch_reuses_last_good_snapshot_on_failure(stub_server):
+    stub_server.routes['/coins/markets'] = markets_route(100)
+    fetcher = make_fetcher(stub_server.url)
+    fetcher.client.max_retries = 0
+    first = fetcher.fetch_top_n(50)
+
+    stub_server.routes['/coins/markets'] = lambda query, headers, body: (503, {}, {'error': 'down'})
+
+    assert fetcher.fetch_top_n(50) == first
+    assert fetcher.process_crypto_data(None) is None
+
+def test_slow_exports_do_not_delay_fetches(stub_server, tmp_path):
+    stub_server.routes['/coins/markets'] = markets_route(100)
+    fetcher = make_fetcher(stub_server.url, history_dir=str(tmp_path), bus_address=None, metrics_port=None)
+    fetcher.update_spreadsheets = lambda df, analysis: time.sleep(0.6)
+    fetcher.generate_report = lambda df, analysis: time.sleep(0.6)
+
+    class Stop(Exception):
+        pass
+
+    fetch_times = []
+    tick = fetcher._tick
+    def timed_tick(top_n):
+        fetch_times.append(time.monotonic())
+        if len(fetch_times) > 5:
+            raise Stop
+        tick(top_n)
+
+    fetcher._tick = timed_tick
+    try:
+        fetcher.run(interval=0.2)
+    except Stop:
+        pass
+
+    gaps = [b - a for a, b in zip(fetch_times, fetch_times[1:])]
+    assert all(0.15 < gap < 0.3 for gap in gaps), gaps
+    # Exports fell behind, so the snapshots they never got to were coalesced
+    assert fetcher.workers.stats()['coalesced'] > 0
+
+def test_fast_tick_refreshes_prices_without_exports(stub_server, tmp_path):
+    stub_server.routes['/coins/markets'] = markets_route(100)
+    def prices_route(query, headers, body):
+        quotes = {coin_id: {'usd': 2000.0, 'usd_24h_change': 5.0} for coin_id in query['ids'].split(',')}
+        quotes.pop('coin-3')  # not quoted this time
+        return 200, {'Content-Type': 'application/json'}, quotes
+    stub_server.routes['/simple/price'] = prices_route
+    fetcher = make_fetcher(stub_server.url, history_dir=str(tmp_path), bus_address=None, metrics_port=None)
+    fetcher.update_spreadsheets = fetcher.generate_report = None  # a fast tick must not export
+
+    data = fetcher.fetch_top_n(10)
+    fetcher.track(fetcher.process_crypto_data(data))
+    move = fetcher._fast_tick()
+
+    _, path, query, _ = stub_server.requests[-1]
+    assert path == '/simple/price'
+    assert query['ids'].split(',') == [f'coin-{rank}' for rank in range(1, 11)]
+    df = fetcher.last_df
+    assert df['current_price'].tolist() == [2000.0, 2000.0, 1000.0 / 3] + [2000.0] * 7
+    assert df['price_change_percentage_24h'].iloc[0] == 5.0
+    assert move == (2000.0 / 100.0 - 1) * 100
+
+def test_fast_tick_patches_coins_sharing_a_name_by_id(stub_server, tmp_path):
+    def prices_route(query, headers, body):
+        quotes = {coin_id: {'usd': float(coin_id.split('-')[1])} for coin_id in query['ids'].split(',')}
+        return 200, {'Content-Type': 'application/json'}, quotes
+    stub_server.routes['/simple/price'] = prices_route
+    fetcher = make_fetcher(stub_server.url, history_dir=str(tmp_path), bus_address=None, metrics_port=None)
+    data = [make_coin(rank) for rank in range(1, 4)]
+    data[2]['name'] = data[1]['name']
+
+    fetcher.track(fetcher.process_crypto_data(data))
+    fetcher._fast_tick()
+
+    assert fetcher.tracked_ids == ['coin-1', 'coin-2', 'coin-3']
+    assert fetcher.last_df['current_price'].tolist() == [1.0, 2.0, 3.0]
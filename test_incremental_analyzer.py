@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_coin
+from incremental_analyzer import IncrementalAnalyzer, SECTIONS
+
+def make_snapshot(count=200):
+    return pd.DataFrame([make_coin(rank) for rank in range(1, count + 1)])
+
+def expected_section(df, field, largest, k, columns):
+    ranked = df.nlargest(k, field) if largest else df.nsmallest(k, field)
+    return ranked['name'].tolist()
+
+def test_matches_full_recomputation_across_ticks():
+    analyzer = IncrementalAnalyzer()
+    rng = np.random.default_rng(7)
+    df = make_snapshot()
+
+    for _ in range(20):
+        changed = rng.choice(len(df), size=10, replace=False)
+        df.loc[changed, 'price_change_percentage_24h'] = rng.normal(0, 10, size=10)
+        df.loc[changed, 'total_volume'] = rng.integers(100_000, 10_000_000, size=10)
+        analysis = analyzer.update(df)
+
+        for title, (field, largest, k, columns) in SECTIONS.items():
+            assert analysis[title]['Cryptocurrency Name'].tolist() == expected_section(df, field, largest, k, columns)
+        assert np.isclose(analyzer.summary()['Total Market Cap'], df['market_cap'].sum())
+        assert np.isclose(analyzer.summary()['Average Price Change'], df['price_change_percentage_24h'].mean())
+
+def test_only_changed_coins_are_reprocessed():
+    analyzer = IncrementalAnalyzer()
+    df = make_snapshot()
+    analyzer.update(df)
+    assert analyzer.last_changed == len(df)
+
+    df.loc[5, 'current_price'] = 1.0
+    analyzer.update(df)
+    assert analyzer.last_changed == 1
+
+def test_removed_coins_leave_rankings_and_totals():
+    analyzer = IncrementalAnalyzer()
+    df = make_snapshot(10)
+    analyzer.update(df)
+
+    analysis = analyzer.update(df.iloc[1:])
+
+    assert 'Coin 1' not in analysis['Top 5 by Market Cap']['Cryptocurrency Name'].tolist()
+    assert np.isclose(analyzer.summary()['Total Market Cap'], df['market_cap'].iloc[1:].sum())
+    assert list(analysis['Biggest Gainers'].index) == [1, 2, 3]
+
+def test_coins_sharing_a_name_are_tracked_separately():
+    analyzer = IncrementalAnalyzer()
+    df = make_snapshot(10)
+    df.loc[1, 'name'] = 'Coin 1'
+
+    analyzer.update(df)
+    df.loc[1, 'current_price'] = 2.0
+    analysis = analyzer.update(df)
+
+    assert analyzer.last_changed == 1
+    assert analysis['Top 5 by Market Cap']['Cryptocurrency Name'].tolist()[:2] == ['Coin 1', 'Coin 1']
+    assert np.isclose(analyzer.summary()['Total Market Cap'], df['market_cap'].sum())
+
+def test_new_entrant_does_not_reprocess_the_coins_it_displaces():
+    analyzer = IncrementalAnalyzer()
+    df = make_snapshot()
+    analyzer.update(df)
+
+    entrant = pd.DataFrame([make_coin(1000)]).assign(id='new-coin', market_cap=20_000_000)
+    analysis = analyzer.update(pd.concat([df.iloc[:1], entrant, df.iloc[1:-1]], ignore_index=True))
+
+    assert analyzer.last_changed == 2  # the entrant, plus the coin that dropped off the end
+    assert analysis['Top 5 by Market Cap']['Cryptocurrency Name'].iloc[0] == 'Coin 1000'
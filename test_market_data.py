@@ -0,0 +1,66 @@
+import numpy as np
+
+from conftest import make_coin
+from export_pipeline import build_cell_grid
+from incremental_analyzer import IncrementalAnalyzer
+from market_data import DISPLAY_LABELS, display_frame, parse_markets
+
+def test_parse_markets_builds_typed_columns():
+    data = [make_coin(rank) for rank in range(1, 51)]
+    data[3]['high_24h'] = None
+
+    df = parse_markets(data)
+
+    assert df['symbol'].dtype == 'category'
+    assert df['market_cap'].dtype == 'int64'
+    assert df['price_change_percentage_24h'].dtype == 'float32'
+    assert df['current_price'].dtype == 'float64'
+    assert np.isnan(df.loc[3, 'high_24h'])
+    assert df['id'].tolist() == [coin['id'] for coin in data]
+    assert df['name'].tolist() == [coin['name'] for coin in data]
+    assert parse_markets([]) is None
+
+def test_field_missing_from_the_payload_is_left_blank(capsys):
+    data = [make_coin(rank) for rank in range(1, 4)]
+    for coin in data:
+        del coin['ath']
+
+    df = parse_markets(data)
+
+    assert len(df) == 3
+    assert df['ath'].isna().all()
+    assert "no ['ath']" in capsys.readouterr().out
+
+def test_malformed_coins_drop_only_their_row(capsys):
+    data = [make_coin(rank) for rank in range(1, 9)]
+    data[1]['current_price'] = None           # required field missing
+    data[2]['market_cap'] = 'n/a'             # present but not a number
+    data[3]['symbol'] = 42                    # symbol is not text
+    data[4]['high_24h'] = None                # optional gaps are fine
+    data[5]['total_volume'] = {'usd': 1}      # wrong shape
+    del data[6]['id']                         # no stable key
+    data.append(None)
+
+    df = parse_markets(data)
+
+    assert df['name'].tolist() == ['Coin 1', 'Coin 5', 'Coin 8']
+    assert df['market_cap'].dtype == 'int64'
+    assert "Dropped 6 malformed coins" in capsys.readouterr().out
+    assert parse_markets([{'name': 'x'}]) is None
+
+def test_labels_and_float32_values_only_change_at_export():
+    data = [make_coin(rank) for rank in range(1, 11)]
+    data[0]['price_change_percentage_24h'] = 3.21
+    df = parse_markets(data)
+    analysis = IncrementalAnalyzer().update(df)
+
+    display = display_frame(df)
+    assert list(display.columns) == list(DISPLAY_LABELS.values())
+    assert list(df.columns) == ['id'] + list(DISPLAY_LABELS)  # the typed frame is untouched
+
+    grid = build_cell_grid(display, analysis)
+    live = grid.sheets['Live Data']
+    change = live[0].index('Price Change (24h %)')
+    # Stored as float32, exported as the value the API sent
+    assert live[1][change] == 3.21
+    assert any(3.21 in row for row in grid.sheets['Analysis'])
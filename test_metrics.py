@@ -0,0 +1,59 @@
+import json
+import logging
+import urllib.request
+
+import pytest
+
+from coingecko_client import CoinGeckoClient
+from metrics import API_RETRIES, STAGE_SECONDS, MetricsRegistry, MetricsServer, stage_timer
+from rate_limiter import TokenBucket
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    errors = registry.counter('api_errors_total', 'Failed requests', ['reason'])
+    latency = registry.histogram('tick_seconds', 'Tick latency', buckets=(0.1, 1))
+    errors.inc(reason='503')
+    errors.inc(2, reason='503')
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    text = registry.render()
+    assert '# TYPE api_errors_total counter' in text
+    assert 'api_errors_total{reason="503"} 3' in text
+    assert 'tick_seconds_bucket{le="0.1"} 1' in text
+    assert 'tick_seconds_bucket{le="1"} 2' in text
+    assert 'tick_seconds_bucket{le="+Inf"} 2' in text
+    assert 'tick_seconds_count 2' in text
+    with pytest.raises(ValueError):
+        errors.inc(status='503')
+
+def test_metrics_endpoint_serves_the_registry():
+    registry = MetricsRegistry()
+    registry.gauge('export_queue_depth', 'Queued exports').set(4)
+    server = MetricsServer(registry, port=0)
+    try:
+        with urllib.request.urlopen(server.url, timeout=5) as response:
+            assert response.status == 200
+            assert 'export_queue_depth 4' in response.read().decode()
+    finally:
+        server.close()
+
+def test_stage_timer_observes_and_logs(caplog):
+    before = STAGE_SECONDS.summary(stage='test_stage')[0]
+    with caplog.at_level(logging.INFO, logger='CryptoMetrics'):
+        with stage_timer('test_stage', coins=3):
+            pass
+
+    assert STAGE_SECONDS.summary(stage='test_stage')[0] == before + 1
+    event = json.loads(caplog.records[-1].getMessage())
+    assert event['event'] == 'stage' and event['stage'] == 'test_stage'
+    assert event['coins'] == 3 and event['ok'] is True
+
+def test_client_counts_retries(stub_server):
+    responses = iter([(503, {}, {'error': 'down'}), (200, {}, [])])
+    stub_server.routes['/ping'] = lambda query, headers, body: next(responses)
+    client = CoinGeckoClient(stub_server.url, rate_limiter=TokenBucket(60_000, burst=100), backoff_base=0.01)
+    before = API_RETRIES.value(reason='503')
+
+    assert client.get('/ping') == []
+    assert API_RETRIES.value(reason='503') == before + 1
@@ -0,0 +1,36 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from export_pipeline import ExportPipeline, build_cell_grid
+from monitor_updates import FileWatcher, diff_prices, read_price_data
+
+def write_prices(path, prices):
+    df = pd.DataFrame({'Cryptocurrency Name': list(prices), 'Current Price (USD)': list(prices.values())})
+    ExportPipeline().export(build_cell_grid(df, {}), [('ods', path)])
+
+def test_watcher_reports_atomic_replacements_promptly(tmp_path):
+    path = str(tmp_path / 'crypto_data.ods')
+    write_prices(path, {'Bitcoin': 1.0})
+    watcher = FileWatcher([path], poll_interval=0.05, use_events=False)
+
+    assert watcher.wait(timeout=0.2) == []
+
+    timer = threading.Timer(0.1, write_prices, args=(path, {'Bitcoin': 2.0}))
+    timer.start()
+    start = time.monotonic()
+    assert watcher.wait(timeout=5) == [os.path.abspath(path)]
+    assert time.monotonic() - start < 1.0
+    assert read_price_data(path) == {'Bitcoin': 2.0}
+
+def test_diff_prices_covers_every_coin():
+    old = {'Bitcoin': 1.0, 'Ethereum': 2.0, 'Solana': 3.0, 'Dead': float('nan')}
+    new = {'Bitcoin': 1.0, 'Ethereum': 2.5, 'Cardano': 4.0, 'Dead': float('nan')}
+
+    assert diff_prices(old, new) == [
+        ('Cardano', None, 4.0),
+        ('Ethereum', 2.0, 2.5),
+        ('Solana', 3.0, None)
+    ]
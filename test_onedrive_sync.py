@@ -0,0 +1,116 @@
+import json
+
+import pytest
+import requests
+
+from onedrive_sync import OneDriveSync
+
+ITEM_ID = 'ITEM123'
+
+def graph_stub(server, fail_first_chunk=False):
+    """Minimal Microsoft Graph drive: simple uploads, upload sessions and share links"""
+    stored = {}
+
+    def simple_upload(query, headers, body):
+        stored['content'] = body
+        return 201, {}, {'id': ITEM_ID, 'name': 'book.xlsx', 'size': len(body)}
+
+    def create_session(query, headers, body):
+        stored['content'] = b''
+        return 200, {}, {'uploadUrl': f"{server.url}/upload/session1"}
+
+    failures = [fail_first_chunk]
+    def upload_chunk(query, headers, body):
+        if headers.get('Authorization'):
+            return 401, {}, {'error': 'upload URLs take no bearer token'}
+        if failures.pop() if failures else False:
+            return 503, {'Retry-After': '0'}, {'error': 'busy'}
+        start, end, total = map(int, headers['Content-Range'].split(' ')[1].replace('/', '-').split('-'))
+        assert start == len(stored['content'])
+        stored['content'] += body
+        if end + 1 < total:
+            return 202, {}, {'nextExpectedRanges': [f"{end + 1}-"]}
+        return 201, {}, {'id': ITEM_ID, 'size': total}
+
+    def create_link(query, headers, body):
+        assert json.loads(body)['type'] == 'view'
+        return 201, {}, {'link': {'webUrl': f'https://onedrive.example/{ITEM_ID}'}}
+
+    server.routes[('PUT', '/me/drive/root:/book.xlsx:/content')] = simple_upload
+    server.routes[('PUT', f'/me/drive/items/{ITEM_ID}/content')] = simple_upload
+    server.routes[('POST', '/me/drive/root:/book.xlsx:/createUploadSession')] = create_session
+    server.routes[('PUT', '/upload/session1')] = upload_chunk
+    server.routes[('POST', f'/me/drive/items/{ITEM_ID}/createLink')] = create_link
+    return stored
+
+def make_sync(server, tmp_path, **kwargs):
+    return OneDriveSync('token', 'book.xlsx', base_url=server.url, state_file=str(tmp_path / 'state.json'),
+                        backoff_base=0.01, **kwargs)
+
+def graph_calls(server):
+    return [(method, path) for method, path, _, _ in server.requests]
+
+def test_unchanged_content_is_not_uploaded_again(stub_server, tmp_path):
+    graph_stub(stub_server)
+    workbook = tmp_path / 'book.xlsx'
+    workbook.write_bytes(b'v1')
+    sync = make_sync(stub_server, tmp_path)
+
+    assert sync.upload(str(workbook))
+    link = sync.share_link()
+    assert not sync.upload(str(workbook))
+    assert sync.share_link() == link
+    workbook.write_bytes(b'v2')
+    assert sync.upload(str(workbook))
+
+    assert graph_calls(stub_server) == [
+        ('PUT', '/me/drive/root:/book.xlsx:/content'),
+        ('POST', f'/me/drive/items/{ITEM_ID}/createLink'),
+        ('PUT', f'/me/drive/items/{ITEM_ID}/content'),
+    ]
+    assert stub_server.requests[0][3]['Authorization'] == 'Bearer token'
+
+def test_item_and_share_link_survive_restarts(stub_server, tmp_path):
+    graph_stub(stub_server)
+    workbook = tmp_path / 'book.xlsx'
+    workbook.write_bytes(b'v1')
+    first = make_sync(stub_server, tmp_path)
+    first.upload(str(workbook))
+    link = first.share_link()
+
+    restarted = make_sync(stub_server, tmp_path)
+    assert not restarted.upload(str(workbook))
+    assert restarted.share_link() == link
+    assert len(stub_server.requests) == 2
+
+def test_large_workbooks_use_a_resumable_upload_session(stub_server, tmp_path):
+    stored = graph_stub(stub_server, fail_first_chunk=True)
+    workbook = tmp_path / 'book.xlsx'
+    content = bytes(range(256)) * 40
+    workbook.write_bytes(content)
+    sync = make_sync(stub_server, tmp_path, chunk_size=4096, simple_upload_limit=1024)
+
+    assert sync.upload(str(workbook))
+    assert stored['content'] == content
+    chunks = [headers['Content-Range'] for _, path, _, headers in stub_server.requests if path == '/upload/session1']
+    # The throttled first chunk was retried, then the rest followed in order
+    assert chunks == ['bytes 0-4095/10240', 'bytes 0-4095/10240', 'bytes 4096-8191/10240', 'bytes 8192-10239/10240']
+
+def test_deleted_remote_item_is_uploaded_and_shared_again(stub_server, tmp_path):
+    graph_stub(stub_server)
+    workbook = tmp_path / 'book.xlsx'
+    workbook.write_bytes(b'v1')
+    sync = make_sync(stub_server, tmp_path)
+    sync.upload(str(workbook))
+    sync.share_link()
+
+    del stub_server.routes[('PUT', f'/me/drive/items/{ITEM_ID}/content')]  # the stub now 404s
+    workbook.write_bytes(b'v2')
+    assert sync.upload(str(workbook))
+    assert sync.state['share_link'] is None
+    assert graph_calls(stub_server)[-1] == ('PUT', '/me/drive/root:/book.xlsx:/content')
+
+    stub_server.routes[('PUT', '/me/drive/root:/book.xlsx:/content')] = lambda q, h, b: (500, {}, {})
+    workbook.write_bytes(b'v3')
+    with pytest.raises(requests.HTTPError):
+        make_sync(stub_server, tmp_path, max_retries=1).upload(str(workbook))
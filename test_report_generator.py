@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pandas as pd
+
+from conftest import make_coin
+from report_generator import CryptoReportGenerator
+
+def make_report_frame(count=20):
+    coins = pd.DataFrame([make_coin(rank) for rank in range(1, count + 1)])
+    return pd.DataFrame({
+        'Cryptocurrency Name': coins['name'],
+        'Symbol': coins['symbol'].str.upper(),
+        'Current Price (USD)': coins['current_price'],
+        'Market Capitalization': coins['market_cap'],
+        '24-hour Trading Volume': coins['total_volume'],
+        'Price Change (24h %)': coins['price_change_percentage_24h']
+    })
+
+def test_report_renders_charts_in_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    report_file = CryptoReportGenerator().generate_report(make_report_frame(), {})
+
+    with open(report_file, 'rb') as f:
+        assert f.read(5) == b'%PDF-'
+    # Charts never touch the disk and never start pyplot's GUI machinery
+    assert os.listdir(tmp_path) == [report_file]
+    assert 'matplotlib.pyplot' not in sys.modules
+
+def test_each_report_starts_from_a_fresh_document(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generator = CryptoReportGenerator()
+    df = make_report_frame()
+
+    sizes = []
+    for run in range(3):
+        report_file = generator.generate_report(df, {})
+        sizes.append(os.path.getsize(report_file))
+        os.rename(report_file, f'run-{run}.pdf')
+
+    # Earlier reports are not carried into later ones
+    assert max(sizes) - min(sizes) < 100
+    assert generator.pdf is None
+    with open('run-2.pdf', 'rb') as f:
+        assert f.read().count(b'Cryptocurrency Market Analysis') <= 1
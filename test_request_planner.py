@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from request_planner import RequestPlanner, Watchlist, naive_call_count
+from test_fetcher import make_coin
+
+BTC_QUOTES = {'usd': 50_000.0, 'eur': 40_000.0, 'btc': 1.0}
+
+class FakeApi:
+    """In-memory /coins/markets and /simple/price that records every call"""
+    def __init__(self, total=1000):
+        self.total = total
+        self.calls = []
+
+    async def get(self, path, params):
+        self.calls.append((path, params))
+        if path == '/simple/price':
+            return {'bitcoin': {c: BTC_QUOTES[c] for c in params['vs_currencies'].split(',')}}
+        if 'ids' in params:
+            ranks = sorted(int(coin_id.split('-')[1]) for coin_id in params['ids'].split(','))
+        else:
+            start = (params['page'] - 1) * params['per_page'] + 1
+            ranks = range(start, start + params['per_page'])
+        return [make_coin(rank) for rank in ranks if rank <= self.total]
+
+def run_plan(planner, watchlists, api):
+    return asyncio.run(planner.fetch(api.get, watchlists))
+
+def test_overlapping_views_share_calls():
+    watchlists = [
+        Watchlist('top100_usd', 'usd', top_n=100),
+        Watchlist('top500_usd', 'usd', top_n=500),
+        Watchlist('top500_eur', 'eur', top_n=500),
+        Watchlist('top50_btc', 'btc', top_n=50),
+        Watchlist('defi_eur', 'eur', ids=['coin-20', 'coin-700', 'coin-5']),
+        Watchlist('l1_usd', 'usd', ids=['coin-700', 'coin-900'])
+    ]
+    api = FakeApi()
+    planner = RequestPlanner(convert_currencies=True)
+
+    data = run_plan(planner, watchlists, api)
+
+    # Two ranking pages, one ids= batch for the coins outside the top 500, one rate quote
+    assert len(api.calls) == 4 == planner.last_calls
+    assert planner.last_naive_calls == naive_call_count(watchlists) == 8
+    ids_calls = [params['ids'] for path, params in api.calls if path == '/coins/markets' and 'ids' in params]
+    assert ids_calls == ['coin-700,coin-900']
+
+    assert [coin['id'] for coin in data['top500_usd']] == [f'coin-{rank}' for rank in range(1, 501)]
+    assert len(data['top100_usd']) == 100
+    assert [coin['id'] for coin in data['defi_eur']] == ['coin-5', 'coin-20', 'coin-700']
+    assert [coin['id'] for coin in data['l1_usd']] == ['coin-700', 'coin-900']
+
+def test_currency_views_are_converted_from_the_base_fetch():
+    api = FakeApi()
+    planner = RequestPlanner(convert_currencies=True)
+    data = run_plan(planner, [Watchlist('usd', 'usd', top_n=10), Watchlist('eur', 'eur', top_n=10)], api)
+
+    usd, eur = data['usd'][0], data['eur'][0]
+    assert eur['current_price'] == pytest.approx(usd['current_price'] * 0.8)
+    assert eur['market_cap'] == pytest.approx(usd['market_cap'] * 0.8)
+    # USD-based changes and past levels can't be converted, so they are blank, not carried over
+    assert usd['price_change_percentage_24h'] is not None
+    assert eur['price_change_percentage_24h'] is None
+    assert eur['high_24h'] is None and eur['ath'] is None and eur['ath_change_percentage'] is None
+    assert {params['vs_currency'] for path, params in api.calls if path == '/coins/markets'} == {'usd'}
+
+def test_exact_currencies_fetch_each_currency():
+    api = FakeApi()
+    planner = RequestPlanner()
+    run_plan(planner, [Watchlist('usd', 'usd', top_n=10), Watchlist('eur', 'eur', top_n=10)], api)
+
+    assert sorted(params['vs_currency'] for _, params in api.calls) == ['eur', 'usd']
+    assert all(path == '/coins/markets' for path, _ in api.calls)
+
+def test_ids_are_batched_to_the_api_limit():
+    api = FakeApi(total=2000)
+    ids = [f'coin-{rank}' for rank in range(1, 601)]
+    data = run_plan(RequestPlanner(max_ids=250), [Watchlist('big', ids=ids)], api)
+
+    assert [len(params['ids'].split(',')) for _, params in api.calls] == [250, 250, 100]
+    assert len(data['big']) == 600
+
+def test_currency_without_a_rate_is_skipped_not_shown_in_usd(capsys):
+    class NoEurApi(FakeApi):
+        async def get(self, path, params):
+            response = await super().get(path, params)
+            if path == '/simple/price':
+                response['bitcoin'].pop('eur')
+            return response
+
+    data = run_plan(RequestPlanner(convert_currencies=True),
+                    [Watchlist('usd', 'usd', top_n=10), Watchlist('eur', 'eur', top_n=10)], NoEurApi())
+
+    assert list(data) == ['usd']
+    assert 'skipping eur' in capsys.readouterr().out
+
+def test_malformed_records_are_dropped_one_by_one(capsys):
+    class BrokenApi(FakeApi):
+        async def get(self, path, params):
+            response = await super().get(path, params)
+            if path == '/coins/markets' and params['page'] == 1 and 'ids' not in params:
+                del response[2]['id']
+                response[4] = None
+            return response
+
+    data = run_plan(RequestPlanner(), [Watchlist('top10', 'usd', top_n=10), Watchlist('pick', ids=['coin-2'])], BrokenApi())
+
+    assert len(data['top10']) == 8
+    assert [coin['id'] for coin in data['pick']] == ['coin-2']
+    assert 'Dropped 2 malformed coins' in capsys.readouterr().out
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from conftest import make_coin
+from rolling_analytics import RollingAnalytics
+from snapshot_store import SnapshotStore
+
+def make_history(prices, volumes=None, freq='5min'):
+    """Long history rows for a dict of symbol -> price list"""
+    rows = []
+    times = pd.date_range('2025-03-01', periods=len(next(iter(prices.values()))), freq=freq, tz='UTC')
+    for symbol, series in prices.items():
+        for i, (timestamp, price) in enumerate(zip(times, series)):
+            volume = volumes[symbol][i] if volumes else 1.0
+            rows.append({'timestamp': timestamp, 'symbol': symbol, 'name': symbol.upper(),
+                         'current_price': price, 'total_volume': volume})
+    return pd.DataFrame(rows)
+
+def test_compute_returns_drawdown_and_vwap():
+    engine = RollingAnalytics(bar='1h', horizons=('1h', '3h'), window='3h')
+    history = make_history(
+        {'btc': [100, 120, 90, 99, 110], 'eth': [10, 10, 10, 10, 10]},
+        volumes={'btc': [1, 1, 1, 1, 3], 'eth': [1, 1, 1, 1, 1]},
+        freq='1h'
+    )
+
+    metrics = engine.compute(engine.build_panel(history))
+
+    btc = metrics.loc['btc']
+    assert btc['Cryptocurrency Name'] == 'BTC'
+    assert np.isclose(btc['Return 1h %'], (110 / 99 - 1) * 100)
+    assert np.isclose(btc['Return 3h %'], (110 / 120 - 1) * 100)
+    assert np.isclose(btc['Max Drawdown %'], -25.0)
+    assert np.isclose(btc['VWAP 3h'], (90 + 99 + 110 * 3) / 5)
+    assert metrics.loc['eth', 'Max Drawdown %'] == 0
+
+def test_build_panel_forward_fills_missed_ticks():
+    engine = RollingAnalytics(bar='5min')
+    history = make_history({'btc': [1.0, 2.0, 3.0], 'eth': [5.0, 6.0, 7.0]})
+    history = history.drop(history[(history['symbol'] == 'eth')].index[1])
+
+    panel = engine.build_panel(history)
+
+    assert list(panel.symbols) == ['btc', 'eth']
+    assert panel.prices[:, 1].tolist() == [5.0, 5.0, 7.0]
+
+def test_sections_plug_into_analysis_dict():
+    engine = RollingAnalytics()
+    rng = np.random.default_rng(0)
+    history = make_history({f'c{i}': 100 + rng.normal(0, 1, 400).cumsum() for i in range(8)})
+
+    sections = engine.sections(history, top=3)
+
+    assert list(sections) == RollingAnalytics.SECTIONS
+    assert all(len(section) == 3 for section in sections.values())
+    assert engine.sections(pd.DataFrame()) == {}
+
+def test_history_read_back_from_the_store_keeps_its_bars(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    start = datetime(2025, 3, 5, tzinfo=timezone.utc)
+    for tick in range(30):
+        coins = [make_coin(rank) for rank in range(1, 4)]
+        for coin in coins:
+            coin['current_price'] *= 1 + tick / 100
+        store.append(pd.DataFrame(coins), start + timedelta(minutes=5 * tick))
+    engine = RollingAnalytics(horizons=('1h',), window='1h')
+
+    history = store.query()
+    panel = engine.build_panel(history)
+    metrics = engine.compute(panel)
+
+    assert len(panel.times) == 30
+    assert panel.times[0] == pd.Timestamp(start)
+    assert np.isclose(metrics.loc['coin-1', 'Return 1h %'], (1.29 / 1.17 - 1) * 100)
+    assert metrics['Volatility 1h %'].notna().all()
+
+def test_coins_sharing_a_symbol_get_their_own_columns():
+    engine = RollingAnalytics(horizons=('5min',), window='1h')
+    history = make_history({'usdt': [1.0, 1.0, 1.0], 'usdt-bridged': [0.5, 0.5, 0.5]})
+    history['id'] = history['symbol']
+    history['symbol'] = 'usdt'
+    # The two coins swap places in the list between snapshots
+    history = history.iloc[[0, 3, 4, 1, 2, 5]].reset_index(drop=True)
+
+    panel = engine.build_panel(history)
+    metrics = engine.compute(panel)
+
+    assert list(panel.coins) == ['usdt', 'usdt-bridged']
+    assert list(panel.symbols) == ['usdt', 'usdt']
+    assert metrics['Return 5min %'].tolist() == [0.0, 0.0]
+    assert metrics['Max Drawdown %'].tolist() == [0.0, 0.0]
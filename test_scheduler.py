@@ -0,0 +1,130 @@
+import threading
+import time
+
+from scheduler import AdaptiveInterval, BackgroundWorkers, FixedRateScheduler, TieredScheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def test_ticks_stay_on_the_fixed_rate_grid():
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(10, clock=clock, sleep=clock.sleep)
+
+    fired = []
+    for work in [3, 7, 9.5, 1]:
+        fired.append(scheduler.wait())
+        clock.now += work  # time spent fetching doesn't delay the next tick
+    assert fired == [100, 110, 120, 130]
+    assert scheduler.missed == 0
+
+def test_overrun_skips_missed_ticks_instead_of_bursting():
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(10, clock=clock, sleep=clock.sleep)
+
+    scheduler.wait()
+    clock.now += 25  # stalled through two whole intervals
+    assert scheduler.wait() == 120
+    assert scheduler.missed == 1
+    assert scheduler.drift == 5
+    clock.now += 1
+    assert scheduler.wait() == 130
+
+def test_fast_ticks_fill_the_gaps_between_full_ticks():
+    clock = FakeClock()
+    scheduler = TieredScheduler(10, 4, clock=clock, sleep=clock.sleep)
+
+    fired = []
+    for _ in range(8):
+        fired.append((scheduler.wait(), clock.now))
+        clock.now += 0.5
+    # The fast ticks that would land on 112 and 122 are folded into the full refreshes
+    assert fired == [('full', 100), ('fast', 104), ('fast', 108), ('full', 110),
+                     ('fast', 114), ('fast', 118), ('full', 120), ('fast', 124)]
+
+def test_slow_full_tick_is_not_followed_by_a_burst_of_fast_ticks():
+    clock = FakeClock()
+    scheduler = TieredScheduler(10, 2, clock=clock, sleep=clock.sleep)
+
+    scheduler.wait()
+    clock.now += 9  # the full refresh took most of the interval
+    assert scheduler.wait() == 'fast'
+    assert clock.now == 109
+    assert scheduler.wait() == 'full'
+    assert clock.now == 110
+
+class FixedBucket:
+    rate = 1.0  # 60 calls per minute
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def available(self):
+        return self.tokens
+
+def test_adaptive_interval_follows_volatility_within_bounds():
+    interval = AdaptiveInterval(8, minimum=2, maximum=30)
+
+    assert interval.update(2.0) == 4
+    assert interval.update(2.0) == 2
+    assert interval.update(2.0) == 2
+    assert interval.update(0.2) == 5  # back halfway to the base
+    assert interval.update(0.0) == 7.5
+    for _ in range(10):
+        interval.update(0.0)
+    assert interval.interval == 30
+
+def test_adaptive_interval_never_outruns_the_quota():
+    bucket = FixedBucket(tokens=10)
+    interval = AdaptiveInterval(1, minimum=0.25, rate_limiter=bucket, headroom=0.8)
+
+    # 0.8 calls/s of headroom, 0.3 of them reserved for full refreshes: 2 calls need 4s
+    assert interval.update(5.0, calls_per_tick=2, reserved_rate=0.3) == 4
+    bucket.tokens = 1
+    assert interval.update(5.0, calls_per_tick=2, reserved_rate=0.3) == 8
+
+def test_stale_jobs_are_coalesced_into_the_latest():
+    workers = BackgroundWorkers(max_workers=1)
+    release = threading.Event()
+    done = []
+    workers.submit('export', release.wait)
+    time.sleep(0.05)  # let the worker pick up the blocking job
+
+    for snapshot in range(5):
+        workers.submit('export', done.append, snapshot)
+    assert workers.queue_depth() == 1
+    assert workers.lag() > 0
+
+    release.set()
+    assert workers.join(timeout=5)
+    assert done == [4]
+    assert workers.stats()['coalesced'] == 4
+    workers.close()
+
+def test_jobs_of_one_kind_never_overlap():
+    workers = BackgroundWorkers(max_workers=4)
+    active, overlaps = [], []
+    lock = threading.Lock()
+
+    def job(kind):
+        with lock:
+            if kind in active:
+                overlaps.append(kind)
+            active.append(kind)
+        time.sleep(0.02)
+        with lock:
+            active.remove(kind)
+
+    for _ in range(10):
+        for kind in ('spreadsheets', 'report'):
+            workers.submit(kind, job, kind)
+        time.sleep(0.005)
+    workers.close()
+    assert overlaps == []
+    assert workers.stats()['failed'] == 0
@@ -0,0 +1,66 @@
+import logging
+import os
+import time
+
+from share_publisher import SharePublisher
+
+def write(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+
+def test_only_changed_content_is_copied(tmp_path):
+    source = str(tmp_path / 'crypto_data.ods')
+    shares = [str(tmp_path / 'share1'), str(tmp_path / 'share2' / 'nested')]
+    publisher = SharePublisher(shares, debounce=60)
+    try:
+        write(source, 'v1')
+        publisher.publish(source)
+        assert set(publisher.flush().values()) == {'copied'}
+        publisher.publish(source)
+        assert set(publisher.flush().values()) == {'unchanged'}
+        write(source, 'v2')
+        publisher.publish(source)
+        assert set(publisher.flush().values()) == {'copied'}
+    finally:
+        publisher.close()
+
+    for share in shares:
+        with open(os.path.join(share, 'crypto_data.ods')) as f:
+            assert f.read() == 'v2'
+        # Nothing but the file and its digest is left behind by the temp-file rename
+        assert sorted(os.listdir(share)) == ['.crypto_data.ods.sha256', 'crypto_data.ods']
+
+def test_bursts_are_coalesced(tmp_path, monkeypatch):
+    source = str(tmp_path / 'crypto_data.ods')
+    write(source, 'v1')
+    publisher = SharePublisher([str(tmp_path / 'share')], debounce=0.3)
+    batches = []
+    publish = publisher._publish
+    monkeypatch.setattr(publisher, '_publish', lambda sources: batches.append(sources) or publish(sources))
+    try:
+        for _ in range(5):
+            publisher.publish(source)
+            time.sleep(0.05)
+        assert batches == []
+        time.sleep(0.6)
+        assert batches == [[source]]
+    finally:
+        publisher.close()
+
+def test_failed_setup_is_not_retried_every_tick(tmp_path, caplog):
+    blocker = tmp_path / 'not_a_dir'
+    write(str(blocker), '')
+    source = str(tmp_path / 'crypto_data.ods')
+    write(source, 'v1')
+    publisher = SharePublisher([str(blocker / 'share')], debounce=60, setup_retry=300)
+    try:
+        with caplog.at_level(logging.INFO, logger='NetworkShare'):
+            for _ in range(3):
+                publisher.publish(source)
+                assert set(publisher.flush().values()) == {'skipped'}
+    finally:
+        publisher.close()
+
+    errors = [r for r in caplog.records if r.levelno == logging.ERROR]
+    assert len(errors) == 1 and 'Error setting up network share' in errors[0].getMessage()
+    assert not any('Copied' in r.getMessage() for r in caplog.records)
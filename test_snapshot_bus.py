@@ -0,0 +1,46 @@
+import pandas as pd
+
+from snapshot_bus import SnapshotPublisher, SnapshotSubscriber, decode_snapshot, encode_snapshot
+
+def make_snapshot(price):
+    return pd.DataFrame({'name': ['Bitcoin', 'Ethereum'], 'current_price': [price, 3000.0]})
+
+def test_encode_roundtrip_keeps_publish_time():
+    df = make_snapshot(65000.0)
+    decoded = decode_snapshot(encode_snapshot(df))
+
+    pd.testing.assert_frame_equal(decoded, df)
+    assert 'published_at' in decoded.attrs
+    assert decoded.attrs['prices_only'] is False
+    assert decode_snapshot(encode_snapshot(df, prices_only=True)).attrs['prices_only'] is True
+
+def test_subscribers_receive_every_snapshot(tmp_path):
+    address = str(tmp_path / 'bus.sock')
+    publisher = SnapshotPublisher(address)
+    first, second = SnapshotSubscriber(address), SnapshotSubscriber(address)
+    try:
+        publisher.publish(make_snapshot(1.0))
+        # Late joiners are handed the current snapshot as soon as they connect
+        assert first.receive(timeout=2)['current_price'][0] == 1.0
+        assert second.receive(timeout=2)['current_price'][0] == 1.0
+
+        assert publisher.publish(make_snapshot(2.0)) == 2
+        assert first.receive(timeout=2)['current_price'][0] == 2.0
+        assert second.receive(timeout=2)['current_price'][0] == 2.0
+        assert first.receive(timeout=0.1) is None
+    finally:
+        first.close()
+        second.close()
+        publisher.close()
+
+def test_tcp_address_and_dropped_subscribers():
+    publisher = SnapshotPublisher('127.0.0.1:0')
+    subscriber = SnapshotSubscriber(publisher.address)
+    try:
+        publisher.publish(make_snapshot(1.0))
+        assert subscriber.receive(timeout=2) is not None
+        subscriber.close()
+        publisher.publish(make_snapshot(2.0))
+        assert publisher.publish(make_snapshot(3.0)) == 0
+    finally:
+        publisher.close()
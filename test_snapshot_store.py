@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from conftest import make_coin
+from snapshot_store import SnapshotStore
+
+def make_snapshot(count=5):
+    return pd.DataFrame([make_coin(rank) for rank in range(1, count + 1)]).drop(columns=['id'])
+
+def test_append_writes_typed_day_partitions(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    path = store.append(make_snapshot(), datetime(2025, 3, 5, 14, 0, tzinfo=timezone.utc))
+
+    assert '/date=2025-03-05/' in path
+    schema = pq.read_schema(path)
+    assert schema.field('market_cap').type == pa.int64()
+    assert schema.field('current_price').type == pa.float64()
+    assert pa.types.is_dictionary(schema.field('symbol').type)
+
+def test_query_filters_by_date_range_and_symbols(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    start = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    for day in range(5):
+        store.append(make_snapshot(), start + timedelta(days=day))
+
+    result = store.query(start + timedelta(days=1), start + timedelta(days=2), symbols=['c1', 'c3'])
+
+    assert len(result) == 4
+    assert set(result['symbol']) == {'c1', 'c3'}
+    assert result['timestamp'].min() == pd.Timestamp('2025-03-02', tz='UTC')
+
+def test_compact_merges_parts_without_losing_rows(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    start = datetime(2025, 3, 5, tzinfo=timezone.utc)
+    for minute in range(3):
+        store.append(make_snapshot(), start + timedelta(minutes=minute))
+
+    store.compact('2025-03-05')
+
+    assert len(list((tmp_path / 'date=2025-03-05').iterdir())) == 1
+    assert len(store.query()) == 15